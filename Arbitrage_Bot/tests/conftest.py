@@ -0,0 +1,36 @@
+import json
+import os
+import sys
+
+import pytest
+
+# Модулі бота імпортуються як utility.*, тому корінь Arbitrage_Bot має бути в sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Тимчасовий робочий каталог з logs/, куди setup_class_logger пише журнали."""
+    (tmp_path / "logs").mkdir()
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def config_file(workdir):
+    """Копія config/config.json у тимчасовому каталозі, яку тест може змінювати."""
+    source = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "config.json")
+    with open(source) as file:
+        config = json.load(file)
+    path = workdir / "config.json"
+    path.write_text(json.dumps(config))
+    return str(path)
+
+
+@pytest.fixture(autouse=True)
+def shared_limiter():
+    """Спільний на процес RateLimiter не повинен переносити стан між тестами."""
+    from utility.rate_limit_file import reset_shared_limiter
+    reset_shared_limiter()
+    yield
+    reset_shared_limiter()
@@ -0,0 +1,208 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from utility.async_arbitrage_file import CryptoArbitrage, OrderTracker, TransactionManager
+
+
+class FakeClient:
+    """Асинхронний клієнт ccxt без мережі: ордер стає 'closed' після fills_after опитувань."""
+
+    def __init__(self, bid=101.0, ask=100.0, fills_after=2, final_status='closed'):
+        self.has = {}
+        self.final_status = final_status
+        self.bid = bid
+        self.ask = ask
+        self.fills_after = fills_after
+        self.orders = {}
+        self.fetch_calls = 0
+        self.cancelled = []
+
+    async def fetch_ticker(self, symbol):
+        return {'symbol': symbol, 'bid': self.bid, 'ask': self.ask}
+
+    async def fetch_order_book(self, symbol, limit=None):
+        return {'bids': [[self.bid, 10.0]], 'asks': [[self.ask, 10.0]]}
+
+    async def create_order(self, symbol, type, side, amount, price=None, params={}):
+        order_id = f"{side}-{len(self.orders)}"
+        self.orders[order_id] = {'id': order_id, 'symbol': symbol, 'type': type, 'side': side, 'amount': amount, 'status': 'open', 'polls': 0}
+        return dict(self.orders[order_id])
+
+    async def fetch_order(self, id, symbol):
+        self.fetch_calls += 1
+        order = self.orders[id]
+        order['polls'] += 1
+        if self.fills_after is not None and order['polls'] >= self.fills_after:
+            order['status'] = self.final_status
+        return dict(order)
+
+    async def cancel_order(self, id, symbol):
+        self.cancelled.append(id)
+        self.orders[id]['status'] = 'canceled'
+        return dict(self.orders[id])
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    config = {
+        "exchanges": {
+            "bybit": {"api_key": "", "api_secret": ""},
+            "bitstamp": {"api_key": "", "api_secret": ""}
+        },
+        "polling_interval": 0,
+        "order_tracking": {"min_interval": 0.001, "max_interval": 0.01, "backoff_factor": 1.5, "fill_timeout": 1.0},
+        "storage": {"data_file": str(tmp_path / "data.json"), "log_file": str(tmp_path / "log.txt")},
+        "risk_management": {"max_position_size": 0.1},
+        "transaction": {"fee": 0.0},
+        "arbitrage": {"min_price_difference": 0.01},
+        "currency_pairs": {"selected_assets": ["BTC/USDT"]}
+    }
+    config_path = tmp_path / "config.json"
+    config_path.write_text(json.dumps(config))
+    monkeypatch.chdir(tmp_path)
+
+    app = CryptoArbitrage(str(config_path))
+    clients = {'bybit': FakeClient(bid=99.0, ask=100.0), 'bitstamp': FakeClient(bid=101.0, ask=102.0)}
+    for name, exchange in app.exchanges.items():
+        exchange.exchange = clients[name]
+    app.transaction_manager = {name: TransactionManager(exchange, app.config_manager) for name, exchange in app.exchanges.items()}
+    app.clients = clients
+    return app
+
+
+def test_run_cycle_fills_both_legs_through_tracker(app):
+    async def scenario():
+        await app.run_cycle()
+        pending = app.order_tracker.pending_orders()
+        await app.shutdown()
+        return pending
+
+    assert asyncio.run(scenario()) == 0
+    buy_orders = app.clients['bybit'].orders
+    sell_orders = app.clients['bitstamp'].orders
+    assert [order['side'] for order in buy_orders.values()] == ['buy']
+    assert [order['side'] for order in sell_orders.values()] == ['sell']
+    assert all(order['status'] == 'closed' for order in [*buy_orders.values(), *sell_orders.values()])
+
+
+def test_unfilled_order_is_untracked_and_cancelled(app):
+    app.clients['bybit'].fills_after = None
+    app.fill_timeout = 0.05
+
+    async def scenario():
+        await app.run_cycle()
+        calls = app.clients['bybit'].fetch_calls
+        await asyncio.sleep(0.1)
+        result = (app.order_tracker.pending_orders(), app.clients['bybit'].fetch_calls - calls)
+        await app.shutdown()
+        return result
+
+    pending, calls_after_timeout = asyncio.run(scenario())
+    assert pending == 0
+    assert calls_after_timeout == 0
+    assert app.clients['bybit'].cancelled == ['buy-0']
+    assert app.clients['bitstamp'].orders == {}
+
+
+OPPORTUNITY = {'symbol': "BTC/USDT", 'volume': 0.1, 'buy_exchange': 'bybit', 'sell_exchange': 'bitstamp', 'buy_price': 100.0, 'sell_price': 101.0}
+
+
+def test_sell_timeout_unwinds_filled_buy_leg(app):
+    app.clients['bitstamp'].fills_after = None
+    app.fill_timeout = 0.05
+
+    async def scenario():
+        result = await app.execute_arbitrage_trade(OPPORTUNITY)
+        await app.shutdown()
+        return result
+
+    result = asyncio.run(scenario())
+    assert result['status'] == 'unwound'
+    assert app.clients['bitstamp'].cancelled == ['sell-0']
+    unwind = app.clients['bybit'].orders['sell-1']
+    assert (unwind['type'], unwind['side'], unwind['amount']) == ('market', 'sell', 0.1)
+
+
+def test_rejected_sell_unwinds_filled_buy_leg(app):
+    app.clients['bitstamp'].final_status = 'rejected'
+
+    async def scenario():
+        result = await app.execute_arbitrage_trade(OPPORTUNITY)
+        await app.shutdown()
+        return result
+
+    result = asyncio.run(scenario())
+    assert result['status'] == 'unwound'
+    assert [order['side'] for order in app.clients['bybit'].orders.values()] == ['buy', 'sell']
+
+
+def test_failed_unwind_reports_unhedged_position(app):
+    app.clients['bitstamp'].final_status = 'canceled'
+    create_order = app.clients['bybit'].create_order
+
+    async def refuse_market(symbol, type, side, amount, price=None, params={}):
+        if type == 'market':
+            raise RuntimeError("exchange unavailable")
+        return await create_order(symbol, type, side, amount, price, params)
+
+    app.clients['bybit'].create_order = refuse_market
+
+    async def scenario():
+        result = await app.execute_arbitrage_trade(OPPORTUNITY)
+        await app.shutdown()
+        return result
+
+    result = asyncio.run(scenario())
+    assert result['status'] == 'unhedged'
+    assert result['buy_order']['status'] == 'closed'
+
+
+def test_wait_for_fill_timeout_stops_polling():
+    async def scenario():
+        tracker = OrderTracker(min_interval=0.001, max_interval=0.01)
+        client = FakeClient(fills_after=None)
+        order = await client.create_order('BTC/USDT', 'limit', 'buy', 1.0, 100.0)
+        with pytest.raises(asyncio.TimeoutError):
+            await tracker.wait_for_fill(client, order['id'], 'BTC/USDT', timeout=0.05)
+        calls = client.fetch_calls
+        await asyncio.sleep(0.1)
+        result = (tracker.pending_orders(), client.fetch_calls - calls)
+        await tracker.close()
+        return result
+
+    assert asyncio.run(scenario()) == (0, 0)
+
+
+def test_run_cycle_survives_failing_trade(app, monkeypatch):
+    app.config_manager.config_data['currency_pairs']['selected_assets'] = ["BTC/USDT", "ETH/USDT"]
+    executed = []
+
+    async def execute(opp):
+        executed.append(opp['symbol'])
+        if opp['symbol'] == "BTC/USDT":
+            raise TypeError("broken trade")
+
+    monkeypatch.setattr(app, 'execute_arbitrage_trade', execute)
+
+    async def scenario():
+        latencies = await app.run_cycle()
+        await app.shutdown()
+        return latencies
+
+    assert set(asyncio.run(scenario())) == {"BTC/USDT", "ETH/USDT"}
+    assert sorted(executed) == ["BTC/USDT", "ETH/USDT"]
+
+
+def test_async_module_imports_without_package_root_on_path():
+    # Допоміжні модулі utility імпортуються ліниво, як у синхронному arbitrage_file
+    utility_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "utility")
+    result = subprocess.run([sys.executable, "-c", "import async_arbitrage_file"], cwd=utility_dir, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
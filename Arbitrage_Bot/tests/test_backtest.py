@@ -0,0 +1,143 @@
+import json
+
+import numpy as np
+import pytest
+
+from utility.arbitrage_file import ArbitrageAnalyzer, ConfigManager, ExchangeAPI, SimulationTrading, TransactionManager
+from utility.tick_store_file import TICK_DTYPE, TickStore
+
+EXCHANGES = ['bybit', 'bitstamp']
+SYMBOLS = ['BTC/USDT', 'ETH/USDT']
+
+
+def make_tick_store(path, ticks=10000, seed=1):
+    """Синтетичні тіки: спільне випадкове блукання ціни з окремим шумом для кожної біржі."""
+    rng = np.random.default_rng(seed)
+    store = TickStore(str(path))
+    for symbol, start_price in zip(SYMBOLS, (30000.0, 2000.0)):
+        walk = start_price * np.exp(np.cumsum(rng.normal(0, 2e-4, ticks)))
+        for exchange in EXCHANGES:
+            records = np.zeros(ticks, dtype=TICK_DTYPE)
+            records['timestamp'] = 1000 + np.sort(rng.uniform(0, ticks * 0.1, ticks))
+            records['price'] = walk * (1 + rng.normal(0, 1.5e-3, ticks))
+            records['bid'] = records['price'] * 0.9999
+            records['ask'] = records['price'] * 1.0001
+            records['volume'] = 1
+            store.append_many(exchange, symbol, records)
+    return store
+
+
+@pytest.fixture
+def simulation(config_file):
+    with open(config_file) as file:
+        config = json.load(file)
+    config['transaction']['fee'] = 0.0001
+    with open(config_file, 'w') as file:
+        json.dump(config, file)
+
+    config = ConfigManager(config_file)
+    exchange_api = ExchangeAPI(config)
+    analyzer = ArbitrageAnalyzer(exchange_api, config)
+    transaction_manager = TransactionManager(exchange_api)
+    simulation = SimulationTrading(exchange_api, analyzer, transaction_manager, 6000)
+    yield simulation
+    for component in (simulation, transaction_manager, analyzer, exchange_api, config):
+        component.close_logger()
+    transaction_manager.close()
+    exchange_api.close()
+
+
+def test_replay_never_drives_balances_negative(simulation, workdir):
+    store = make_tick_store(workdir / "ticks")
+    lowest = []
+    execute_opportunity = simulation.execute_opportunity
+
+    def checked_execute(opportunity):
+        executed = execute_opportunity(opportunity)
+        lowest.append(simulation.ledger.view().min())
+        return executed
+
+    simulation.execute_opportunity = checked_execute
+    stats = simulation.run_backtest(store, EXCHANGES, SYMBOLS)
+    store.close()
+
+    assert stats['events'] == 4 * 10000
+    assert stats['trades'] > 0
+    assert min(lowest) >= 0
+    assert simulation.ledger.view().min() >= 0
+    # Без від'ємних балансів вартість портфеля не може рости без меж
+    assert abs(stats['pnl']) < stats['initial_value']
+    assert 0 <= stats['max_drawdown'] < 1
+
+
+def test_get_price_uses_available_side_of_one_sided_book(simulation):
+    from utility.stream_file import TopOfBookStore
+
+    top_of_book = TopOfBookStore(max_quote_age=None)
+    simulation.bind_replay(top_of_book, None)
+    top_of_book.update('bybit', 'BTC/USDT', 100.0, None)
+    top_of_book.update('bitstamp', 'BTC/USDT', None, 102.0)
+    top_of_book.update('bybit', 'ETH/USDT', None, None)
+    top_of_book.update('bitstamp', 'ETH/USDT', 10.0, 12.0)
+
+    assert simulation.get_price('BTC/USDT', 'bybit') == 100.0
+    assert simulation.get_price('BTC/USDT', 'bitstamp') == 102.0
+    assert simulation.get_price('ETH/USDT', 'bybit') is None
+    assert simulation.get_price('ETH/USDT', 'bitstamp') == 11.0
+
+
+def test_exchanges_view_is_read_only(simulation):
+    simulation.ledger.set('bybit', 'balance', 100.0)
+    exchanges = simulation.exchanges
+    assert exchanges['bybit']['balance'] == 100.0
+    with pytest.raises(TypeError):
+        exchanges['bybit']['balance'] = 0.0
+    with pytest.raises(TypeError):
+        exchanges['bybit'] = {}
+    assert simulation.ledger.get('bybit', 'balance') == 100.0
+
+
+def test_group_events_matches_per_series_masks(workdir):
+    from utility.backtest_file import BacktestEngine, group_events
+
+    store = make_tick_store(workdir / "ticks", ticks=500)
+    engine = BacktestEngine(None, store, EXCHANGES, SYMBOLS)
+    events = engine.load_events()
+    engine.close_logger()
+    store.close()
+
+    series = group_events(events, EXCHANGES, SYMBOLS)
+    assert len(series) == 4
+    for venue_id, exchange in enumerate(EXCHANGES):
+        for symbol_id, symbol in enumerate(SYMBOLS):
+            expected = events[(events['venue'] == venue_id) & (events['symbol'] == symbol_id)]
+            timestamps, bids, asks = series[(exchange, symbol)]
+            assert np.array_equal(timestamps, expected['timestamp'])
+            assert np.array_equal(bids, expected['bid'])
+            assert np.array_equal(asks, expected['ask'])
+
+
+def test_sweep_worker_runs_without_live_clients(config_file, workdir, monkeypatch):
+    import utility.arbitrage_file
+    from utility import sweep_file
+    from utility.backtest_file import BacktestEngine
+
+    store = make_tick_store(workdir / "ticks", ticks=2000)
+    engine = BacktestEngine(None, store, EXCHANGES, SYMBOLS)
+    events_path = str(workdir / "events.npy")
+    np.save(events_path, engine.load_events())
+    engine.close_logger()
+    store.close()
+
+    def no_live_clients(*args, **kwargs):
+        raise AssertionError("sweep must not build ExchangeAPI")
+
+    monkeypatch.setattr(utility.arbitrage_file, 'ExchangeAPI', no_live_clients)
+    sweep_file._init_worker(config_file, events_path, EXCHANGES, SYMBOLS, 6000)
+    series = sweep_file._worker['series']
+    results = [sweep_file._run_parameter_set({'min_price_difference': value}) for value in (0.01, 0.5)]
+
+    # Серії згруповано один раз і повторно використано обома прогонами
+    assert sweep_file._worker['series'] is series
+    assert all(result['final_value'] > 0 for result in results)
+    assert results[1]['trades'] <= results[0]['trades']
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from utility.batch_writer_file import BatchedFileWriter
+
+
+def test_lines_are_written_in_batches(tmp_path):
+    path = tmp_path / "log.txt"
+    writer = BatchedFileWriter(str(path), batch_size=10, flush_interval=5.0)
+
+    async def scenario():
+        for index in range(25):
+            await writer.write(f"{index}\n")
+        await writer.flush()
+        metrics = writer.get_metrics()
+        await writer.close()
+        return metrics
+
+    metrics = asyncio.run(scenario())
+    assert path.read_text().splitlines() == [str(index) for index in range(25)]
+    assert metrics['written'] == 25
+    assert metrics['batches'] >= 3
+    assert metrics['queue_depth'] == 0
+
+
+def test_full_queue_applies_backpressure(tmp_path):
+    writer = BatchedFileWriter(str(tmp_path / "log.txt"), max_queue=2, batch_size=1, flush_interval=0.01)
+
+    async def scenario():
+        await asyncio.gather(*(writer.write(f"{index}\n") for index in range(20)))
+        await writer.close()
+        return writer.get_metrics()
+
+    metrics = asyncio.run(scenario())
+    assert metrics['written'] == 20
+    assert metrics['backpressure_waits'] > 0
+    assert metrics['max_queue_depth'] <= 2
+
+
+def test_flush_interval_writes_partial_batch(tmp_path):
+    path = tmp_path / "log.txt"
+    writer = BatchedFileWriter(str(path), batch_size=100, flush_interval=0.01, fsync='batch')
+
+    async def scenario():
+        await writer.write("one\n")
+        await asyncio.sleep(0.1)
+        content = path.read_text()
+        await writer.close()
+        return content
+
+    assert asyncio.run(scenario()) == "one\n"
+    assert writer.get_metrics()['fsyncs'] >= 1
+
+
+def test_unknown_fsync_policy_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        BatchedFileWriter(str(tmp_path / "log.txt"), fsync='always')
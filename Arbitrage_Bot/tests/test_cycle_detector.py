@@ -0,0 +1,41 @@
+import pytest
+
+from utility.cycle_file import CurrencyGraph, CycleDetector
+
+
+def make_graph(eth_btc):
+    graph = CurrencyGraph(fee=0.001)
+    graph.update_market('bybit', 'BTC', 'USDT', 100.0, 100.0)
+    graph.update_market('bybit', 'ETH', 'USDT', 10.0, 10.0)
+    graph.update_market('bybit', 'ETH', 'BTC', eth_btc, eth_btc)
+    return graph
+
+
+def test_consistent_prices_have_no_cycle():
+    detector = CycleDetector(make_graph(0.1), time_budget=1.0)
+    assert detector.scan() == []
+
+
+def test_negative_cycle_is_reported_with_profit_after_fees():
+    detector = CycleDetector(make_graph(0.11), time_budget=1.0)
+    cycles = detector.scan()
+
+    assert len(cycles) == 1
+    cycle = cycles[0]
+    # USDT -> ETH -> BTC -> USDT: купівля ETH за 10, продаж за 0.11 BTC, продаж BTC за 100
+    assert cycle['path'] == [('bybit', 'USDT'), ('bybit', 'ETH'), ('bybit', 'BTC')]
+    assert cycle['profit'] == pytest.approx(1.1 * 0.999 ** 3 - 1)
+
+
+def test_incremental_scan_picks_up_price_change():
+    graph = make_graph(0.1)
+    detector = CycleDetector(graph, time_budget=1.0)
+    assert detector.scan() == []
+
+    graph.update_market('bybit', 'ETH', 'BTC', 0.11, 0.11)
+    assert len(detector.scan()) == 1
+
+
+def test_min_profit_filters_small_cycles():
+    detector = CycleDetector(make_graph(0.101), time_budget=1.0, min_profit=0.01)
+    assert detector.scan() == []
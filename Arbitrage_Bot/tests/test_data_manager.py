@@ -0,0 +1,43 @@
+import json
+
+from utility.arbitrage_file import ConfigManager, DataManager
+
+
+def test_data_manager_reads_tick_store_config(config_file, workdir):
+    with open(config_file) as file:
+        config = json.load(file)
+    config["tick_store"] = {"data_dir": str(workdir / "ticks"), "segment_records": 4, "index_stride": 2, "bar_cache_size": 3}
+    with open(config_file, "w") as file:
+        json.dump(config, file)
+
+    config = ConfigManager(config_file)
+    manager = DataManager.from_config(config)
+    for index in range(10):
+        manager.store_price_data({"BTC/USDT": 100.0 + index}, "bybit", timestamp=1000.0 + index)
+
+    assert manager.data_dir == str(workdir / "ticks")
+    assert manager.store.segment_records == 4
+    assert manager.store.index_stride == 2
+    assert len(manager.get_price_history("BTC/USDT", "bybit")) == 10
+    manager.close()
+    manager.close_logger()
+    config.close_logger()
+
+
+def test_price_history_without_exchange_merges_all_venues(workdir):
+    manager = DataManager(str(workdir / "ticks"))
+    manager.store_price_data({"BTC/USDT": {"bybit": 100.0, "bitstamp": 101.0}}, timestamp=1000.0)
+    manager.store_price_data({"BTC/USDT": 102.0}, timestamp=1001.0)
+    manager.store_price_data({"BTC/USDT": {"bitstamp": 103.0}}, timestamp=1002.0)
+    manager.store_price_data({"ETH/USDT": {"bybit": 2000.0}}, timestamp=1002.0)
+
+    history = manager.get_price_history("BTC/USDT")
+    assert history['timestamp'].tolist() == [1000.0, 1000.0, 1001.0, 1002.0]
+    assert sorted(history['price'].tolist()) == [100.0, 101.0, 102.0, 103.0]
+    assert len(manager.get_price_history("BTC/USDT", start=1001.0)) == 2
+
+    bars = manager.get_price_history("BTC/USDT", interval=60)
+    assert len(bars) == 1
+    assert bars['close'][0] == 103.0
+    manager.close()
+    manager.close_logger()
@@ -0,0 +1,37 @@
+import json
+
+from utility.history_file import TransactionHistoryReader
+
+
+def write_log(path, records):
+    with open(path, "w") as file:
+        for record in records:
+            file.write((record if isinstance(record, str) else json.dumps(record)) + "\n")
+
+
+def test_index_skips_malformed_and_timestampless_records(tmp_path):
+    path = str(tmp_path / "data.json")
+    write_log(path, [
+        [1, 2, 3],
+        {'symbol': "BTC/USDT"},
+        "42",
+        {'timestamp': 10.0, 'symbol': "BTC/USDT"},
+        {'timestamp': 20.0, 'symbol': "ETH/USDT"},
+        {'timestamp': 30.0, 'symbol': "BTC/USDT"},
+    ])
+    reader = TransactionHistoryReader(path, index_interval=1)
+
+    assert reader.count() == 6
+    assert [checkpoint[0] for checkpoint in reader.checkpoints] == [10.0, 20.0, 30.0]
+    assert [record['timestamp'] for record in reader.iter_records(symbol="BTC/USDT", start=15)] == [30.0]
+    assert len(list(reader.iter_records())) == 4
+
+
+def test_index_survives_reopen(tmp_path):
+    path = str(tmp_path / "data.json")
+    write_log(path, [{'timestamp': float(i), 'profit': i} for i in range(10)])
+    TransactionHistoryReader(path, index_interval=3).update_index()
+
+    reader = TransactionHistoryReader(path, index_interval=3)
+    assert [checkpoint[2] for checkpoint in reader.checkpoints] == [0, 3, 6, 9]
+    assert [record['profit'] for record in reader.iter_records(start=5, end=7)] == [5, 6, 7]
@@ -0,0 +1,43 @@
+import pytest
+
+from utility.latency_file import LatencyModel, VirtualClock
+
+
+def test_same_seed_gives_same_latencies():
+    config = {"seed": 7, "default": {"distribution": "lognormal", "mu": -2.5, "sigma": 0.5}}
+    first, second = LatencyModel.from_config(config), LatencyModel.from_config(config)
+    assert [first.sample('bybit', 'buy') for _ in range(5)] == [second.sample('bybit', 'buy') for _ in range(5)]
+
+
+def test_exchange_and_leg_overrides():
+    model = LatencyModel(
+        default={"distribution": "fixed", "value": 0.1},
+        exchanges={
+            "bybit": {"buy": {"distribution": "fixed", "value": 0.2}},
+            "bitstamp": {"distribution": "fixed", "value": 0.3}
+        }
+    )
+    assert model.sample('bybit', 'buy') == 0.2
+    assert model.sample('bybit', 'sell') == 0.1
+    assert model.sample('bitstamp', 'sell') == 0.3
+    assert model.samples == 3
+    assert model.total_latency == pytest.approx(0.6)
+
+
+def test_min_clamps_negative_samples():
+    model = LatencyModel(default={"distribution": "normal", "mean": -1.0, "std": 0.01, "min": 0.0}, seed=1)
+    assert model.sample('bybit', 'buy') == 0.0
+
+
+def test_unknown_distribution_raises():
+    with pytest.raises(ValueError):
+        LatencyModel(default={"distribution": "pareto"}).sample('bybit', 'buy')
+
+
+def test_virtual_clock_only_moves_forward_on_advance():
+    clock = VirtualClock(10.0)
+    clock.sleep(0.5)
+    clock.advance_to(5.0)
+    assert clock.now() == 10.5
+    clock.advance_to(12.0)
+    assert clock.now() == 12.0
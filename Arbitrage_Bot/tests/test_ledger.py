@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from utility.ledger_file import BalanceLedger
+
+
+def test_growth_keeps_existing_balances():
+    ledger = BalanceLedger(['bybit'])
+    ledger.set('bybit', BalanceLedger.CASH, 100.0)
+    for index in range(20):
+        ledger.add(f'venue{index}', f'COIN{index}', index + 1.0)
+
+    assert ledger.get('bybit', BalanceLedger.CASH) == 100.0
+    assert ledger.get('venue19', 'COIN19') == 20.0
+    assert ledger.get('venue19', 'COIN0') == 0.0
+    assert ledger.get('missing', 'BTC') == 0
+    assert ledger.shape == (21, 21)
+
+
+def test_mark_to_market_and_convert_all_to_cash():
+    ledger = BalanceLedger(['bybit', 'bitstamp'])
+    ledger.set('bybit', BalanceLedger.CASH, 100.0)
+    ledger.set('bybit', 'BTC', 0.5)
+    ledger.set('bitstamp', 'ETH', 2.0)
+    prices = ledger.price_matrix(lambda venue, asset: {'BTC': 200.0, 'ETH': 10.0}[asset])
+
+    assert ledger.mark_to_market(prices).tolist() == [200.0, 20.0]
+    ledger.convert_all_to_cash(prices)
+    assert ledger.to_dict() == {
+        'bybit': {BalanceLedger.CASH: 200.0, 'BTC': 0.0, 'ETH': 0.0},
+        'bitstamp': {BalanceLedger.CASH: 20.0, 'BTC': 0.0, 'ETH': 0.0}
+    }
+
+
+def test_snapshot_restore_round_trip():
+    ledger = BalanceLedger(['bybit'], ['BTC'])
+    ledger.set('bybit', 'BTC', 1.0)
+    snapshot = ledger.snapshot()
+    ledger.add('bybit', 'BTC', 5.0)
+    ledger.add('bitstamp', 'ETH', 3.0)
+
+    ledger.restore(snapshot)
+    assert ledger.get('bybit', 'BTC') == 1.0
+    assert ledger.get('bitstamp', 'ETH') == 0.0
+    assert np.shares_memory(ledger.view(), ledger.balances)
+
+
+def test_price_matrix_only_prices_held_assets():
+    ledger = BalanceLedger(['bybit'], ['BTC', 'ETH'])
+    ledger.set('bybit', 'BTC', 1.0)
+    requested = []
+    ledger.price_matrix(lambda venue, asset: requested.append(asset) or 1.0)
+    assert requested == ['BTC']
+
+
+def test_price_matrix_rejects_missing_price_for_held_asset():
+    ledger = BalanceLedger(['bybit'], ['BTC', 'ETH'])
+    ledger.set('bybit', 'BTC', 1.0)
+    ledger.set('bybit', 'ETH', 2.0)
+    with pytest.raises(ValueError, match="ETH on bybit"):
+        ledger.price_matrix(lambda venue, asset: {'BTC': 100.0}.get(asset))
+    with pytest.raises(ValueError):
+        ledger.price_matrix(lambda venue, asset: float('nan'))
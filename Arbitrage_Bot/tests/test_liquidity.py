@@ -0,0 +1,33 @@
+import pytest
+
+from utility.liquidity_file import BookDepth, LiquidityEngine
+
+ASKS = [[100.0, 1.0], [101.0, 1.0], [103.0, 5.0]]
+BIDS = [[104.0, 1.0], [102.0, 1.0], [100.0, 5.0]]
+
+
+def test_cost_for_walks_levels():
+    depth = BookDepth(ASKS)
+    assert depth.cost_for(1.5) == pytest.approx(100.0 + 0.5 * 101.0)
+    assert depth.vwap(2.0) == pytest.approx(100.5)
+    # Більший за стакан обсяг обрізається до доступної глибини
+    assert depth.cost_for(100.0) == pytest.approx(100.0 + 101.0 + 5 * 103.0)
+
+
+def test_size_stops_where_marginal_profit_ends():
+    result = LiquidityEngine(fee=0.0).size_opportunity({'asks': ASKS}, {'bids': BIDS})
+    assert result['amount'] == 2.0
+    assert result['profit'] == pytest.approx(104.0 + 102.0 - 100.0 - 101.0)
+
+
+def test_fees_shrink_profitable_size():
+    result = LiquidityEngine(fee=0.01).size_opportunity({'asks': ASKS}, {'bids': BIDS})
+    assert result['amount'] == 1.0
+    assert result['profit'] == pytest.approx(104.0 * 0.99 - 100.0 * 1.01)
+
+
+def test_depth_is_cached_by_nonce():
+    engine = LiquidityEngine()
+    book = {'symbol': 'BTC/USDT', 'asks': ASKS, 'nonce': 1}
+    assert engine.get_depth(book, 'asks', 'bybit') is engine.get_depth(book, 'asks', 'bybit')
+    assert engine.get_depth(dict(book, nonce=2), 'asks', 'bybit') is not engine.get_depth(book, 'asks', 'bybit')
@@ -0,0 +1,89 @@
+from utility.order_book_file import IncrementalOrderBook
+
+
+def snapshot(nonce, bid=100.0, ask=101.0):
+    return {'bids': [[bid, 1.0], [bid - 1, 2.0]], 'asks': [[ask, 1.0], [ask + 1, 2.0]], 'nonce': nonce}
+
+
+def test_diffs_update_levels_in_sequence():
+    book = IncrementalOrderBook('BTC/USDT')
+    book.apply_snapshot(snapshot(10))
+    assert book.apply_diff({'bids': [[100.5, 3.0]], 'asks': [[101.0, 0]], 'sequence': 11})
+    assert book.best_bid() == (100.5, 3.0)
+    assert book.best_ask() == (102.0, 2.0)
+    assert book.cumulative_volume('bids', 99.0) == 6.0
+    # Застаріле повідомлення ігнорується
+    assert book.apply_diff({'bids': [[100.5, 0]], 'sequence': 11})
+    assert book.best_bid() == (100.5, 3.0)
+
+
+def test_sequence_gap_triggers_resync_and_replays_buffer():
+    resyncs = []
+
+    def resync():
+        resyncs.append(True)
+        return snapshot(12, bid=99.0)
+
+    book = IncrementalOrderBook('BTC/USDT', resync=resync)
+    book.apply_snapshot(snapshot(10))
+    assert book.apply_diff({'bids': [[99.5, 1.0]], 'sequence': 13})
+
+    assert resyncs == [True]
+    assert book.gaps == 1
+    assert book.sequence == 13
+    # Диференція 13 застосована поверх свіжого знімка 12
+    assert book.best_bid() == (99.5, 1.0)
+
+
+def test_gap_without_resync_callback_buffers_until_snapshot():
+    book = IncrementalOrderBook('BTC/USDT')
+    book.apply_snapshot(snapshot(10))
+    assert not book.apply_diff({'asks': [[100.5, 1.0]], 'sequence': 12})
+    assert not book.apply_diff({'asks': [[100.7, 1.0]], 'sequence': 13})
+    assert book.needs_resync
+
+    book.apply_snapshot(snapshot(11))
+    assert not book.needs_resync
+    assert book.sequence == 13
+    assert book.best_ask() == (100.5, 1.0)
+
+
+def test_prev_sequence_detects_gap():
+    book = IncrementalOrderBook('BTC/USDT')
+    book.apply_snapshot(snapshot(10))
+    assert book.apply_diff({'bids': [], 'sequence': 15, 'prev_sequence': 10})
+    assert not book.apply_diff({'bids': [], 'sequence': 20, 'prev_sequence': 16})
+    assert book.gaps == 1
+
+
+def test_unsequenced_feed_resyncs_periodically():
+    resyncs = []
+
+    def resync():
+        resyncs.append(True)
+        return {'bids': [[98.0, 1.0]], 'asks': [[99.0, 1.0]]}
+
+    book = IncrementalOrderBook('BTC/USDT', resync=resync, resync_interval=60)
+    book.apply_snapshot({'bids': [[100.0, 1.0]], 'asks': [[101.0, 1.0]]})
+    # Без nonce пропуск не виявити: диференції застосовуються, доки не мине інтервал
+    assert book.apply_diff({'bids': [[100.5, 2.0]]})
+    assert book.best_bid() == (100.5, 2.0)
+    assert resyncs == []
+
+    book.synced_at -= 60
+    assert book.apply_diff({'bids': [[100.7, 1.0]]})
+    assert resyncs == [True]
+    assert book.best_bid() == (98.0, 1.0)
+    assert not book.needs_resync
+
+
+def test_unsequenced_feed_without_callback_waits_for_snapshot():
+    book = IncrementalOrderBook('BTC/USDT', resync_interval=0)
+    book.apply_snapshot({'bids': [[100.0, 1.0]], 'asks': [[101.0, 1.0]]})
+    book.apply_diff({'asks': [[100.5, 1.0]]})
+    assert book.needs_resync
+    assert not book.apply_diff({'asks': [[100.2, 1.0]]})
+
+    book.apply_snapshot({'bids': [[99.0, 1.0]], 'asks': [[100.0, 1.0]]})
+    # Буферизовані диференції без sequence не накладаються на новіший знімок
+    assert book.best_ask() == (100.0, 1.0)
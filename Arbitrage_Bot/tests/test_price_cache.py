@@ -0,0 +1,36 @@
+from utility import arbitrage_file
+from utility.arbitrage_file import PriceCache
+
+
+def test_price_expires_after_exchange_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(arbitrage_file.time, 'monotonic', lambda: now[0])
+    cache = PriceCache(default_ttl=5, exchange_ttl={'bybit': 1})
+    cache.set('BTC/USDT', 'bybit', 100.0)
+    cache.set('BTC/USDT', 'bitstamp', 101.0)
+
+    now[0] += 2
+    assert cache.get('BTC/USDT', 'bybit') is None
+    assert cache.get('BTC/USDT', 'bitstamp') == 101.0
+    assert cache.get_stats() == {'size': 1, 'hits': 1, 'misses': 1, 'stale': 1, 'evictions': 0}
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = PriceCache(max_size=2)
+    cache.set('BTC/USDT', 'bybit', 100.0)
+    cache.set('ETH/USDT', 'bybit', 10.0)
+    cache.get('BTC/USDT', 'bybit')
+    cache.set('XRP/USDT', 'bybit', 1.0)
+
+    assert cache.get('ETH/USDT', 'bybit') is None
+    assert cache.get('BTC/USDT', 'bybit') == 100.0
+    assert cache.get_stats()['evictions'] == 1
+
+
+def test_invalidate_by_exchange():
+    cache = PriceCache()
+    cache.set('BTC/USDT', 'bybit', 100.0)
+    cache.set('BTC/USDT', 'bitstamp', 101.0)
+    cache.invalidate(exchange_name='bybit')
+    assert cache.get('BTC/USDT', 'bybit') is None
+    assert cache.get('BTC/USDT', 'bitstamp') == 101.0
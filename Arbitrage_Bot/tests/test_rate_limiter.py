@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+from utility.rate_limit_file import RateLimiter, get_shared_limiter
+
+
+def make_limiter(**kwargs):
+    # Майже нульове поповнення: у тесті рахуються лише початкові токени
+    return RateLimiter(limits={'bybit': {'rate': 0.001, 'capacity': 10}}, order_reserve=0.2, **kwargs)
+
+
+def test_market_data_cannot_spend_order_reserve():
+    limiter = make_limiter()
+    granted = 0
+    while limiter._try_acquire('bybit', 'market_data', 1) == 0:
+        granted += 1
+    assert granted == 8
+    # Зарезервовані 20% відра лишаються для ордерів
+    assert limiter._try_acquire('bybit', 'orders', 1) == 0
+    assert limiter._try_acquire('bybit', 'orders', 1) == 0
+    assert limiter._try_acquire('bybit', 'orders', 1) > 0
+
+
+def test_waiting_orders_take_priority_over_market_data():
+    limiter = make_limiter()
+    limiter._set_waiting('bybit', 'orders', 1)
+    assert limiter._try_acquire('bybit', 'market_data', 1) > 0
+    assert limiter._try_acquire('bybit', 'account', 1) > 0
+    assert limiter._try_acquire('bybit', 'orders', 1) == 0
+    limiter._set_waiting('bybit', 'orders', -1)
+    assert limiter._try_acquire('bybit', 'market_data', 1) == 0
+
+
+def test_class_bucket_limits_endpoint_class():
+    limiter = RateLimiter(limits={'bybit': {'rate': 0.001, 'capacity': 10, 'classes': {'account': {'rate': 0.001, 'capacity': 2}}}})
+    assert limiter._try_acquire('bybit', 'account', 1) == 0
+    assert limiter._try_acquire('bybit', 'account', 1) == 0
+    assert limiter._try_acquire('bybit', 'account', 1) > 0
+    assert limiter._try_acquire('bybit', 'market_data', 1) == 0
+
+
+def test_penalize_blocks_venue_and_drains_bucket():
+    limiter = make_limiter(penalty=5)
+    limiter._try_acquire('bybit', 'market_data', 1)
+    limiter.penalize('bybit')
+    assert limiter._try_acquire('bybit', 'orders', 1) > 4
+    occupancy = limiter.get_occupancy()['bybit']
+    assert occupancy['tokens'] == 0
+    assert occupancy['blocked_for'] > 4
+
+
+def test_async_acquire_waits_for_refill():
+    limiter = RateLimiter(limits={'bybit': {'rate': 100, 'capacity': 1}}, order_reserve=0.0)
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        started_at = loop.time()
+        for _ in range(3):
+            await limiter.acquire_async('bybit')
+        return loop.time() - started_at
+
+    assert asyncio.run(scenario()) >= 0.015
+    assert limiter.get_occupancy()['bybit']['throttled'] >= 1
+
+
+def test_reserve_is_clamped_for_large_requests():
+    limiter = make_limiter()
+    # 9 токенів + резерв 2 більше за місткість 10, але повне відро запит пропускає
+    assert limiter._try_acquire('bybit', 'market_data', 9) == 0
+
+
+def test_cost_above_capacity_is_rejected():
+    limiter = make_limiter()
+    with pytest.raises(ValueError):
+        limiter.acquire('bybit', 'market_data', 11)
+
+
+def test_sync_and_async_clients_share_one_limiter(config_file):
+    from utility.arbitrage_file import ConfigManager, ExchangeAPI
+    from utility.async_arbitrage_file import ConfigManager as AsyncConfigManager, ExchangeClientPool
+
+    exchange_api = ExchangeAPI(ConfigManager(config_file))
+    try:
+        pool = ExchangeClientPool(AsyncConfigManager(config_file))
+        assert exchange_api.rate_limiter is pool.rate_limiter is get_shared_limiter()
+        assert pool.get_client('bybit').enableRateLimit is False
+        assert exchange_api.exchanges['bybit'].enableRateLimit is False
+        # Ліміти з єдиної секції rate_limits config.json
+        assert pool.rate_limiter.limits['bybit']['capacity'] == 40
+    finally:
+        exchange_api.close_logger()
+        exchange_api.close()
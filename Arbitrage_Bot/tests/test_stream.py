@@ -0,0 +1,53 @@
+from utility.arbitrage_file import ArbitrageAnalyzer, ConfigManager
+from utility.latency_file import VirtualClock
+from utility.stream_file import IncrementalArbitrageDetector, TopOfBookStore
+
+
+def test_detector_ignores_quotes_older_than_max_quote_age():
+    clock = VirtualClock(0.0)
+    store = TopOfBookStore(max_quote_age=5, clock=clock.now)
+    detector = IncrementalArbitrageDetector(max_quote_age=store.max_quote_age, clock=store.clock)
+    store.add_listener(detector.on_store_update)
+
+    store.update('a', 'BTC/USDT', 99.0, 100.0)
+    clock.advance_to(100.0)
+    store.update('b', 'BTC/USDT', 110.0, 111.0)
+    clock.advance_to(101.0)
+
+    assert store.get('a', 'BTC/USDT') is None
+    assert detector.get_opportunities() == []
+
+
+def test_detector_drops_opportunity_when_leg_expires():
+    clock = VirtualClock(0.0)
+    store = TopOfBookStore(max_quote_age=5, clock=clock.now)
+    detector = IncrementalArbitrageDetector(max_quote_age=store.max_quote_age, clock=store.clock)
+    store.add_listener(detector.on_store_update)
+
+    store.update('a', 'BTC/USDT', 99.0, 100.0)
+    store.update('b', 'BTC/USDT', 110.0, 111.0)
+    assert [(o['buy_exchange'], o['sell_exchange']) for o in detector.get_opportunities()] == [('a', 'b')]
+
+    clock.advance_to(4.0)
+    # Повторне незмінне котирування продовжує життя запису біржі b
+    store.update('b', 'BTC/USDT', 110.0, 111.0)
+    store.update('c', 'BTC/USDT', 98.0, 101.0)
+    clock.advance_to(7.0)
+    assert [(o['buy_exchange'], o['sell_exchange']) for o in detector.get_opportunities()] == [('c', 'b')]
+
+
+def test_find_opportunities_skips_expired_venue(config_file):
+    clock = VirtualClock(0.0)
+    store = TopOfBookStore(max_quote_age=5, clock=clock.now)
+    config = ConfigManager(config_file)
+    analyzer = ArbitrageAnalyzer(None, config, top_of_book=store)
+    analyzer.attach_incremental_detector()
+
+    store.update('a', 'BTC/USDT', 99.0, 100.0)
+    clock.advance_to(100.0)
+    store.update('b', 'BTC/USDT', 110.0, 111.0)
+    clock.advance_to(101.0)
+
+    assert analyzer.find_opportunities(['a', 'b']) == []
+    analyzer.close_logger()
+    config.close_logger()
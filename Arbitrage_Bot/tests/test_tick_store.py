@@ -0,0 +1,63 @@
+import numpy as np
+
+from utility.tick_store_file import TICK_DTYPE, TickStore
+
+
+def ticks(start, count):
+    records = np.zeros(count, dtype=TICK_DTYPE)
+    records['timestamp'] = start + np.arange(count, dtype=float)
+    records['price'] = 100.0 + np.arange(count, dtype=float)
+    records['bid'] = np.nan
+    records['ask'] = np.nan
+    return records
+
+
+def test_append_rolls_segments_and_reads_back(tmp_path):
+    store = TickStore(str(tmp_path), segment_records=4)
+    store.append_many('bybit', 'BTC/USDT', ticks(1000, 10))
+    store.append('bybit', 'BTC/USDT', 1010.0, 110.0)
+
+    assert len(store.read_segments('bybit', 'BTC/USDT')) == 3
+    assert store.read('bybit', 'BTC/USDT')['price'].tolist() == [100.0 + i for i in range(11)]
+    store.close()
+
+
+def test_series_persist_after_reopen(tmp_path):
+    store = TickStore(str(tmp_path), segment_records=4)
+    store.append_many('bybit', 'BTC/USDT', ticks(1000, 6))
+    store.append_many('bitstamp', 'BTC/USDT', ticks(1000, 2))
+    store.close()
+
+    reopened = TickStore(str(tmp_path), segment_records=100)
+    assert reopened.segment_records == 4
+    assert sorted(reopened.list_series()) == [('bitstamp', 'BTC/USDT'), ('bybit', 'BTC/USDT')]
+    assert len(reopened.read('bybit', 'BTC/USDT')) == 6
+    reopened.close()
+
+
+def test_query_time_range_across_segments(tmp_path):
+    store = TickStore(str(tmp_path), segment_records=4, index_stride=2)
+    store.append_many('bybit', 'BTC/USDT', ticks(1000, 10))
+
+    assert store.count('bybit', 'BTC/USDT') == 10
+    assert store.query('bybit', 'BTC/USDT', 1003, 1006)['timestamp'].tolist() == [1003.0, 1004.0, 1005.0, 1006.0]
+    assert len(store.query('bybit', 'BTC/USDT', start=1008)) == 2
+    assert len(store.query('bybit', 'ETH/USDT')) == 0
+    store.close()
+
+
+def test_ohlcv_bars_are_invalidated_by_appends(tmp_path):
+    store = TickStore(str(tmp_path), segment_records=4, index_stride=2)
+    store.append_many('bybit', 'BTC/USDT', ticks(1200, 90))
+
+    bars = store.ohlcv('bybit', 'BTC/USDT', 60)
+    assert bars['timestamp'].tolist() == [1200.0, 1260.0]
+    assert bars['open'].tolist() == [100.0, 160.0]
+    assert bars['high'].tolist() == [159.0, 189.0]
+    assert bars['close'].tolist() == [159.0, 189.0]
+    assert store.ohlcv('bybit', 'BTC/USDT', 60) is bars
+
+    store.append('bybit', 'BTC/USDT', 1290.0, 50.0)
+    bars = store.ohlcv('bybit', 'BTC/USDT', 60)
+    assert bars['low'].tolist() == [100.0, 50.0]
+    store.close()
@@ -0,0 +1,88 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from utility.arbitrage_file import TransactionManager
+
+
+class FakeConfig:
+    def __init__(self, execution):
+        self.execution = execution
+
+    def get_execution_config(self):
+        return self.execution
+
+
+class FakeExchangeAPI:
+    """Синхронний ExchangeAPI без мережі: затримка кожної сторони задається окремо."""
+
+    def __init__(self, execution=None, delays=None):
+        self.config_manager = FakeConfig(execution or {})
+        self.delays = delays or {}
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def _order(self, side, coin, amount, exchange_name):
+        time.sleep(self.delays.get((side, exchange_name), 0))
+        with self.lock:
+            self.calls.append((side, exchange_name))
+        return {'side': side, 'exchange': exchange_name, 'amount': amount}
+
+    def buy(self, coin, amount, exchange_name):
+        return self._order('buy', coin, amount, exchange_name)
+
+    def sell(self, coin, amount, exchange_name):
+        return self._order('sell', coin, amount, exchange_name)
+
+
+OPPORTUNITY = {'currency': 'BTC/USDT', 'amount': 0.1, 'buy_exchange': 'bybit', 'sell_exchange': 'bitstamp'}
+
+
+@pytest.fixture
+def manager_factory(workdir):
+    managers = []
+
+    def factory(exchange_api):
+        manager = TransactionManager(exchange_api)
+        managers.append(manager)
+        return manager
+
+    yield factory
+    for manager in managers:
+        manager.close()
+        manager.close_logger()
+
+
+def test_pool_size_comes_from_execution_config(manager_factory):
+    assert manager_factory(FakeExchangeAPI({'max_workers': 6})).executor._max_workers == 6
+    # Менше двох потоків не вистачає навіть на одну угоду
+    assert manager_factory(FakeExchangeAPI({'max_workers': 1})).executor._max_workers == 2
+
+
+def test_concurrent_trade_fills_both_legs(manager_factory):
+    manager = manager_factory(FakeExchangeAPI({'leg_timeout': 1}))
+    result = manager.execute_trade_concurrent(OPPORTUNITY)
+    assert result['status'] == 'filled'
+    assert result['pending_legs'] == {}
+
+
+def test_queued_leg_is_cancelled_and_running_leg_unwound_late(manager_factory):
+    exchange_api = FakeExchangeAPI(delays={('buy', 'bybit'): 0.2})
+    manager = manager_factory(exchange_api)
+    # Один потік: продаж чекає в черзі за завислою купівлею
+    manager.executor.shutdown()
+    manager.executor = ThreadPoolExecutor(max_workers=1)
+
+    result = manager.execute_trade_concurrent(OPPORTUNITY, leg_timeout=0.05)
+
+    assert result['status'] == 'unwinding'
+    assert set(result['pending_legs']) == {'buy'}
+    assert result['errors']['sell'].startswith('cancelled')
+    result['pending_legs']['buy'].result()
+    deadline = time.monotonic() + 1
+    while ('sell', 'bybit') not in exchange_api.calls and time.monotonic() < deadline:
+        time.sleep(0.01)
+    # Продаж на bitstamp так і не відправлено, а пізню купівлю закрито продажем на bybit
+    assert exchange_api.calls == [('buy', 'bybit'), ('sell', 'bybit')]
@@ -0,0 +1,57 @@
+import pytest
+
+from utility.valuation_file import ValuationService
+
+
+class Snapshot:
+    def __init__(self, prices):
+        self.prices = prices
+
+    def get_price(self, symbol):
+        return self.prices.get(symbol)
+
+
+def make_service(symbols, prices):
+    requests = []
+
+    def snapshot_source(symbols_by_exchange):
+        requests.append(symbols_by_exchange)
+        return {exchange: Snapshot(prices) for exchange in symbols_by_exchange}
+
+    return ValuationService(snapshot_source, lambda exchange: symbols), requests
+
+
+def test_direct_inverted_and_intermediate_paths():
+    symbols = {'BTC/USDT', 'USDT/TRY', 'DOGE/BTC'}
+    prices = {'BTC/USDT': 100.0, 'USDT/TRY': 40.0, 'DOGE/BTC': 0.001}
+    service, requests = make_service(symbols, prices)
+
+    rates = service.get_rates({'bybit': ['BTC', 'TRY', 'DOGE', 'USDT']})
+    assert rates['bybit']['BTC'] == 100.0
+    assert rates['bybit']['TRY'] == pytest.approx(1 / 40.0)
+    assert rates['bybit']['DOGE'] == pytest.approx(0.1)
+    assert rates['bybit']['USDT'] == 1.0
+    # Усі потрібні символи біржі - одним знімком
+    assert requests == [{'bybit': {'BTC/USDT', 'USDT/TRY', 'DOGE/BTC'}}]
+
+
+def test_missing_path_or_quote_gives_none():
+    service, _ = make_service({'BTC/USDT'}, {})
+    rates = service.get_rates({'bybit': ['BTC', 'XYZ']})
+    assert rates['bybit'] == {'BTC': None, 'XYZ': None}
+
+
+def test_found_paths_are_cached():
+    calls = []
+
+    def symbols_source(exchange):
+        calls.append(exchange)
+        return {'BTC/USDT'}
+
+    service = ValuationService(lambda symbols: {}, symbols_source)
+    service.conversion_path('bybit', 'BTC')
+    service.conversion_path('bybit', 'BTC')
+    assert calls == ['bybit']
+    service.clear_cache()
+    service.conversion_path('bybit', 'BTC')
+    assert calls == ['bybit', 'bybit']
@@ -1,9 +1,13 @@
 import json
-import random
 import shutil
 import os
 import logging
 import time
+import threading
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, TimeoutError as FuturesTimeoutError
+from dataclasses import dataclass
+from types import MappingProxyType
 import ccxt
 
 def setup_class_logger(class_name):
@@ -19,13 +23,214 @@ def setup_class_logger(class_name):
     return logger
 
 
+class PriceCache:
+    """Кеш цін з TTL для кожної біржі та LRU-витісненням."""
+
+    def __init__(self, default_ttl=5, max_size=1024, exchange_ttl=None):
+        self.default_ttl = default_ttl
+        self.max_size = max_size
+        self.exchange_ttl = exchange_ttl or {}
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+
+    def get_ttl(self, exchange_name):
+        return self.exchange_ttl.get(exchange_name, self.default_ttl)
+
+    def get(self, coin, exchange_name):
+        key = (coin, exchange_name)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            price, stored_at = entry
+            if time.monotonic() - stored_at > self.get_ttl(exchange_name):
+                # Запис застарів - видаляємо його і вважаємо промахом
+                del self._entries[key]
+                self.stale += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return price
+
+    def set(self, coin, exchange_name, price):
+        key = (coin, exchange_name)
+        with self._lock:
+            self._entries[key] = (price, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, coin=None, exchange_name=None):
+        with self._lock:
+            for key in list(self._entries):
+                if (coin is None or key[0] == coin) and (exchange_name is None or key[1] == exchange_name):
+                    del self._entries[key]
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'stale': self.stale,
+                'evictions': self.evictions
+            }
+
+
+Quote = namedtuple('Quote', ['last', 'bid', 'ask', 'timestamp'])
+
+
+@dataclass(frozen=True)
+class TickerSnapshot:
+    """Незмінний знімок тікерів однієї біржі на певний момент часу."""
+    exchange: str
+    timestamp: float
+    quotes: MappingProxyType
+
+    def get_quote(self, symbol):
+        return self.quotes.get(symbol)
+
+    def get_price(self, symbol):
+        quote = self.quotes.get(symbol)
+        return quote.last if quote else None
+
+    def __contains__(self, symbol):
+        return symbol in self.quotes
+
+    def __len__(self):
+        return len(self.quotes)
+
+
+class MarketMetadataStore:
+    """Спільне сховище метаданих ринків з фоновим оновленням."""
+
+    def __init__(self, exchanges, refresh_interval=3600, logger=None):
+        self.exchanges = exchanges
+        self.refresh_interval = refresh_interval
+        self.logger = logger
+        self._markets = {}
+        self._symbols = {}
+        self._common_symbols = {}
+        self._symbol_venues = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._refresh_thread = None
+
+    def _load_markets(self, exchange_name, reload=False):
+        exchange = self.exchanges.get(exchange_name)
+        if not exchange:
+            return frozenset()
+        markets = exchange.load_markets(reload)
+        symbols = frozenset(markets.keys())
+        with self._lock:
+            self._markets[exchange_name] = markets
+            if self._symbols.get(exchange_name) != symbols:
+                self._symbols[exchange_name] = symbols
+                # Перетини, що містять цю біржу, більше не актуальні
+                self._common_symbols = {key: value for key, value in self._common_symbols.items() if exchange_name not in key}
+                self._symbol_venues = {key: value for key, value in self._symbol_venues.items() if exchange_name not in key}
+        return symbols
+
+    def get_markets(self, exchange_name):
+        if exchange_name not in self._markets:
+            self._load_markets(exchange_name)
+            self.start_background_refresh()
+        return self._markets.get(exchange_name, {})
+
+    def get_symbols(self, exchange_name):
+        symbols = self._symbols.get(exchange_name)
+        if symbols is None:
+            symbols = self._load_markets(exchange_name)
+            self.start_background_refresh()
+        return symbols
+
+    def get_common_symbols(self, exchange_names):
+        key = frozenset(exchange_names)
+        common = self._common_symbols.get(key)
+        if common is None:
+            symbol_sets = [self.get_symbols(name) for name in key]
+            common = frozenset.intersection(*symbol_sets) if symbol_sets else frozenset()
+            with self._lock:
+                self._common_symbols[key] = common
+        return common
+
+    def get_symbol_venues(self, exchange_names):
+        """Повертає індекс символ -> біржі для символів, що торгуються хоча б на двох біржах."""
+        key = tuple(exchange_names)
+        index = self._symbol_venues.get(key)
+        if index is None:
+            venues_by_symbol = {}
+            for name in key:
+                for symbol in self.get_symbols(name):
+                    venues_by_symbol.setdefault(symbol, []).append(name)
+            index = {symbol: tuple(venues) for symbol, venues in venues_by_symbol.items() if len(venues) > 1}
+            with self._lock:
+                self._symbol_venues[key] = index
+        return index
+
+    def refresh(self):
+        for exchange_name in list(self._symbols):
+            try:
+                self._load_markets(exchange_name, reload=True)
+            except Exception as e:
+                if self.logger:
+                    self.logger.error(f"Error refreshing markets for {exchange_name}: {str(e)}")
+
+    def _refresh_loop(self):
+        while not self._stop_event.wait(self.refresh_interval):
+            self.refresh()
+
+    def start_background_refresh(self):
+        if self._refresh_thread is not None or not self.refresh_interval:
+            return
+        self._refresh_thread = threading.Thread(target=self._refresh_loop, name="MarketMetadataRefresh", daemon=True)
+        self._refresh_thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._refresh_thread is not None:
+            self._refresh_thread.join()
+            self._refresh_thread = None
+
+
 class ExchangeAPI:
-    def __init__(self, config_manager):
+    def __init__(self, config_manager, rate_limiter=None):
         self.config_manager = config_manager
         self.exchanges_config = self.config_manager.get("exchanges", {})
         self.logger = setup_class_logger(self.__class__.__name__)
         self.exchanges = self._initialize_exchanges()
-        self.cache = {}
+        cache_config = self.config_manager.get_cache_config()
+        self.cache = PriceCache(
+            default_ttl=cache_config.get("default_ttl", 5),
+            max_size=cache_config.get("max_size", 1024),
+            exchange_ttl=cache_config.get("exchange_ttl", {})
+        )
+        self.markets = MarketMetadataStore(
+            self.exchanges,
+            refresh_interval=self.config_manager.get_markets_config().get("refresh_interval", 3600),
+            logger=self.logger
+        )
+        # За замовчуванням лімітер спільний на процес і діляться ним з асинхронним кодом
+        if rate_limiter is None:
+            from utility.rate_limit_file import get_shared_limiter
+            rate_limiter = get_shared_limiter(self.config_manager.get_rate_limits_config())
+        self.rate_limiter = rate_limiter
+        self.order_books = {}
+        concurrency_config = self.config_manager.get_concurrency_config()
+        self.fetch_timeout = concurrency_config.get("fetch_timeout", 5)
+        self.executor = ThreadPoolExecutor(
+            max_workers=concurrency_config.get("max_workers", max(len(self.exchanges), 1) * 4),
+            thread_name_prefix="ExchangeAPI"
+        )
 
     def _initialize_exchanges(self):
         initialized_exchanges = {}
@@ -34,35 +239,51 @@ class ExchangeAPI:
                 exchange_class = getattr(ccxt, exchange_name)
                 initialized_exchanges[exchange_name] = exchange_class({
                     'apiKey': config['api_key'],
-                    'secret': config['api_secret']
+                    'secret': config['api_secret'],
+                    # Запити обмежує спільний RateLimiter, вбудований throttler ccxt лише подвоїв би паузи
+                    'enableRateLimit': False
                 })
                 self.logger.info(f"Initialized {exchange_name} successfully.")
             except Exception as e:
                 self.logger.error(f"Error initializing {exchange_name}: {str(e)}")
         return initialized_exchanges
 
+    def _request(self, exchange_name, endpoint_class, func, *args):
+        self.rate_limiter.acquire(exchange_name, endpoint_class)
+        try:
+            return func(*args)
+        except (ccxt.RateLimitExceeded, ccxt.DDoSProtection):
+            self.rate_limiter.penalize(exchange_name)
+            raise
+
     def get_price(self, coin, exchange_name):
-        cache_key = f'{coin}_{exchange_name}_price'
-        if cache_key in self.cache:
-            return self.cache[cache_key]
+        cached_price = self.cache.get(coin, exchange_name)
+        if cached_price is not None:
+            return cached_price
         exchange = self.exchanges.get(exchange_name)
         if not exchange:
             raise ValueError(f"Exchange {exchange_name} not found.")
-        ticker = exchange.fetch_ticker(coin)
-        self.cache[cache_key] = ticker['last']
+        ticker = self._request(exchange_name, 'market_data', exchange.fetch_ticker, coin)
+        self.cache.set(coin, exchange_name, ticker['last'])
         self.logger.info(f"Fetched price for {coin} from {exchange_name}: {ticker['last']}")
         return ticker['last']
 
+    def get_cache_stats(self):
+        return self.cache.get_stats()
+
+    def get_rate_limit_occupancy(self):
+        return self.rate_limiter.get_occupancy()
+
     def buy(self, coin, amount, exchange_name, order_type='market'):
         exchange = self.exchanges.get(exchange_name)
         if not exchange:
             raise ValueError(f"Exchange {exchange_name} not found.")
         if order_type == 'market':
-            order = exchange.create_market_buy_order(coin, amount)
+            order = self._request(exchange_name, 'orders', exchange.create_market_buy_order, coin, amount)
         elif order_type == 'limit':
             # For simplicity, assuming a fixed price for limit orders
             price = self.get_price(coin, exchange_name) * 1.01  # 1% above the current price
-            order = exchange.create_limit_buy_order(coin, price, amount)
+            order = self._request(exchange_name, 'orders', exchange.create_limit_buy_order, coin, price, amount)
         else:
             raise ValueError(f'Unsupported order type: {order_type}')
         self.logger.info(f"Bought {amount} of {coin} on {exchange_name} using {order_type} order.")
@@ -73,80 +294,201 @@ class ExchangeAPI:
         if not exchange:
             raise ValueError(f"Exchange {exchange_name} not found.")
         if order_type == 'market':
-            order = exchange.create_market_sell_order(coin, amount)
+            order = self._request(exchange_name, 'orders', exchange.create_market_sell_order, coin, amount)
         elif order_type == 'limit':
             # For simplicity, assuming a fixed price for limit orders
             price = self.get_price(coin, exchange_name) * 0.99  # 1% below the current price
-            order = exchange.create_limit_sell_order(coin, price, amount)
+            order = self._request(exchange_name, 'orders', exchange.create_limit_sell_order, coin, price, amount)
         else:
             raise ValueError(f'Unsupported order type: {order_type}')
         self.logger.info(f"Sold {amount} of {coin} on {exchange_name} using {order_type} order.")
         return order
 
-    def get_order_book(self, coin, exchange_name):
+    def get_order_book(self, coin, exchange_name, limit=None):
         exchange = self.exchanges.get(exchange_name)
         if not exchange:
             raise ValueError(f"Exchange {exchange_name} not found.")
-        order_book = exchange.fetch_order_book(coin)
+        if limit is None:
+            limit = self.config_manager.get_liquidity_config().get("order_book_limit")
+        order_book = self._request(exchange_name, 'market_data', exchange.fetch_order_book, coin, limit)
+        return order_book
+
+    def get_incremental_order_book(self, coin, exchange_name):
+        """Повертає стакан, що підтримується диференціями і ресинхронізується через get_order_book."""
+        from utility.order_book_file import IncrementalOrderBook
+
+        key = (coin, exchange_name)
+        order_book = self.order_books.get(key)
+        if order_book is None:
+            order_book = IncrementalOrderBook(
+                coin, exchange_name,
+                resync=lambda: self.get_order_book(coin, exchange_name),
+                resync_interval=self.config_manager.get_liquidity_config().get("order_book_resync_interval", 30)
+            )
+            order_book.resync_now()
+            self.order_books[key] = order_book
         return order_book
 
     def get_balance(self, exchange_name):
         exchange = self.exchanges.get(exchange_name)
         if not exchange:
             raise ValueError(f"Exchange {exchange_name} not found.")
-        balance = exchange.fetch_balance()
+        balance = self._request(exchange_name, 'account', exchange.fetch_balance)
         return balance
 
-    def get_all_prices(self, coin):
-        prices = {}
-        for exchange_name, exchange in self.exchanges.items():
-            price = self.get_price(coin, exchange_name)
-            prices[exchange_name] = price
+    def run_concurrently(self, calls, timeout=None):
+        """Виконує виклики паралельно і повертає результати тих, що встигли до дедлайну."""
+        if timeout is None:
+            timeout = self.fetch_timeout
+        futures = {key: self.executor.submit(func, *args) for key, (func, args) in calls.items()}
+        wait(futures.values(), timeout=timeout)
+
+        results = {}
+        for key, future in futures.items():
+            if not future.done():
+                # Запит продовжить виконуватись у фоні, але в результат не потрапить
+                self.logger.warning(f"Dropped {key}: no response within {timeout}s.")
+                continue
+            try:
+                results[key] = future.result()
+            except Exception as e:
+                self.logger.error(f"Error fetching {key}: {str(e)}")
+        return results
+
+    def get_all_prices(self, coin, timeout=None):
+        calls = {exchange_name: (self.get_price, (coin, exchange_name)) for exchange_name in self.exchanges}
+        return self.run_concurrently(calls, timeout)
+
+    def _get_answered_prices(self, coin, timeout=None):
+        # Якщо жодна біржа не відповіла до дедлайну, порівнювати нічого
+        prices = self.get_all_prices(coin, timeout)
+        if not prices:
+            self.logger.warning(f"No exchange returned a price for {coin} in time.")
         return prices
 
-    def compare_prices(self, coin):
-        prices = self.get_all_prices(coin)
+    def compare_prices(self, coin, timeout=None):
+        prices = self._get_answered_prices(coin, timeout)
+        if not prices:
+            return None
         best_buy = min(prices, key=prices.get)
         best_sell = max(prices, key=prices.get)
         return {'best_buy': best_buy, 'best_sell': best_sell}
 
-    def get_best_exchange_for_buy(self, coin):
-        prices = self.get_all_prices(coin)
-        return min(prices, key=prices.get)
+    def get_best_exchange_for_buy(self, coin, timeout=None):
+        prices = self._get_answered_prices(coin, timeout)
+        return min(prices, key=prices.get) if prices else None
 
-    def get_best_exchange_for_sell(self, coin):
-        prices = self.get_all_prices(coin)
-        return max(prices, key=prices.get)
+    def get_best_exchange_for_sell(self, coin, timeout=None):
+        prices = self._get_answered_prices(coin, timeout)
+        return max(prices, key=prices.get) if prices else None
     
+    def _fetch_tickers_batch(self, exchange_name, symbols):
+        exchange = self.exchanges[exchange_name]
+        try:
+            return self._request(exchange_name, 'market_data', exchange.fetch_tickers, symbols)
+        except Exception as e:
+            # Деякі біржі не приймають список символів - get_ticker_snapshots добере їх частинами
+            self.logger.warning(f"fetch_tickers failed on {exchange_name}, falling back to chunked fetch_ticker: {str(e)}")
+            return None
+
+    def _fetch_tickers_chunk(self, exchange_name, symbols):
+        exchange = self.exchanges[exchange_name]
+        tickers = {}
+        for symbol in symbols:
+            tickers[symbol] = self._request(exchange_name, 'market_data', exchange.fetch_ticker, symbol)
+        return tickers
+
+    def _chunk_calls(self, exchange_name, symbols, chunk_size):
+        return {
+            (exchange_name, index): (self._fetch_tickers_chunk, (exchange_name, symbols[index:index + chunk_size]))
+            for index in range(0, len(symbols), chunk_size)
+        }
+
+    def get_ticker_snapshots(self, symbols_by_exchange, timeout=None):
+        """Отримує знімки тікерів для кількох бірж мінімальною кількістю запитів."""
+        if timeout is None:
+            timeout = self.fetch_timeout
+        deadline = time.perf_counter() + timeout
+        chunk_size = self.config_manager.get_concurrency_config().get("snapshot_chunk_size", 10)
+        calls = {}
+        for exchange_name, symbols in symbols_by_exchange.items():
+            exchange = self.exchanges.get(exchange_name)
+            if not exchange:
+                raise ValueError(f"Exchange {exchange_name} not found.")
+            symbols = sorted(symbols)
+            if exchange.has.get('fetchTickers'):
+                calls[(exchange_name, 'batch')] = (self._fetch_tickers_batch, (exchange_name, symbols))
+            else:
+                calls.update(self._chunk_calls(exchange_name, symbols, chunk_size))
+
+        results = self.run_concurrently(calls, timeout)
+
+        # Біржі, що відхилили fetch_tickers, добираються тими ж паралельними частинами в межах дедлайну
+        fallback = {}
+        for key, tickers in list(results.items()):
+            if tickers is None:
+                del results[key]
+                fallback.update(self._chunk_calls(key[0], sorted(symbols_by_exchange[key[0]]), chunk_size))
+        if fallback:
+            results.update(self.run_concurrently(fallback, max(deadline - time.perf_counter(), 0)))
+
+        snapshots = {}
+        for exchange_name, symbols in symbols_by_exchange.items():
+            wanted = set(symbols)
+            quotes = {}
+            for (result_exchange, _), tickers in results.items():
+                if result_exchange != exchange_name:
+                    continue
+                for symbol, ticker in tickers.items():
+                    if symbol not in wanted or ticker.get('last') is None:
+                        continue
+                    quotes[symbol] = Quote(ticker['last'], ticker.get('bid'), ticker.get('ask'), ticker.get('timestamp'))
+                    self.cache.set(symbol, exchange_name, ticker['last'])
+            snapshots[exchange_name] = TickerSnapshot(exchange_name, time.time(), MappingProxyType(quotes))
+            self.logger.info(f"Fetched snapshot of {len(quotes)} tickers from {exchange_name}.")
+        return snapshots
+
+    def get_ticker_snapshot(self, exchange_name, symbols, timeout=None):
+        return self.get_ticker_snapshots({exchange_name: symbols}, timeout)[exchange_name]
+
     def get_common_currency_pairs(self, exchange_list):
         # 1. Отримання параметрів з config
         selected_assets = self.config_manager.get('currency_pairs', {}).get('selected_assets', [])
         top_n = self.config_manager.get('currency_pairs', {}).get('top_n', 10)
 
         common_pairs = {}
-        
-        # 2. Провірка на список
-        if selected_assets:
-            # Якщо список не пустий, повертаємо його
-            for i in range(len(exchange_list)):
-                for j in range(i+1, len(exchange_list)):
-                    pair_name = f'{exchange_list[i]}_{exchange_list[j]}'
-                    common_pairs[pair_name] = [pair for pair in selected_assets if pair in self.exchanges.get(exchange_list[i]).load_markets().keys() and pair in self.exchanges.get(exchange_list[j]).load_markets().keys()]
-        else:
-            # Якщо список пустий, заповнюємо його автоматично
-            for i in range(len(exchange_list)):
-                for j in range(i+1, len(exchange_list)):
-                    exchange_1 = self.exchanges.get(exchange_list[i])
-                    exchange_2 = self.exchanges.get(exchange_list[j])
-                    if not exchange_1 or not exchange_2:
-                        continue
-                    pairs_1 = set(exchange_1.load_markets().keys())
-                    pairs_2 = set(exchange_2.load_markets().keys())
-                    common = list(pairs_1.intersection(pairs_2))[:top_n]
-                    pair_name = f'{exchange_list[i]}_{exchange_list[j]}'
-                    common_pairs[pair_name] = common
+
+        for i in range(len(exchange_list)):
+            for j in range(i+1, len(exchange_list)):
+                if exchange_list[i] not in self.exchanges or exchange_list[j] not in self.exchanges:
+                    continue
+                # Перетин символів береться зі спільного сховища метаданих ринків
+                common = self.markets.get_common_symbols([exchange_list[i], exchange_list[j]])
+                pair_name = f'{exchange_list[i]}_{exchange_list[j]}'
+
+                # 2. Провірка на список
+                if selected_assets:
+                    # Якщо список не пустий, залишаємо з нього лише спільні пари
+                    common_pairs[pair_name] = [pair for pair in selected_assets if pair in common]
+                else:
+                    # Якщо список пустий, заповнюємо його автоматично
+                    common_pairs[pair_name] = sorted(common)[:top_n]
 
         return common_pairs
+
+    def get_symbol_venues(self, exchange_list):
+        """Повертає символ -> біржі, на яких він торгується, для будь-якої кількості бірж."""
+        selected_assets = self.config_manager.get('currency_pairs', {}).get('selected_assets', [])
+        top_n = self.config_manager.get('currency_pairs', {}).get('top_n', 10)
+
+        index = self.markets.get_symbol_venues([name for name in exchange_list if name in self.exchanges])
+        if selected_assets:
+            return {symbol: index[symbol] for symbol in selected_assets if symbol in index}
+        return {symbol: index[symbol] for symbol in sorted(index)[:top_n]}
+
+    def close(self):
+        self.markets.stop()
+        self.executor.shutdown(wait=False)
     
     def close_logger(self):
         for handler in self.logger.handlers:
@@ -154,51 +496,200 @@ class ExchangeAPI:
             self.logger.removeHandler(handler)
     
 class ArbitrageAnalyzer:
-    def __init__(self, exchange_api, config_manager):
+    def __init__(self, exchange_api, config_manager, top_of_book=None):
         self.logger = setup_class_logger(self.__class__.__name__)
         self.exchange_api = exchange_api
         self.config_manager = config_manager
+        # Якщо передано TopOfBookStore, котирування читаються з потоку, а не через REST
+        self.top_of_book = top_of_book
         self.arbitrage_config = config_manager.get_arbitrage_config()
+        self.cycle_detector = None
+        self.liquidity_engine = None
+        self.incremental_detector = None
+
+    def get_snapshots(self, symbols_by_exchange):
+        if self.top_of_book is not None:
+            return self.top_of_book.get_snapshots(symbols_by_exchange)
+        return self.exchange_api.get_ticker_snapshots(symbols_by_exchange)
+
+    def attach_incremental_detector(self, on_opportunity=None):
+        """Підписує інкрементальний детектор на TopOfBookStore: кожне оновлення перераховує лише свій символ."""
+        from utility.stream_file import IncrementalArbitrageDetector
+
+        if self.top_of_book is None:
+            raise ValueError("Incremental detection requires a top-of-book store.")
+        transaction_config = self.config_manager.get("transaction", {})
+        self.incremental_detector = IncrementalArbitrageDetector(
+            min_price_difference=self.arbitrage_config.get("min_price_difference", 0.01),
+            fee=transaction_config.get("fee", 0.001),
+            exchange_fees=transaction_config.get("exchange_fees", {}),
+            on_opportunity=on_opportunity,
+            max_quote_age=self.top_of_book.max_quote_age,
+            clock=self.top_of_book.clock
+        )
+        self.top_of_book.add_listener(self.incremental_detector.on_store_update)
+        return self.incremental_detector
 
     def find_opportunities(self, exchanges):
+        if self.arbitrage_config.get("engine") == "vectorized":
+            return self.find_opportunities_vectorized(exchanges)
+        if self.incremental_detector is not None:
+            # Можливості вже підтримуються детектором, повний перегляд не потрібен
+            return [opportunity for opportunity in self.incremental_detector.get_opportunities()
+                    if opportunity['buy_exchange'] in exchanges and opportunity['sell_exchange'] in exchanges]
+
         opportunities = []
-        common_pairs = self.exchange_api.get_common_currency_pairs(exchanges)
+        symbol_venues = self.exchange_api.get_symbol_venues(exchanges)
         min_price_difference = self.arbitrage_config.get("min_price_difference", 0.01)
-        
-        for pair, currencies in common_pairs.items():
-            for currency in currencies:
-                exchange_1, exchange_2 = pair.split('_')
-                price_1 = self.exchange_api.get_price(currency, exchange_1)
-                price_2 = self.exchange_api.get_price(currency, exchange_2)
-                if abs(price_1 - price_2) >= min_price_difference:
-                    if price_1 < price_2:
-                        opportunities.append({
-                            'buy_exchange': exchange_1,
-                            'sell_exchange': exchange_2,
-                            'currency': currency,
-                            'buy_price': price_1,
-                            'sell_price': price_2
-                        })
-                    else:
-                        opportunities.append({
-                            'buy_exchange': exchange_2,
-                            'sell_exchange': exchange_1,
-                            'currency': currency,
-                            'buy_price': price_2,
-                            'sell_price': price_1
-                        })
+
+        # Один пакетний знімок на біржу замість запиту на кожну пару (символ, біржа)
+        symbols_by_exchange = {}
+        for symbol, venues in symbol_venues.items():
+            for venue in venues:
+                symbols_by_exchange.setdefault(venue, set()).add(symbol)
+        snapshots = self.get_snapshots(symbols_by_exchange)
+
+        # Для кожного символу за один прохід шукаємо найдешевшу та найдорожчу біржу
+        for symbol, venues in symbol_venues.items():
+            buy_exchange = sell_exchange = None
+            buy_price = sell_price = None
+            for venue in venues:
+                price = snapshots[venue].get_price(symbol)
+                if price is None:
+                    continue
+                if buy_price is None or price < buy_price:
+                    buy_exchange, buy_price = venue, price
+                if sell_price is None or price > sell_price:
+                    sell_exchange, sell_price = venue, price
+
+            if buy_exchange is None or buy_exchange == sell_exchange:
+                continue
+            if sell_price - buy_price >= min_price_difference:
+                opportunities.append({
+                    'buy_exchange': buy_exchange,
+                    'sell_exchange': sell_exchange,
+                    'currency': symbol,
+                    'buy_price': buy_price,
+                    'sell_price': sell_price
+                })
 
         self.logger.info(f"Found {len(opportunities)} arbitrage opportunities.")
         return opportunities
 
+    def find_opportunities_vectorized(self, exchanges):
+        # numpy потрібен лише для векторизованого рушія
+        from utility.scanner_file import VectorizedScanner
+
+        symbol_venues = self.exchange_api.get_symbol_venues(exchanges)
+        symbols = sorted(symbol_venues)
+        venues = [name for name in exchanges if name in self.exchange_api.exchanges]
+
+        symbols_by_exchange = {name: [] for name in venues}
+        for symbol, listed_on in symbol_venues.items():
+            for venue in listed_on:
+                symbols_by_exchange[venue].append(symbol)
+        snapshots = self.get_snapshots(symbols_by_exchange)
+
+        transaction_config = self.config_manager.get("transaction", {})
+        scanner = VectorizedScanner(
+            venues,
+            symbols,
+            fee=transaction_config.get("fee", 0.001),
+            exchange_fees=transaction_config.get("exchange_fees", {})
+        )
+        scanner.load_snapshots(snapshots)
+        opportunities = scanner.scan(
+            min_price_difference=self.arbitrage_config.get("min_price_difference", 0.01),
+            min_edge=self.arbitrage_config.get("min_edge", 0.0)
+        )
+
+        self.logger.info(f"Found {len(opportunities)} arbitrage opportunities across {len(venues)} exchanges and {len(symbols)} symbols.")
+        return opportunities
+
+    def find_cycle_opportunities(self, exchanges):
+        """Шукає циклічний (трикутний) арбітраж на кожній біржі та між біржами."""
+        from utility.cycle_file import CurrencyGraph, CycleDetector
+
+        cycles_config = self.config_manager.get_cycles_config()
+        if self.cycle_detector is None:
+            transaction_config = self.config_manager.get("transaction", {})
+            graph = CurrencyGraph(
+                fee=transaction_config.get("fee", 0.001),
+                exchange_fees=transaction_config.get("exchange_fees", {}),
+                transfer_cost=cycles_config.get("transfer_cost", 0.001),
+                cross_exchange=cycles_config.get("cross_exchange", True)
+            )
+            self.cycle_detector = CycleDetector(
+                graph,
+                time_budget=cycles_config.get("time_budget", 0.003),
+                max_relaxations=cycles_config.get("max_relaxations", 100000),
+                min_profit=cycles_config.get("min_profit", 0.0)
+            )
+
+        venues = [name for name in exchanges if name in self.exchange_api.exchanges]
+        symbols_by_exchange = {name: self.exchange_api.markets.get_symbols(name) for name in venues}
+        markets_by_exchange = {name: self.exchange_api.markets.get_markets(name) for name in venues}
+        snapshots = self.get_snapshots(symbols_by_exchange)
+
+        # Граф і відстані зберігаються між викликами, тому переглядаються лише змінені ребра
+        self.cycle_detector.graph.load_snapshots(snapshots, markets_by_exchange)
+        cycles = self.cycle_detector.scan()
+
+        stats = self.cycle_detector.last_scan_stats
+        self.logger.info(f"Found {len(cycles)} cyclic arbitrage opportunities in {stats['elapsed'] * 1000:.2f} ms ({stats['relaxations']} relaxations).")
+        return cycles
+
     def estimate_transaction_fees(self, opportunity):
         transaction_fee = self.config_manager.get_transaction_fee()
         return transaction_fee * opportunity['buy_price']
 
     def filter_liquid_markets(self, opportunities):
-        # Placeholder for filtering based on market liquidity
-        # For now, returning all opportunities
-        return opportunities
+        # Розмір кожної можливості визначається проходом по стаканах обох бірж
+        from utility.liquidity_file import LiquidityEngine
+
+        if not opportunities:
+            return []
+        if self.liquidity_engine is None:
+            transaction_config = self.config_manager.get("transaction", {})
+            self.liquidity_engine = LiquidityEngine(
+                fee=transaction_config.get("fee", 0.001),
+                exchange_fees=transaction_config.get("exchange_fees", {})
+            )
+
+        liquidity_config = self.config_manager.get_liquidity_config()
+        min_trade_amount = liquidity_config.get("min_trade_amount", 0.0)
+        calls = {}
+        for opportunity in opportunities:
+            for exchange_name in (opportunity['buy_exchange'], opportunity['sell_exchange']):
+                calls[(opportunity['currency'], exchange_name)] = (self.exchange_api.get_order_book, (opportunity['currency'], exchange_name))
+        order_books = self.exchange_api.run_concurrently(calls)
+
+        liquid_opportunities = []
+        for opportunity in opportunities:
+            buy_order_book = order_books.get((opportunity['currency'], opportunity['buy_exchange']))
+            sell_order_book = order_books.get((opportunity['currency'], opportunity['sell_exchange']))
+            if buy_order_book is None or sell_order_book is None:
+                continue
+            sizing = self.liquidity_engine.size_opportunity(
+                buy_order_book,
+                sell_order_book,
+                buy_exchange=opportunity['buy_exchange'],
+                sell_exchange=opportunity['sell_exchange'],
+                max_amount=opportunity.get('amount')
+            )
+            if sizing['amount'] <= min_trade_amount or sizing['profit'] <= 0:
+                continue
+            liquid_opportunity = dict(opportunity)
+            liquid_opportunity.update({
+                'amount': sizing['amount'],
+                'buy_vwap': sizing['buy_vwap'],
+                'sell_vwap': sizing['sell_vwap'],
+                'expected_profit': sizing['profit']
+            })
+            liquid_opportunities.append(liquid_opportunity)
+
+        self.logger.info(f"{len(liquid_opportunities)} of {len(opportunities)} opportunities are profitable after walking the order books.")
+        return liquid_opportunities
 
     def calculate_profit(self, opportunity):
         buy_price = opportunity['buy_price']
@@ -231,11 +722,26 @@ class ArbitrageAnalyzer:
             self.logger.removeHandler(handler)
 
 class TransactionManager:
-    def __init__(self, exchange_api):
+    def __init__(self, exchange_api, config_manager=None):
+        # Без exchange_api (відтворення історії) конфігурацію передають напряму
         self.exchange_api = exchange_api
         self.logger = setup_class_logger(self.__class__.__name__)
+        if config_manager is None:
+            config_manager = self.exchange_api.config_manager
+        self.execution_config = config_manager.get_execution_config()
+        # Окремий пул, щоб ордери не чекали в черзі за запитами ринкових даних.
+        # Кожна угода займає два потоки, тож завислі сторони однієї угоди не блокують наступні
+        self.executor = ThreadPoolExecutor(
+            max_workers=max(self.execution_config.get("max_workers", 8), 2),
+            thread_name_prefix="TransactionManager"
+        )
+
+    def execute_trade(self, opportunity, mode=None):
+        if mode is None:
+            mode = self.execution_config.get("mode", "sequential")
+        if mode == "concurrent":
+            return self.execute_trade_concurrent(opportunity)
 
-    def execute_trade(self, opportunity):
         # Виконуємо купівлю на біржі з найнижчою ціною
         buy_order = self.exchange_api.buy(
             opportunity['currency'], 
@@ -257,9 +763,87 @@ class TransactionManager:
             'sell_order': sell_order
         }
 
+    def _timed_leg(self, func, *args):
+        started_at = time.perf_counter()
+        order = func(*args)
+        return order, time.perf_counter() - started_at
+
+    def _unwind_leg(self, side, opportunity):
+        # Закриваємо виконану сторону протилежним ордером на тій самій біржі
+        if side == 'buy':
+            return self.exchange_api.sell(opportunity['currency'], opportunity['amount'], opportunity['buy_exchange'])
+        return self.exchange_api.buy(opportunity['currency'], opportunity['amount'], opportunity['sell_exchange'])
+
+    def _unwind_late_leg(self, side, opportunity, future):
+        if future.cancelled() or future.exception() is not None:
+            return
+        self.logger.warning(f"Late {side} leg for {opportunity['currency']} filled after timeout, unwinding it.")
+        try:
+            self._unwind_leg(side, opportunity)
+        except Exception as e:
+            self.logger.error(f"Failed to unwind late {side} leg for {opportunity['currency']}: {str(e)}")
+
+    def execute_trade_concurrent(self, opportunity, leg_timeout=None):
+        """Відправляє обидві сторони угоди одночасно і відкочує виконану сторону, якщо інша не вдалася."""
+        if leg_timeout is None:
+            leg_timeout = self.execution_config.get("leg_timeout", 10)
+
+        futures = {
+            'buy': self.executor.submit(self._timed_leg, self.exchange_api.buy, opportunity['currency'], opportunity['amount'], opportunity['buy_exchange']),
+            'sell': self.executor.submit(self._timed_leg, self.exchange_api.sell, opportunity['currency'], opportunity['amount'], opportunity['sell_exchange'])
+        }
+        deadline = time.perf_counter() + leg_timeout
+
+        orders = {}
+        latency = {}
+        errors = {}
+        pending_legs = {}
+        for side, future in futures.items():
+            try:
+                orders[side], latency[side] = future.result(timeout=max(deadline - time.perf_counter(), 0))
+            except FuturesTimeoutError:
+                # Сторона, що ще чекає в черзі, скасовується і не дійде до біржі
+                if future.cancel():
+                    errors[side] = f"cancelled before sending after {leg_timeout}s"
+                    continue
+                errors[side] = f"timed out after {leg_timeout}s"
+                pending_legs[side] = future
+                future.add_done_callback(lambda late, side=side: self._unwind_late_leg(side, opportunity, late))
+            except Exception as e:
+                errors[side] = str(e)
+
+        result = {
+            'buy_order': orders.get('buy'),
+            'sell_order': orders.get('sell'),
+            'latency': latency,
+            'errors': errors,
+            'unwind_orders': {},
+            # Сторони, що ще виконуються: відкотяться після завершення
+            'pending_legs': pending_legs
+        }
+
+        if not errors:
+            result['status'] = 'filled'
+            self.logger.info(f"Executed concurrent trade: Buy {opportunity['currency']} on {opportunity['buy_exchange']} and sell on {opportunity['sell_exchange']}. Latency: {latency}")
+            return result
+
+        for side in orders:
+            try:
+                result['unwind_orders'][side] = self._unwind_leg(side, opportunity)
+            except Exception as e:
+                errors[f'unwind_{side}'] = str(e)
+        if pending_legs:
+            result['status'] = 'unwinding'
+        else:
+            result['status'] = 'unwound' if orders else 'failed'
+        self.logger.error(f"Concurrent trade for {opportunity['currency']} failed: {errors}. Status: {result['status']}")
+        return result
+
     def log_transaction(self, transaction):
         self.logger.info(f"Executed BUY order: {transaction['buy_order']}")
         self.logger.info(f"Executed SELL order: {transaction['sell_order']}")
+        if 'latency' in transaction:
+            self.logger.info(f"Leg latency: {transaction['latency']}")
 
     def get_best_opportunity(self, opportunities):
         # Вибираємо найкращу можливість на основі різниці в цінах
@@ -288,38 +872,92 @@ class TransactionManager:
         self.log_transaction(transaction)
         return transaction
     
+    def close(self):
+        self.executor.shutdown(wait=True)
+
     def close_logger(self):
         for handler in self.logger.handlers:
             handler.close()
             self.logger.removeHandler(handler)
 
 class DataManager:
-    def __init__(self, data_file="price_data.json"):
+    def __init__(self, data_dir="price_data", segment_records=1000000, index_stride=4096, bar_cache_size=64):
+        from utility.tick_store_file import TickStore
+
         self.logger = setup_class_logger(self.__class__.__name__)
-        self.data_file = data_file
-        if not os.path.exists(self.data_file):
-            with open(self.data_file, 'w') as file:
-                json.dump({}, file)
-
-    def store_price_data(self, data):
-        """Зберігає історію цін."""
-        with open(self.data_file, 'r') as file:
-            existing_data = json.load(file)
+        self.data_dir = data_dir
+        self.store = TickStore(self.data_dir, segment_records, index_stride, bar_cache_size)
+
+    @classmethod
+    def from_config(cls, config_manager):
+        """Створює DataManager з секції tick_store конфігурації."""
+        config = config_manager.get_tick_store_config()
+        return cls(
+            data_dir=config.get("data_dir", "price_data"),
+            segment_records=config.get("segment_records", 1000000),
+            index_stride=config.get("index_stride", 4096),
+            bar_cache_size=config.get("bar_cache_size", 64)
+        )
+
+    def store_price_data(self, data, exchange_name=None, timestamp=None):
+        """Дописує ціни {coin: price} або {coin: {exchange: price}} у сховище тіків."""
+        if timestamp is None:
+            timestamp = time.time()
+        for coin, value in data.items():
+            if isinstance(value, dict):
+                for exchange, price in value.items():
+                    self.store.append(exchange, coin, timestamp, price)
+            else:
+                self.store.append(exchange_name, coin, timestamp, value)
         self.logger.info(f"Stored price data for {len(data)} coins.")
-        
-        # Оновлюємо існуючі дані новими
-        existing_data.update(data)
-        
-        with open(self.data_file, 'w') as file:
-            json.dump(existing_data, file)
 
-    def get_price_history(self, coin):
-        """Отримує історію цін валюти."""
-        with open(self.data_file, 'r') as file:
-            data = json.load(file)
+    def store_snapshot(self, snapshot):
+        """Дописує всі котирування TickerSnapshot однієї біржі."""
+        for symbol, quote in snapshot.quotes.items():
+            timestamp = quote.timestamp / 1000 if quote.timestamp else snapshot.timestamp
+            self.store.append(
+                snapshot.exchange, symbol, timestamp,
+                quote.last if quote.last is not None else float('nan'),
+                quote.bid if quote.bid is not None else float('nan'),
+                quote.ask if quote.ask is not None else float('nan')
+            )
+        self.logger.info(f"Stored snapshot for {len(snapshot.quotes)} symbols from {snapshot.exchange}.")
+
+    def get_price_history(self, coin, exchange_name=None, start=None, end=None, interval=None):
+        """Отримує історію цін валюти за [start, end]; з interval - свічки OHLCV замість тіків.
+
+        Без exchange_name повертається історія з усіх бірж, злита за часом.
+        """
+        from utility.tick_store_file import aggregate_ohlcv
+
+        if exchange_name is None:
+            history = self.store.query_symbol(coin, start, end)
+            if interval is not None:
+                history = aggregate_ohlcv(history, interval)
+        elif interval is not None:
+            history = self.store.ohlcv(exchange_name, coin, interval, start, end)
+        else:
+            history = self.store.query(exchange_name, coin, start, end)
         self.logger.info(f"Fetched price history for {coin}.")
-        return data.get(coin, [])
-    
+        return history
+
+    def query_history(self, coins=None, exchanges=None, start=None, end=None, interval=None):
+        """Історія цін для кількох валют і бірж: {(exchange, coin): масив}."""
+        history = {}
+        for exchange, coin in self.store.list_series():
+            if coins is not None and coin not in coins:
+                continue
+            if exchanges is not None and exchange not in exchanges:
+                continue
+            history[(exchange, coin)] = self.get_price_history(coin, exchange, start, end, interval)
+        return history
+
+    def get_venues(self, coin):
+        return [exchange for exchange, symbol in self.store.list_series() if symbol == coin]
+
+    def close(self):
+        self.store.close()
+
     def close_logger(self):
         for handler in self.logger.handlers:
             handler.close()
@@ -403,6 +1041,42 @@ class ConfigManager:
     def get_arbitrage_config(self):
         return self.get("arbitrage", {})
 
+    def get_cache_config(self):
+        return self.get("cache", {})
+
+    def get_markets_config(self):
+        return self.get("markets", {})
+
+    def get_tick_store_config(self):
+        return self.get("tick_store", {})
+
+    def get_concurrency_config(self):
+        return self.get("concurrency", {})
+
+    def get_cycles_config(self):
+        return self.get("cycles", {})
+
+    def get_liquidity_config(self):
+        return self.get("liquidity", {})
+
+    def get_execution_config(self):
+        return self.get("execution", {})
+
+    def get_rate_limits_config(self):
+        return self.get("rate_limits", {})
+
+    def get_streaming_config(self):
+        return self.get("streaming", {})
+
+    def get_backtest_config(self):
+        return self.get("backtest", {})
+
+    def get_latency_config(self):
+        return self.get("latency", {})
+
+    def get_valuation_config(self):
+        return self.get("valuation", {})
+
     def get_currency_pairs_config(self):
         return self.get("currency_pairs", {})
     
@@ -426,82 +1100,144 @@ class SimulationTrading:
         self.transaction_manager = transaction_manager
         self.conversion_prices = {}
         self.initial_balance = initial_balance
-        self.exchanges = None
+        # numpy потрібен лише для симуляції
+        from utility.ledger_file import BalanceLedger
+        from utility.latency_file import LatencyModel, VirtualClock
+
+        self.ledger = BalanceLedger()
+        # Під час бектесту ціни читаються з відтворюваного TopOfBookStore за віртуальним годинником
+        self.top_of_book = None
+        self.quote_at = None
+        self.clock = VirtualClock()
+        self.latency_model = LatencyModel.from_config(self.arbitrage_analyzer.config_manager.get_latency_config())
+        self.valuation = self._create_valuation()
         self.logger.info("SimulationTrading initiated with an honorable balance: %s", initial_balance)
 
-    def create_balance(self):
-        self.logger.info("Convert start balacne: %s", self.initial_balance)
-        exchange_balances = {}
-        exchange_list = list(self.exchange_api.exchanges.keys())
+    @property
+    def exchanges(self):
+        """Баланси у вигляді {біржа: {валюта: сума}} лише для читання; змінюються тільки через ledger."""
+        return MappingProxyType({
+            venue: MappingProxyType(balances) for venue, balances in self.ledger.to_dict().items()
+        })
+
+    def bind_replay(self, top_of_book, clock, quote_at=None):
+        """quote_at(exchange, symbol, timestamp) повертає (bid, ask) з відтворюваних даних на будь-який момент."""
+        from utility.latency_file import VirtualClock
+
+        self.top_of_book = top_of_book
+        self.clock = clock or VirtualClock()
+        self.quote_at = quote_at
+        self.valuation = self._create_valuation()
+
+    def _create_valuation(self):
+        from utility.valuation_file import ValuationService
+
+        valuation_config = self.arbitrage_analyzer.config_manager.get_valuation_config()
+        if self.top_of_book is not None:
+            snapshot_source, symbols_source = self.top_of_book.get_snapshots, self.top_of_book.get_symbols
+        elif self.exchange_api is not None:
+            snapshot_source, symbols_source = self.exchange_api.get_ticker_snapshots, self.exchange_api.markets.get_symbols
+        else:
+            # Симуляція без біржових клієнтів оцінює портфель лише після bind_replay
+            return None
+        return ValuationService(
+            snapshot_source,
+            symbols_source,
+            quote=valuation_config.get("quote", "USDT"),
+            intermediates=valuation_config.get("intermediates", ["BTC", "ETH", "USDC"])
+        )
+
+    def get_conversion_rates(self, currencies_by_exchange):
+        """Курси валют у USDT одним пакетним знімком на біржу; помилка, якщо валюту неможливо оцінити."""
+        rates = self.valuation.get_rates(currencies_by_exchange)
+        for exchange, currencies in rates.items():
+            for currency, rate in currencies.items():
+                if rate is None:
+                    raise ValueError(f"No USDT conversion path for {currency} on {exchange}.")
+        return rates
+
+    def get_price(self, symbol, exchange):
+        if self.top_of_book is None:
+            return self.exchange_api.get_price(symbol, exchange)
+        entry = self.top_of_book.get(exchange, symbol)
+        if entry is None:
+            return None
+        if entry['last'] is not None:
+            return entry['last']
+        if entry['bid'] is None or entry['ask'] is None:
+            # Односторонній стакан: беремо наявну сторону або None, якщо порожньо
+            return entry['ask'] if entry['bid'] is None else entry['bid']
+        return (entry['bid'] + entry['ask']) / 2
 
-        common_pairs_dict = self.exchange_api.get_common_currency_pairs(exchange_list)
-        currency_pairs = []
+    def create_balance(self, exchange_list=None, currency_pairs=None):
+        from utility.ledger_file import BalanceLedger
 
-        for pairs in common_pairs_dict.values():
-            currency_pairs.extend(pairs)
+        self.logger.info("Convert start balacne: %s", self.initial_balance)
+        if exchange_list is None:
+            exchange_list = list(self.exchange_api.exchanges.keys())
+
+        if currency_pairs is None:
+            currency_pairs = list(self.exchange_api.get_symbol_venues(exchange_list))
+
+        main_currencies = []
+        for pair in currency_pairs:
+            base_currency, quote_currency = pair.split('/')
+
+            # Визначаємо, яка валюта є "основною"
+            if quote_currency in ["USDT", "USD"]:
+                main_currency = base_currency
+            elif base_currency in ["USDT", "USD"]:
+                main_currency = quote_currency
+            else:
+                main_currency = base_currency
+            main_currencies.append(main_currency)
+
+        # Ціни всіх основних валют - одним знімком на біржу, а не запитом на кожну пару
+        rates = self.get_conversion_rates({
+            exchange: {currency for currency in main_currencies if currency != "USDT"}
+            for exchange in exchange_list
+        })
 
         balance_for_conversion = (2/3) * self.initial_balance  # 2/3 від початкового балансу для конвертації
         balance_remaining = (1/3) * self.initial_balance  # 1/3 від початкового балансу залишається
         portion_balance = balance_for_conversion / len(currency_pairs)
 
+        ledger = BalanceLedger(exchange_list)
         for exchange in exchange_list:
-            balances = {}
-            
-            for pair in currency_pairs:
-                base_currency, quote_currency = pair.split('/')
-
-                # Визначаємо, яка валюта є "основною"
-                if quote_currency in ["USDT", "USD"]:
-                    main_currency = base_currency
-                elif base_currency in ["USDT", "USD"]:
-                    main_currency = quote_currency
-                else:
-                    main_currency = base_currency
+            ledger.set(exchange, BalanceLedger.CASH, balance_remaining)
 
-                # Тепер отримуємо ціну для "основної" валюти відносно USD
+            for main_currency in main_currencies:
+                # Ціна "основної" валюти відносно USDT
                 if main_currency != "USDT":
-                    main_price = self.exchange_api.get_price(main_currency + "/USDT", exchange)
+                    main_price = rates[exchange][main_currency]
                     if exchange not in self.conversion_prices:
                         self.conversion_prices[exchange] = {}
                     self.conversion_prices[exchange][main_currency] = main_price
                     main_amount = portion_balance / main_price
-                    balances[main_currency] = balances.get(main_currency, 0) + main_amount
+                    ledger.add(exchange, main_currency, main_amount)
 
+        self.ledger = ledger
 
-            final_balances = {"balance": balance_remaining}
-            final_balances.update(balances)
-            exchange_balances[exchange] = final_balances
-            self.exchanges = exchange_balances
+    def get_conversion_prices(self):
+        """Матриця цін [біржа, валюта] в USDT для всіх ненульових балансів ledger."""
+        rates = self.get_conversion_rates(self.ledger.held_assets())
+        return self.ledger.price_matrix(lambda exchange, currency: rates[exchange][currency])
 
     def revert_to_dollars(self):
         self.logger.info("Convert to dollars")
-        for exchange, balances in self.exchanges.items():
-            initial_balance = balances["balance"]  # Зберігаємо початковий баланс
-            total_converted = 0  # Сума, яку ми конвертуємо в інші валюти
-
-            for currency, amount in balances.items():
-                if currency != "balance":
-                    # Отримуємо актуальну ціну для конвертації
-                    conversion_price = self.exchange_api.get_price(currency + "/USDT", exchange)
-                    total_converted += amount * conversion_price  # Додаємо до загальної суми
-
-            # Відновлюємо баланс
-            balances["balance"] = initial_balance + total_converted
-            for currency in balances:
-                if currency != "balance":
-                    balances[currency] = 0  # Зануляємо баланс валюти після конвертації
-                    
+        # Усі валюти всіх бірж конвертуються одним векторним кроком
+        self.ledger.convert_all_to_cash(self.get_conversion_prices())
         return self.exchanges
     
     def convert_coin(self, coin, exchange, balance_coin):
-        currency = self.exchange_api.get_price(coin, exchange)
+        currency = self.get_price(coin, exchange)
         
         suma_balance = (balance_coin / currency)
 
         resoult = [coin]
         resoult.append(suma_balance)
 
-        self.exchanges[exchange]["balance"] -= balance_coin
+        self.ledger.add(exchange, self.ledger.CASH, -balance_coin)
 
         return resoult
     
@@ -520,22 +1256,7 @@ class SimulationTrading:
             self.logger.warning("No arbitrage opportunities found.")
 
         op = self.transaction_manager.get_best_opportunity(opportunities)
-        
-        # Симулюємо покупку
-        balance_exchenges = self.get_exchange_balance(op["buy_exchange"])
-        buy_amount_coin = self.arbitrage_analyzer.calculate_trade_amount(op, balance_exchenges)
-        buy_amount_usdt = self.convert_to_usd( buy_amount_coin, op["buy_price"])
-        self.logger.info(f"USDT buy {buy_amount_usdt} coin {op['currency']}")
-        self.logger.info(f"Simulating buying {buy_amount_usdt} {op['currency']} on {op['buy_exchange']} at price {op['buy_price']} USDT.")
-        self.simulate_buy(op['currency'], buy_amount_usdt, op)
-        
-        # Симулюємо продаж
-        balance_exchenges_sell = self.get_exchange_balance(op["sell_exchange"])
-        sell_amount_coin = self.arbitrage_analyzer.calculate_trade_amount(op, balance_exchenges_sell)
-        sell_amount_usdt = self.convert_to_usd(sell_amount_coin, op["sell_price"])
-        self.logger.info(f"USDT sell {sell_amount_usdt} coin {op['currency']}")
-        self.logger.info(f"Simulating selling {sell_amount_usdt} {op['currency']} on {op['sell_exchange']} at price {op['sell_price']} USDT.")
-        self.simulate_sell(op['currency'], sell_amount_usdt, op)
+        self.execute_opportunity(op)
 
         self.revert_to_dollars()
 
@@ -548,17 +1269,57 @@ class SimulationTrading:
         self.logger.info(f"Balance bitstamp exchange {bitstamp}")
         self.logger.info(f"All balance {bybit + bitstamp}")
 
-    def simulate_buy(self, currency_pair, usd_amount, opportunities):
+    def run_backtest(self, tick_store, exchanges, symbols, start=None, end=None):
+        """Відтворює записані тіки без мережі і повертає статистику прогону."""
+        from utility.backtest_file import BacktestEngine
+
+        backtest_config = self.arbitrage_analyzer.config_manager.get_backtest_config()
+        engine = BacktestEngine(
+            self, tick_store, exchanges, symbols, start, end,
+            trade_cooldown=backtest_config.get("trade_cooldown", 1.0),
+            max_quote_age=backtest_config.get("max_quote_age")
+        )
+        return engine.run()
+
+    def execute_opportunity(self, op):
+        """Симулює обидві ноги угоди; повертає True, якщо виконано хоча б одну з них."""
+        # Симулюємо покупку; сума обмежується наявними USDT на біржі купівлі
+        balance_exchenges = self.get_exchange_balance(op["buy_exchange"])
+        buy_amount_coin = self.arbitrage_analyzer.calculate_trade_amount(op, balance_exchenges)
+        buy_amount_usdt = min(self.convert_to_usd(buy_amount_coin, op["buy_price"]), balance_exchenges)
+        self.logger.info(f"USDT buy {buy_amount_usdt} coin {op['currency']}")
+        self.logger.info(f"Simulating buying {buy_amount_usdt} {op['currency']} on {op['buy_exchange']} at price {op['buy_price']} USDT.")
+        bought = self.simulate_buy(op['currency'], buy_amount_usdt, op)
+
+        # Симулюємо продаж; кількість обмежується монетами, наявними на біржі продажу
+        balance_exchenges_sell = self.get_exchange_balance(op["sell_exchange"])
+        sell_amount_coin = self.arbitrage_analyzer.calculate_trade_amount(op, balance_exchenges_sell)
+        sell_amount_coin = min(sell_amount_coin, self.get_currency_balance(op["sell_exchange"], self._main_currency(op['currency'])))
+        sell_amount_usdt = self.convert_to_usd(sell_amount_coin, op["sell_price"])
+        self.logger.info(f"USDT sell {sell_amount_usdt} coin {op['currency']}")
+        self.logger.info(f"Simulating selling {sell_amount_usdt} {op['currency']} on {op['sell_exchange']} at price {op['sell_price']} USDT.")
+        sold = self.simulate_sell(op['currency'], sell_amount_usdt, op)
+        return bought or sold
+
+    @staticmethod
+    def _main_currency(currency_pair):
         base_currency, quote_currency = currency_pair.split('/')
-        exchange = opportunities['buy_exchange']
-        
         if quote_currency in ["USDT", "USD"]:
-            main_currency = base_currency
-        else:
-            main_currency = quote_currency
+            return base_currency
+        return quote_currency
+
+    def simulate_buy(self, currency_pair, usd_amount, opportunities):
+        exchange = opportunities['buy_exchange']
+        main_currency = self._main_currency(currency_pair)
+
+        # Купівля не може витратити більше USDT, ніж є на біржі
+        usd_amount = min(usd_amount, self.get_exchange_balance(exchange))
+        if usd_amount <= 0:
+            self.logger.info(f"Skip buying {main_currency} on {exchange}: trade size {usd_amount} USDT.")
+            return False
 
-        time.sleep(random.uniform(0.05, 0.5))
-        buy_price = opportunities['buy_price']
+        self.wait_for_fill(exchange, 'buy')
+        buy_price = self.get_fill_price(currency_pair, exchange, 'buy', opportunities['buy_price'])
         commission = 0.0025
         max_commission = 5  # Максимальна комісія в USDT
 
@@ -567,35 +1328,74 @@ class SimulationTrading:
         bought_currency_amount = amount_after_commission_usdt / buy_price
 
         # Оновлення балансу валюти та USDT
-        self.exchanges[exchange][main_currency] += bought_currency_amount
-        self.exchanges[exchange]['balance'] -= usd_amount
+        self.ledger.add(exchange, main_currency, bought_currency_amount)
+        self.ledger.add(exchange, self.ledger.CASH, -usd_amount)
         self.logger.info(f"Buy {bought_currency_amount} {main_currency} by {amount_after_commission_usdt} USDT on {exchange}. Commission: {commission_amount_usdt} USDT")
+        return True
 
     def simulate_sell(self, currency_pair, usd_amount, opportunities):
-        base_currency, quote_currency = currency_pair.split('/')
         exchange = opportunities['sell_exchange']
-        
-        if quote_currency in ["USDT", "USD"]:
-            main_currency = base_currency
-        else:
-            main_currency = quote_currency
-
-        time.sleep(random.uniform(0.05, 0.5))
-        sell_price = opportunities['sell_price']
+        main_currency = self._main_currency(currency_pair)
+        if usd_amount <= 0:
+            self.logger.info(f"Skip selling {main_currency} on {exchange}: trade size {usd_amount} USDT.")
+            return False
+
+        self.wait_for_fill(exchange, 'sell')
+        sell_price = self.get_fill_price(currency_pair, exchange, 'sell', opportunities['sell_price'])
+        # Після затримки ціна могла впасти - продаємо не більше монет, ніж є на біржі
+        sold_currency_amount = min(usd_amount / sell_price, self.get_currency_balance(exchange, main_currency))
+        if sold_currency_amount <= 0:
+            self.logger.info(f"Skip selling {main_currency} on {exchange}: no {main_currency} balance.")
+            return False
+        usd_amount = sold_currency_amount * sell_price
         commission = 0.0025
         max_commission = 5  # Максимальна комісія в USDT
 
+        # Комісія утримується з виручки, як і при купівлі - з витраченої суми
         commission_amount_usdt = min(usd_amount * commission, max_commission)
         amount_after_commission_usdt = usd_amount - commission_amount_usdt
-        sold_currency_amount = amount_after_commission_usdt / sell_price
 
         # Оновлення балансу валюти та USDT
-        self.exchanges[exchange][main_currency] -= sold_currency_amount
-        self.exchanges[exchange]['balance'] += usd_amount
+        self.ledger.add(exchange, main_currency, -sold_currency_amount)
+        self.ledger.add(exchange, self.ledger.CASH, amount_after_commission_usdt)
         self.logger.info(f"Sell {sold_currency_amount} {main_currency} by {amount_after_commission_usdt} USDT on {exchange}. Commission: {commission_amount_usdt} USDT")
+        return True
+
+    def wait_for_fill(self, exchange, leg):
+        # Затримка виконання пересуває віртуальний годинник, реальний час не витрачається
+        latency = self.latency_model.sample(exchange, leg)
+        self.clock.sleep(latency)
+        return latency
+
+    def get_fill_price(self, currency_pair, exchange, leg, quoted_price):
+        """Ціна виконання на момент після затримки: ask для купівлі, bid для продажу."""
+        if self.quote_at is None:
+            return quoted_price
+        quote = self.quote_at(exchange, currency_pair, self.clock.now())
+        if quote is None:
+            return quoted_price
+        return quote[1] if leg == 'buy' else quote[0]
+
+    def get_total_balance(self):
+        return float(self.ledger.view()[:, self.ledger.asset_ids[self.ledger.CASH]].sum())
+
+    def get_portfolio_value(self):
+        """Вартість усіх балансів у USDT за поточними цінами, без конвертації."""
+        return float(self.ledger.mark_to_market(self.get_conversion_prices()).sum())
+
+    def snapshot_balances(self):
+        return self.ledger.snapshot()
+
+    def restore_balances(self, snapshot):
+        self.ledger.restore(snapshot)
 
     def get_currency_balance(self, exchange_name, currency):
-        return self.exchanges.get(exchange_name, {}).get(currency, 0)
+        return self.ledger.get(exchange_name, currency)
 
     def get_exchange_balance(self, exchange_name):
-        return self.exchanges.get(exchange_name, {}).get("balance", 0)
+        return self.ledger.get(exchange_name, self.ledger.CASH)
+
+    def close_logger(self):
+        for handler in self.logger.handlers:
+            handler.close()
+            self.logger.removeHandler(handler)
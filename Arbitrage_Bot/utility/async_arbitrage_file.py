@@ -3,6 +3,7 @@ import json
 import ccxt.async_support as ccxt_async
 import ccxt
 import asyncio
+import aiohttp
 
 class ConfigManager:
     def __init__(self, config_path: str):
@@ -49,133 +50,427 @@ class ConfigManager:
     def get_risk_parameters(self):
         """Повертає ризикові параметри з конфігураційного файлу."""
         return self.config_data.get("risk_parameters", {})
+
+    def get_rate_limits(self) -> dict:
+        """Повертає параметри клієнтського обмеження запитів зі спільного config.json."""
+        from utility.rate_limit_file import load_rate_limits_config
+        return load_rate_limits_config()
+
+    def get_client_pool_params(self) -> dict:
+        """Повертає параметри пулу з'єднань з біржами."""
+        return self.config_data.get("client_pool", {})
+
+    def get_order_tracking_params(self) -> dict:
+        """Повертає параметри відстеження виконання ордерів."""
+        return self.config_data.get("order_tracking", {})
     
     def get_currency_pairs(self):
-        return self.config['currency_pairs']['selected_assets']
+        return self.config_data['currency_pairs']['selected_assets']
     
     def get_polling_interval(self):
-        return self.config['polling_interval']
+        return self.config_data['polling_interval']
+
+    def get_min_price_difference(self) -> float:
+        """Повертає мінімальну різницю цін для арбітражу."""
+        return self.config_data.get("arbitrage", {}).get("min_price_difference", 0.0)
+
+    def get_pipeline_params(self) -> dict:
+        """Повертає параметри паралельного сканування символів."""
+        return self.config_data.get("pipeline", {})
+
+    def get_storage_params(self) -> dict:
+        """Повертає параметри пакетного запису журналів і транзакцій."""
+        return self.config_data.get("storage", {})
+
+class ExchangeClientPool:
+    """Реєстр спільних асинхронних клієнтів: один клієнт на біржу і спільні keep-alive з'єднання."""
+
+    def __init__(self, config_manager: ConfigManager, connection_limit: int = 100, connection_limit_per_host: int = 10, keepalive_timeout: float = 30, rate_limiter=None):
+        from utility.rate_limit_file import get_shared_limiter
+        self.config_manager = config_manager
+        self.rate_limiter = rate_limiter or get_shared_limiter(config_manager.get_rate_limits())
+        self.connection_limit = connection_limit
+        self.connection_limit_per_host = connection_limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self._clients = {}
+        self._connector = None
+        self._session = None
+
+    def get_client(self, exchange_name: str):
+        """Повертає спільний клієнт ccxt для біржі, створюючи його при першому зверненні."""
+        client = self._clients.get(exchange_name)
+        if client is None:
+            credentials = self.config_manager.get_exchange_credentials(exchange_name)
+            client = getattr(ccxt_async, exchange_name)({
+                'apiKey': credentials["api_key"],
+                'secret': credentials["api_secret"],
+                # Запити обмежує спільний RateLimiter
+                'enableRateLimit': False,
+            })
+            if self._session is not None:
+                self._attach_session(client)
+            self._clients[exchange_name] = client
+        return client
+
+    def _attach_session(self, client):
+        # Клієнт використовує спільну сесію і не закриває її сам
+        client.session = self._session
+        client.own_session = False
+
+    async def open(self):
+        """Створює спільну aiohttp-сесію; викликається всередині запущеного циклу подій."""
+        if self._session is not None:
+            return
+        self._connector = aiohttp.TCPConnector(
+            limit=self.connection_limit,
+            limit_per_host=self.connection_limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=300
+        )
+        self._session = aiohttp.ClientSession(connector=self._connector, trust_env=True)
+        for client in self._clients.values():
+            self._attach_session(client)
+
+    async def close(self):
+        """Закриває всі клієнти та спільну сесію."""
+        await asyncio.gather(*(client.close() for client in self._clients.values()), return_exceptions=True)
+        self._clients.clear()
+        if self._session is not None:
+            await self._session.close()
+        self._session = None
+        self._connector = None
+
+    def get_metrics(self) -> dict:
+        """Повертає кількість відкритих з'єднань та довжину черг запитів по біржах."""
+        connections_in_use = len(getattr(self._connector, '_acquired', ())) if self._connector else 0
+        idle_connections = sum(len(conns) for conns in getattr(self._connector, '_conns', {}).values()) if self._connector else 0
+        request_queues = {}
+        for exchange_name, client in self._clients.items():
+            throttler = getattr(client, 'throttler', None)
+            request_queues[exchange_name] = len(throttler.queue) if throttler is not None else 0
+        return {
+            'clients': len(self._clients),
+            'connections_in_use': connections_in_use,
+            'idle_connections': idle_connections,
+            'open_connections': connections_in_use + idle_connections,
+            'request_queues': request_queues,
+            'rate_limits': self.rate_limiter.get_occupancy()
+        }
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
 
 class ExchangeAPI:
-    def __init__(self, config_manager: ConfigManager, exchange_name: str):
+    def __init__(self, config_manager: ConfigManager, exchange_name: str, client_pool: ExchangeClientPool = None, rate_limiter=None):
+        from utility.rate_limit_file import get_shared_limiter
         self.config_manager = config_manager
-        credentials = self.config_manager.get_exchange_credentials(exchange_name)
-        self.exchange = getattr(ccxt_async, exchange_name)({
-            'apiKey': credentials["api_key"],
-            'secret': credentials["api_secret"],
-        })
+        self.exchange_name = exchange_name
+        self.owns_client = client_pool is None
+        if rate_limiter is None:
+            rate_limiter = client_pool.rate_limiter if client_pool is not None else get_shared_limiter(config_manager.get_rate_limits())
+        self.rate_limiter = rate_limiter
+        if client_pool is not None:
+            self.exchange = client_pool.get_client(exchange_name)
+        else:
+            credentials = self.config_manager.get_exchange_credentials(exchange_name)
+            self.exchange = getattr(ccxt_async, exchange_name)({
+                'apiKey': credentials["api_key"],
+                'secret': credentials["api_secret"],
+                'enableRateLimit': False,
+            })
+
+    async def close(self):
+        """Закриває власний клієнт; спільні клієнти закриває пул."""
+        if self.owns_client:
+            await self.exchange.close()
 
     async def get_data(self, symbol: str, timeframe: str, since=None, limit=None):
         """Отримує історичні дані для вказаної валютної пари."""
-        return await self.exchange.fetch_ohlcv(symbol, timeframe, since, limit)
+        return await self._request('market_data', self.exchange.fetch_ohlcv, symbol, timeframe, since, limit)
 
-    async def rate_limit_handler(self):
+    async def rate_limit_handler(self, endpoint_class: str = 'market_data'):
         """Обробник обмежень на кількість запитів."""
-        await self.exchange.throttle()
+        await self.rate_limiter.acquire_async(self.exchange_name, endpoint_class)
+
+    async def _request(self, endpoint_class: str, method, *args):
+        await self.rate_limit_handler(endpoint_class)
+        try:
+            return await method(*args)
+        except (ccxt.RateLimitExceeded, ccxt.DDoSProtection):
+            self.rate_limiter.penalize(self.exchange_name)
+            raise
 
     async def get_balance(self):
         """Отримує баланс користувача на біржі."""
-        return await self.exchange.fetch_balance()
+        return await self._request('account', self.exchange.fetch_balance)
 
     async def fetch_markets(self):
         """Отримує інформацію про всі доступні ринки на біржі."""
-        return await self.exchange.fetch_markets()
+        return await self._request('market_data', self.exchange.fetch_markets)
 
     async def fetch_market(self, symbol: str):
         """Отримує інформацію про конкретний ринок."""
-        return await self.exchange.fetch_market(symbol)
+        return await self._request('market_data', self.exchange.fetch_market, symbol)
 
     async def fetch_ticker(self, symbol: str):
         """Отримує поточну ціну для вказаної валютної пари."""
-        return await self.exchange.fetch_ticker(symbol)
+        return await self._request('market_data', self.exchange.fetch_ticker, symbol)
 
     async def fetch_order_book(self, symbol: str, limit=None):
         """Отримує інформацію про замовлення для вказаної валютної пари."""
-        return await self.exchange.fetch_order_book(symbol, limit)
+        return await self._request('market_data', self.exchange.fetch_order_book, symbol, limit)
 
     async def create_order(self, symbol: str, type: str, side: str, amount, price=None, params={}):
         """Створює замовлення на біржі."""
-        return await self.exchange.create_order(symbol, type, side, amount, price, params)
+        return await self._request('orders', self.exchange.create_order, symbol, type, side, amount, price, params)
 
     async def fetch_order(self, id: str, symbol: str):
         """Отримує інформацію про конкретне замовлення за його ID."""
-        return await self.exchange.fetch_order(id, symbol)
+        return await self._request('account', self.exchange.fetch_order, id, symbol)
 
     async def fetch_orders(self, symbol: str):
         """Отримує інформацію про всі замовлення користувача для вказаної валютної пари."""
-        return await self.exchange.fetch_orders(symbol)
+        return await self._request('account', self.exchange.fetch_orders, symbol)
 
     async def cancel_order(self, id: str, symbol: str):
         """Відміняє замовлення за його ID."""
-        return await self.exchange.cancel_order(id, symbol)
+        return await self._request('orders', self.exchange.cancel_order, id, symbol)
 
     async def fetch_symbols(self):
         """Отримує список всіх доступних обмінних пар на біржі."""
-        return await self.exchange.fetch_symbols()
+        return await self._request('market_data', self.exchange.fetch_symbols)
 
     async def fetch_market_details(self, symbol: str):
         """Отримує деталі ринку, такі як максимальний і мінімальний розмір замовлення, крок ціни тощо."""
-        market_info = await self.exchange.fetch_market(symbol)
+        market_info = await self._request('market_data', self.exchange.fetch_market, symbol)
         return market_info['info']
 
     async def fetch_trades(self, symbol: str, since=None, limit=None):
         """Отримує інформацію про останні угоди для вказаної валютної пари."""
-        return await self.exchange.fetch_trades(symbol, since, limit)
+        return await self._request('market_data', self.exchange.fetch_trades, symbol, since, limit)
 
     async def fetch_deposits(self, currency=None, since=None, limit=None):
         """Отримує інформацію про депозити."""
-        return await self.exchange.fetch_deposits(currency, since, limit)
+        return await self._request('account', self.exchange.fetch_deposits, currency, since, limit)
 
     async def fetch_withdrawals(self, currency=None, since=None, limit=None):
         """Отримує інформацію про виведення коштів."""
-        return await self.exchange.fetch_withdrawals(currency, since, limit)
+        return await self._request('account', self.exchange.fetch_withdrawals, currency, since, limit)
 
     async def fetch_status(self):
         """Отримує інформацію про поточний статус біржі."""
-        return await self.exchange.fetch_status()
+        return await self._request('market_data', self.exchange.fetch_status)
 
     async def fetch_fees(self):
         """Отримує інформацію про комісії на біржі."""
-        return await self.exchange.fetch_fees()
+        return await self._request('account', self.exchange.fetch_fees)
 
     async def fetch_currencies(self):
         """Отримує інформацію про всі валюти, доступні на біржі."""
-        return await self.exchange.fetch_currencies()
+        return await self._request('market_data', self.exchange.fetch_currencies)
 
     async def fetch_withdraw_limits(self, currency: str):
         """Отримує інформацію про обмеження на виведення коштів для конкретної валюти."""
-        currencies_info = await self.exchange.fetch_currencies()
+        currencies_info = await self._request('market_data', self.exchange.fetch_currencies)
         return currencies_info[currency].get('limits', {}).get('withdraw')
 
     async def fetch_payment_methods(self):
         """Отримує інформацію про доступні методи внесення та виведення коштів."""
-        return await self.exchange.fetch_payment_methods()
+        return await self._request('account', self.exchange.fetch_payment_methods)
 
     async def fetch_open_orders(self, symbol: str):
         """Отримує інформацію про поточні замовлення для вказаної валютної пари."""
-        return await self.exchange.fetch_open_orders(symbol)
+        return await self._request('account', self.exchange.fetch_open_orders, symbol)
 
     async def fetch_unfilled_orders(self, symbol: str):
         """Отримує інформацію про незавершені угоди для вказаної валютної пари."""
-        all_orders = await self.exchange.fetch_open_orders(symbol)
+        all_orders = await self._request('account', self.exchange.fetch_open_orders, symbol)
         return [order for order in all_orders if order['remaining'] > 0]
 
     async def fetch_trading_limits(self, symbol: str):
         """Отримує інформацію про обмеження на торгівлю для вказаної валютної пари."""
-        market_info = await self.exchange.fetch_market(symbol)
+        market_info = await self._request('market_data', self.exchange.fetch_market, symbol)
         return market_info.get('limits')
 
     async def has_symbol(self, symbol: str) -> bool:
         """Перевіряє, чи підтримує біржа конкретну валютну пару."""
-        return symbol in await self.exchange.fetch_symbols()
+        return symbol in await self._request('market_data', self.exchange.fetch_symbols)
 
     async def fetch_trading_fees(self):
         """Отримує інформацію про комісії за торгівлю."""
-        return await self.exchange.fetch_trading_fees()
+        return await self._request('account', self.exchange.fetch_trading_fees)
+
+    def supports_order_stream(self) -> bool:
+        """Перевіряє, чи підтримує клієнт приватний websocket-потік ордерів (ccxt.pro)."""
+        return bool(self.exchange.has.get('watchOrders')) and hasattr(self.exchange, 'watch_orders')
+
+    async def watch_orders(self, symbol: str = None):
+        """Очікує наступні оновлення ордерів з websocket-потоку."""
+        return await self.exchange.watch_orders(symbol)
+
+class OrderTracker:
+    """Відстежує виконання всіх відкритих ордерів одним планувальником з адаптивними інтервалами."""
+
+    TERMINAL_STATUSES = ('closed', 'canceled', 'cancelled', 'expired', 'rejected')
+
+    def __init__(self, min_interval: float = 0.02, max_interval: float = 2.0, backoff_factor: float = 1.5, max_errors: int = 5):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff_factor = backoff_factor
+        self.max_errors = max_errors
+        self._orders = {}
+        self._wakeup = None
+        self._scheduler_task = None
+        self._stream_tasks = {}
+
+    def track(self, exchange, order_id: str, symbol: str) -> asyncio.Future:
+        """Додає ордер до відстеження і повертає future, що завершиться фінальним станом ордера."""
+        loop = asyncio.get_running_loop()
+        key = (id(exchange), order_id)
+        entry = self._orders.get(key)
+        if entry is not None:
+            return entry['future']
+
+        streaming = exchange.supports_order_stream() if hasattr(exchange, 'supports_order_stream') else False
+        # Якщо є websocket-потік, опитування лишається лише страховкою
+        interval = self.max_interval if streaming else self.min_interval
+        entry = {
+            'exchange': exchange,
+            'id': order_id,
+            'symbol': symbol,
+            'future': loop.create_future(),
+            'interval': interval,
+            'next_check': loop.time() + interval,
+            'errors': 0
+        }
+        self._orders[key] = entry
+
+        if streaming and id(exchange) not in self._stream_tasks:
+            self._stream_tasks[id(exchange)] = asyncio.create_task(self._stream_orders(exchange))
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        if self._scheduler_task is None or self._scheduler_task.done():
+            self._scheduler_task = asyncio.create_task(self._scheduler())
+        self._wakeup.set()
+        return entry['future']
+
+    async def wait_for_fill(self, exchange, order_id: str, symbol: str, timeout: float = None) -> dict:
+        """Чекає фінального стану ордера і повертає його; помилка, якщо ордер не виконано."""
+        future = self.track(exchange, order_id, symbol)
+        try:
+            order = await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            # Ордер більше не опитується; скасувати його на біржі має викликач
+            self.untrack(exchange, order_id)
+            raise
+        if order.get('status') != 'closed':
+            raise RuntimeError(f"Order {order_id} for {symbol} finished with status {order.get('status')}")
+        return order
+
+    def untrack(self, exchange, order_id: str):
+        """Припиняє відстеження ордера і скасовує очікування його future."""
+        entry = self._orders.pop((id(exchange), order_id), None)
+        if entry is None:
+            return
+        if not entry['future'].done():
+            entry['future'].cancel()
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _handle_update(self, key, order: dict):
+        entry = self._orders.get(key)
+        if entry is None:
+            return
+        if order.get('status') in self.TERMINAL_STATUSES:
+            del self._orders[key]
+            if not entry['future'].done():
+                entry['future'].set_result(order)
+
+    async def _check(self, key, entry: dict):
+        try:
+            order = await entry['exchange'].fetch_order(entry['id'], entry['symbol'])
+        except Exception as e:
+            entry['errors'] += 1
+            if entry['errors'] >= self.max_errors:
+                self._orders.pop(key, None)
+                if not entry['future'].done():
+                    entry['future'].set_exception(e)
+                return
+        else:
+            self._handle_update(key, order)
+
+        # Спочатку перевіряємо часто, далі інтервал зростає до max_interval
+        entry['interval'] = min(entry['interval'] * self.backoff_factor, self.max_interval)
+        entry['next_check'] = asyncio.get_running_loop().time() + entry['interval']
+
+    async def _scheduler(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            for key, entry in list(self._orders.items()):
+                if entry['future'].done():
+                    del self._orders[key]
+            if not self._orders:
+                break
+
+            now = loop.time()
+            due = [(key, entry) for key, entry in self._orders.items() if entry['next_check'] <= now]
+            if due:
+                await asyncio.gather(*(self._check(key, entry) for key, entry in due))
+                continue
+
+            next_check = min(entry['next_check'] for entry in self._orders.values())
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), max(next_check - loop.time(), 0))
+            except asyncio.TimeoutError:
+                pass
+
+    async def _stream_orders(self, exchange):
+        exchange_key = id(exchange)
+        try:
+            while any(key[0] == exchange_key for key in self._orders):
+                for order in await exchange.watch_orders():
+                    self._handle_update((exchange_key, order['id']), order)
+        except Exception:
+            # Потік недоступний - ордери цієї біржі доопитуються планувальником
+            for key, entry in self._orders.items():
+                if key[0] == exchange_key:
+                    entry['interval'] = self.min_interval
+                    entry['next_check'] = asyncio.get_running_loop().time()
+            if self._wakeup is not None:
+                self._wakeup.set()
+        finally:
+            self._stream_tasks.pop(exchange_key, None)
+
+    def pending_orders(self) -> int:
+        """Кількість ордерів, що очікують виконання."""
+        return len(self._orders)
+
+    async def close(self):
+        """Зупиняє планувальник і потоки, скасовує очікування невиконаних ордерів."""
+        tasks = list(self._stream_tasks.values())
+        if self._scheduler_task is not None:
+            tasks.append(self._scheduler_task)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for entry in self._orders.values():
+            if not entry['future'].done():
+                entry['future'].cancel()
+        self._orders.clear()
 
 class ArbitrageAnalyzer:
     def __init__(self, config_manager: ConfigManager):
+        from utility.liquidity_file import LiquidityEngine
+        from utility.batch_writer_file import BatchedFileWriter
         self.config_manager = config_manager
+        self.liquidity_engine = LiquidityEngine(fee=self.config_manager.get_transaction_fee())
+        storage_params = self.config_manager.get_storage_params()
+        self.log_writer = BatchedFileWriter.from_config(storage_params.get("log_file", "arbitrage_log.txt"), storage_params)
 
     def find_arbitrage_opportunity(self, exchange_data):
         """Знаходить можливості для арбітражу."""
@@ -192,16 +487,37 @@ class ArbitrageAnalyzer:
                 })
         return opportunities
 
-    def log_arbitrage_opportunity(self, opportunity):
-        """Зберігає інформацію про арбітражну можливість."""
-        with open("arbitrage_log.txt", "a") as file:
-            file.write(f"Date: {datetime.now()}, Symbol: {opportunity['symbol']}, Buy Price: {opportunity['buy_price']}, Sell Price: {opportunity['sell_price']}, Profit: {opportunity['profit']}\n")
+    def find_cross_exchange_opportunity(self, symbol: str, exchange_data: dict):
+        """Знаходить арбітраж для символу: купівля по найнижчому ask, продаж по найвищому bid."""
+        if len(exchange_data) < 2:
+            return []
+        buy_exchange = min(exchange_data, key=lambda name: exchange_data[name]['buy_price'])
+        sell_exchange = max(exchange_data, key=lambda name: exchange_data[name]['sell_price'])
+        buy_price = exchange_data[buy_exchange]['buy_price']
+        sell_price = exchange_data[sell_exchange]['sell_price']
+        if buy_exchange == sell_exchange or sell_price - buy_price <= self.config_manager.get_min_price_difference():
+            return []
+        return [{
+            'symbol': symbol,
+            'buy_exchange': buy_exchange,
+            'sell_exchange': sell_exchange,
+            'buy_price': buy_price,
+            'sell_price': sell_price,
+            'profit': sell_price - buy_price,
+            'volume': self.config_manager.get_risk_management().get("max_position_size", 0)
+        }]
+
+    async def log_arbitrage_opportunity(self, opportunity):
+        """Зберігає інформацію про арбітражну можливість через пакетний запис."""
+        await self.log_writer.write(f"Date: {datetime.datetime.now()}, Symbol: {opportunity['symbol']}, Buy Price: {opportunity['buy_price']}, Sell Price: {opportunity['sell_price']}, Profit: {opportunity['profit']}\n")
 
     def optimal_trade_volume(self, buy_order_book, sell_order_book):
-        """Визначає оптимальний обсяг для арбітражу."""
-        buy_volume = sum([order[1] for order in buy_order_book['bids']])
-        sell_volume = sum([order[1] for order in sell_order_book['asks']])
-        return min(buy_volume, sell_volume)
+        """Визначає оптимальний обсяг для арбітражу: купівля по asks, продаж по bids з урахуванням комісій."""
+        return self.liquidity_engine.size_opportunity(buy_order_book, sell_order_book)['amount']
+
+    def size_arbitrage_opportunity(self, buy_order_book, sell_order_book, buy_exchange: str = None, sell_exchange: str = None):
+        """Повертає обсяг, VWAP обох сторін та очікуваний прибуток після комісій."""
+        return self.liquidity_engine.size_opportunity(buy_order_book, sell_order_book, buy_exchange, sell_exchange)
 
     def assess_risks(self, buy_price, sell_price, volume, execution_time):
         """Оцінює ризики, пов'язані з арбітражем."""
@@ -235,14 +551,23 @@ class TransactionManager:
 
     async def create_buy_order(self, symbol, volume, price):
         """Створює замовлення на купівлю."""
-        order = await self.exchange.create_limit_buy_order(symbol, volume, price)
+        order = await self.exchange.create_order(symbol, 'limit', 'buy', volume, price)
         return order
 
     async def create_sell_order(self, symbol, volume, price):
         """Створює замовлення на продаж."""
-        order = await self.exchange.create_limit_sell_order(symbol, volume, price)
+        order = await self.exchange.create_order(symbol, 'limit', 'sell', volume, price)
         return order
 
+    async def create_market_sell_order(self, symbol, volume):
+        """Створює ринкове замовлення на продаж (для закриття купленої позиції)."""
+        order = await self.exchange.create_order(symbol, 'market', 'sell', volume)
+        return order
+
+    async def cancel_order(self, order_id, symbol):
+        """Відміняє замовлення."""
+        return await self.exchange.cancel_order(order_id, symbol)
+
     async def is_order_filled(self, order_id):
         """Перевіряє, чи було виконано замовлення."""
         order_status = await self.exchange.fetch_order_status(order_id)
@@ -253,50 +578,85 @@ class TransactionManager:
         order_info = await self.exchange.fetch_order(order_id)
         return order_info
 
-    def check_liquidity(self, symbol, volume):
+    async def check_liquidity(self, symbol, volume):
         """Перевіряє, чи є достатньо ліквідності на біржі для виконання замовлення."""
-        order_book = self.exchange.fetch_order_book(symbol)
+        order_book = await self.exchange.fetch_order_book(symbol)
         bids_volume = sum([order[1] for order in order_book['bids']])
         asks_volume = sum([order[1] for order in order_book['asks']])
         return bids_volume >= volume and asks_volume >= volume
 
 class DataStorage:
     def __init__(self, config_manager: ConfigManager):
+        from utility.batch_writer_file import BatchedFileWriter
+        from utility.history_file import TransactionHistoryReader
         self.config_manager = config_manager
-        self.data_file = "arbitrage_data.json"
-
-    def save_data(self, data):
-        """Зберігає дані в файл."""
-        with open(self.data_file, "a") as file:
-            json.dump(data, file)
-            file.write("\n")
+        storage_params = self.config_manager.get_storage_params()
+        self.data_file = storage_params.get("data_file", "arbitrage_data.json")
+        self.writer = BatchedFileWriter.from_config(self.data_file, storage_params)
+        self.history_reader = TransactionHistoryReader(self.data_file, storage_params.get("index_interval", 1000))
+
+    async def save_data(self, data):
+        """Ставить запис у чергу пакетного запису у файл."""
+        # Мітка часу потрібна для вибірок за датою та індексу зміщень
+        if 'timestamp' not in data:
+            data = dict(data, timestamp=datetime.datetime.now().timestamp())
+        await self.writer.write(json.dumps(data) + "\n")
 
     def load_data(self):
         """Завантажує дані з файлу."""
+        from utility.history_file import decode_json
         data = []
-        with open(self.data_file, "r") as file:
+        with open(self.data_file, "rb") as file:
             for line in file:
-                data.append(json.loads(line))
+                data.append(decode_json(line))
         return data
 
-    def log_arbitrage_transaction(self, transaction_data):
+    async def log_arbitrage_transaction(self, transaction_data):
         """Зберігає інформацію про арбітражну транзакцію."""
-        self.save_data(transaction_data)
+        await self.save_data(transaction_data)
+
+    async def flush(self):
+        """Дописує у файл усі записи з черги."""
+        await self.writer.flush()
+
+    def get_write_metrics(self) -> dict:
+        """Повертає метрики черги запису: глибину, розмір пакетів та очікування через backpressure."""
+        return self.writer.get_metrics()
 
-    def get_transaction_history(self):
-        """Отримує історію арбітражних транзакцій."""
-        return self.load_data()
+    async def close(self):
+        await self.writer.close()
+
+    def get_transaction_history(self, start=None, end=None, symbol: str = None, venue: str = None, min_profit: float = None):
+        """Повертає генератор арбітражних транзакцій з фільтрами за датою, символом, біржею та прибутком."""
+        return self.history_reader.iter_records(start, end, symbol, venue, min_profit)
 
 class CryptoArbitrage:
     def __init__(self, config_file):
         self.config_manager = ConfigManager(config_file)
+        pool_params = self.config_manager.get_client_pool_params()
+        self.client_pool = ExchangeClientPool(
+            self.config_manager,
+            connection_limit=pool_params.get("connection_limit", 100),
+            connection_limit_per_host=pool_params.get("connection_limit_per_host", 10),
+            keepalive_timeout=pool_params.get("keepalive_timeout", 30)
+        )
         self.exchanges = {
-            "bybit": ExchangeAPI(ccxt.bybit(), self.config_manager),
-            "bitstamp": ExchangeAPI(ccxt.bitstamp(), self.config_manager)
+            name: ExchangeAPI(self.config_manager, name, self.client_pool)
+            for name in self.config_manager.get_param("exchanges")
         }
         self.arbitrage_analyzer = ArbitrageAnalyzer(self.config_manager)
         self.transaction_manager = {name: TransactionManager(exchange, self.config_manager) for name, exchange in self.exchanges.items()}
         self.data_storage = DataStorage(self.config_manager)
+        self.max_concurrent_requests = self.config_manager.get_pipeline_params().get("max_concurrent_requests", 10)
+        self.symbol_latency = {}
+        self.last_quotes = {}
+        tracking_params = self.config_manager.get_order_tracking_params()
+        self.fill_timeout = tracking_params.get("fill_timeout")
+        self.order_tracker = OrderTracker(
+            min_interval=tracking_params.get("min_interval", 0.02),
+            max_interval=tracking_params.get("max_interval", 2.0),
+            backoff_factor=tracking_params.get("backoff_factor", 1.5)
+        )
 
     async def execute_arbitrage_trade(self, opp):
         """Виконує арбітражну угоду на основі виявленої можливості."""
@@ -304,52 +664,149 @@ class CryptoArbitrage:
         sell_exchange = self.transaction_manager[opp['sell_exchange']]
         
         # Перевірка ліквідності перед виконанням угоди
-        if not buy_exchange.check_liquidity(opp['symbol'], opp['volume']) or \
-           not sell_exchange.check_liquidity(opp['symbol'], opp['volume']):
+        buy_liquid, sell_liquid = await asyncio.gather(
+            buy_exchange.check_liquidity(opp['symbol'], opp['volume']),
+            sell_exchange.check_liquidity(opp['symbol'], opp['volume'])
+        )
+        if not buy_liquid or not sell_liquid:
             print(f"Insufficient liquidity for {opp['symbol']}")
             return
 
+        pending = None
+        filled_buy = None
         try:
             # Створення замовлення на купівлю
             buy_order = await buy_exchange.create_buy_order(opp['symbol'], opp['volume'], opp['buy_price'])
-            
-            # Перевірка статусу замовлення на купівлю
-            while not buy_exchange.is_order_filled(buy_order['id']):
-                await asyncio.sleep(5)  # Перевірка кожні 5 секунд
+            pending = (buy_exchange, buy_order['id'])
+
+            # Очікування виконання замовлення на купівлю
+            filled_buy = await self.order_tracker.wait_for_fill(buy_exchange.exchange, buy_order['id'], opp['symbol'], self.fill_timeout)
 
             # Створення замовлення на продаж
             sell_order = await sell_exchange.create_sell_order(opp['symbol'], opp['volume'], opp['sell_price'])
-            
-            # Перевірка статусу замовлення на продаж
-            while not sell_exchange.is_order_filled(sell_order['id']):
-                await asyncio.sleep(5)  # Перевірка кожні 5 секунд
-
+            pending = (sell_exchange, sell_order['id'])
+
+            # Очікування виконання замовлення на продаж
+            sell_order = await self.order_tracker.wait_for_fill(sell_exchange.exchange, sell_order['id'], opp['symbol'], self.fill_timeout)
+            return sell_order
+
+        except asyncio.TimeoutError:
+            # Невиконане замовлення відміняється, щоб воно не виконалось пізніше без контролю
+            manager, order_id = pending
+            print(f"Order {order_id} for {opp['symbol']} not filled within {self.fill_timeout}s, cancelling it")
+            try:
+                await manager.cancel_order(order_id, opp['symbol'])
+            except Exception as e:
+                print(f"Error cancelling order {order_id}: {e}")
+                if filled_buy is not None:
+                    # Стан продажу невідомий: закриття купівлі могло б продати монети двічі
+                    return self._unhedged_result(opp, filled_buy, f"sell order {order_id} timed out and could not be cancelled: {e}")
+        except RuntimeError as e:
+            # Ордер скасовано або відхилено біржею
+            print(f"Order for {opp['symbol']} was not filled: {e}")
         except Exception as e:
             print(f"Error executing arbitrage trade: {e}")
-            # Тут можна додати додаткову логіку для обробки помилок, наприклад, відміну невиконаних замовлень
 
-    async def run_arbitrage(self):
-        while True:
-            for symbol in self.config_manager.get_currency_pairs():
-                exchange_data = {}
-                for name, exchange in self.exchanges.items():
-                    ticker = await exchange.fetch_ticker(symbol)
-                    exchange_data[name] = {
-                        'buy_price': ticker['bid'],
-                        'sell_price': ticker['ask']
-                    }
-
-                opportunities = self.arbitrage_analyzer.find_arbitrage_opportunity(exchange_data)
-                for opp in opportunities:
-                    self.arbitrage_analyzer.log_arbitrage_opportunity(opp)
+        # Купівля виконалась, а продаж ні: позицію закриваємо на біржі купівлі
+        if filled_buy is not None:
+            return await self._unwind_buy_leg(buy_exchange, opp, filled_buy)
+
+    async def _unwind_buy_leg(self, buy_exchange, opp, filled_buy):
+        amount = filled_buy.get('filled') or opp['volume']
+        try:
+            unwind_order = await buy_exchange.create_market_sell_order(opp['symbol'], amount)
+        except Exception as e:
+            return self._unhedged_result(opp, filled_buy, f"unwind sell failed: {e}")
+        print(f"Sell leg for {opp['symbol']} failed, unwound {amount} on {opp['buy_exchange']}")
+        return {'status': 'unwound', 'buy_order': filled_buy, 'unwind_order': unwind_order}
+
+    def _unhedged_result(self, opp, filled_buy, error):
+        print(f"UNHEDGED position: bought {opp['symbol']} on {opp['buy_exchange']} without a matching sell ({error})")
+        return {'status': 'unhedged', 'buy_order': filled_buy, 'error': error}
+
+    async def _fetch_quote(self, semaphore: asyncio.Semaphore, symbol: str, name: str, exchange):
+        async with semaphore:
+            ticker = await exchange.fetch_ticker(symbol)
+        return name, ticker
+
+    async def scan_symbol(self, symbol: str, semaphore: asyncio.Semaphore):
+        """Отримує котирування символу з усіх бірж паралельно і одразу аналізує їх."""
+        loop = asyncio.get_running_loop()
+        started_at = loop.time()
+        results = await asyncio.gather(
+            *(self._fetch_quote(semaphore, symbol, name, exchange) for name, exchange in self.exchanges.items()),
+            return_exceptions=True
+        )
+
+        exchange_data = {}
+        for result in results:
+            if isinstance(result, Exception):
+                print(f"Error fetching {symbol}: {result}")
+                continue
+            name, ticker = result
+            if ticker.get('ask') is None or ticker.get('bid') is None:
+                continue
+            exchange_data[name] = {
+                'buy_price': ticker['ask'],
+                'sell_price': ticker['bid']
+            }
+
+        # Символ аналізується повторно лише тоді, коли його котирування змінилися
+        if exchange_data == self.last_quotes.get(symbol):
+            return symbol, [], loop.time() - started_at
+        self.last_quotes[symbol] = exchange_data
+        opportunities = self.arbitrage_analyzer.find_cross_exchange_opportunity(symbol, exchange_data)
+        return symbol, opportunities, loop.time() - started_at
+
+    async def run_cycle(self):
+        """Один цикл сканування: усі запити (символ, біржа) йдуть одночасно під спільним семафором."""
+        semaphore = asyncio.Semaphore(self.max_concurrent_requests)
+        tasks = [asyncio.create_task(self.scan_symbol(symbol, semaphore)) for symbol in self.config_manager.get_currency_pairs()]
+
+        latencies = {}
+        # Символ обробляється, щойно надійшли його котирування, не чекаючи решти
+        for task in asyncio.as_completed(tasks):
+            symbol, opportunities, latency = await task
+            latencies[symbol] = latency
+            for opp in opportunities:
+                # Помилка однієї угоди не повинна зупиняти сканування решти символів
+                try:
+                    await self.arbitrage_analyzer.log_arbitrage_opportunity(opp)
                     await self.execute_arbitrage_trade(opp)
+                except Exception as e:
+                    print(f"Error handling opportunity for {symbol}: {e}")
+
+        self.symbol_latency = latencies
+        report = ", ".join(f"{symbol}: {latency * 1000:.1f} ms" for symbol, latency in latencies.items())
+        print(f"Scan cycle latency per symbol: {report}")
+        return latencies
 
+    async def run_arbitrage(self):
+        while True:
+            await self.run_cycle()
             await asyncio.sleep(self.config_manager.get_polling_interval())
 
+    async def run(self):
+        """Запускає арбітраж і коректно закриває всі з'єднання при завершенні."""
+        await self.client_pool.open()
+        try:
+            await self.run_arbitrage()
+        finally:
+            await self.shutdown()
+
+    async def shutdown(self):
+        await self.order_tracker.close()
+        await self.client_pool.close()
+        await self.arbitrage_analyzer.log_writer.close()
+        await self.data_storage.close()
+
     def start(self):
-        loop = asyncio.get_event_loop()
-        loop.run_until_complete(self.run_arbitrage())
+        asyncio.run(self.run())
 
 if __name__ == "__main__":
+    import os
+    import sys
+    # При запуску файлу напряму пакет utility має імпортуватися з кореня Arbitrage_Bot
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
     app = CryptoArbitrage("config.json")
     app.start()
@@ -0,0 +1,211 @@
+import time
+
+import numpy as np
+
+from utility.arbitrage_file import ArbitrageAnalyzer, setup_class_logger
+from utility.latency_file import VirtualClock
+from utility.stream_file import TopOfBookStore
+
+EVENT_DTYPE = np.dtype([
+    ('timestamp', '<f8'),
+    ('price', '<f8'),
+    ('bid', '<f8'),
+    ('ask', '<f8'),
+    ('venue', '<i4'),
+    ('symbol', '<i4')
+])
+
+
+def max_drawdown(values):
+    """Найбільше падіння вартості від попереднього максимуму, у частках від максимуму."""
+    if not len(values):
+        return 0.0
+    values = np.asarray(values, dtype=float)
+    peaks = np.maximum.accumulate(values)
+    drawdowns = np.where(peaks > 0, (peaks - values) / peaks, 0.0)
+    return float(drawdowns.max())
+
+
+def group_events(events, exchanges, symbols):
+    """Серії {(біржа, символ): (timestamps, bids, asks)} з масиву подій одним сортуванням.
+
+    lexsort стабільний, тож усередині серії події лишаються впорядкованими за часом. Копіюються
+    лише три потрібні колонки, серії - зрізи (view) цих копій.
+    """
+    series = {}
+    if not len(events):
+        return series
+    order = np.lexsort((events['symbol'], events['venue']))
+    venue_ids = events['venue'][order]
+    symbol_ids = events['symbol'][order]
+    timestamps, bids, asks = (events[name][order] for name in ('timestamp', 'bid', 'ask'))
+    boundaries = (np.flatnonzero((np.diff(venue_ids) != 0) | (np.diff(symbol_ids) != 0)) + 1).tolist()
+    for start, end in zip([0] + boundaries, boundaries + [len(order)]):
+        venue_id, symbol_id = int(venue_ids[start]), int(symbol_ids[start])
+        if venue_id < len(exchanges) and symbol_id < len(symbols):
+            series[(exchanges[venue_id], symbols[symbol_id])] = (timestamps[start:end], bids[start:end], asks[start:end])
+    return series
+
+
+class BacktestEngine:
+    """Відтворює тіки з TickStore через TopOfBookStore та ArbitrageAnalyzer і торгує симульованими балансами."""
+
+    def __init__(self, simulation, tick_store, exchanges, symbols, start=None, end=None, trade_cooldown=1.0, max_quote_age=None):
+        self.logger = setup_class_logger(self.__class__.__name__)
+        self.simulation = simulation
+        self.tick_store = tick_store
+        self.exchanges = list(exchanges)
+        self.symbols = list(symbols)
+        self.start = start
+        self.end = end
+        self.trade_cooldown = trade_cooldown
+        self.max_quote_age = max_quote_age
+        self.clock = VirtualClock(0.0)
+        self.store = None
+        self.events = None
+        self.series = {}
+        self.equity_curve = []
+        self._pending = []
+        self._last_trade = {}
+        self._opportunities = 0
+
+    def load_events(self):
+        """Зливає всі серії (біржа, символ) в один масив подій, стабільно впорядкований за часом."""
+        parts = []
+        for venue_id, exchange in enumerate(self.exchanges):
+            for symbol_id, symbol in enumerate(self.symbols):
+                ticks = self.tick_store.query(exchange, symbol, self.start, self.end)
+                ticks = ticks[~np.isnan(ticks['price'])]
+                if not len(ticks):
+                    continue
+                part = np.empty(len(ticks), dtype=EVENT_DTYPE)
+                part['timestamp'] = ticks['timestamp']
+                part['price'] = ticks['price']
+                # Для тіків без bid/ask використовується ціна останньої угоди
+                part['bid'] = np.where(np.isnan(ticks['bid']), ticks['price'], ticks['bid'])
+                part['ask'] = np.where(np.isnan(ticks['ask']), ticks['price'], ticks['ask'])
+                part['venue'] = venue_id
+                part['symbol'] = symbol_id
+                parts.append(part)
+
+        if not parts:
+            return self.set_events(np.empty(0, dtype=EVENT_DTYPE))
+        events = np.concatenate(parts)
+        return self.set_events(events[np.argsort(events['timestamp'], kind='stable')])
+
+    def set_events(self, events, series=None):
+        """Приймає готовий масив EVENT_DTYPE (зокрема memory-mapped) і серії для quote_at.
+
+        Серії, вже згруповані group_events, можна передати, щоб не будувати їх для кожного прогону.
+        """
+        self.events = events
+        self.series = group_events(events, self.exchanges, self.symbols) if series is None else series
+        return self.events
+
+    def quote_at(self, exchange, symbol, timestamp):
+        """Останні bid/ask серії на момент timestamp - ціни рухаються і під час симульованої затримки."""
+        series = self.series.get((exchange, symbol))
+        if series is None:
+            return None
+        timestamps, bids, asks = series
+        index = int(np.searchsorted(timestamps, timestamp, side='right')) - 1
+        if index < 0:
+            return None
+        return float(bids[index]), float(asks[index])
+
+    def _on_opportunity(self, opportunity):
+        self._opportunities += 1
+        self._pending.append(opportunity)
+
+    def _prime_store(self, columns):
+        # Перші котирування кожної серії потрібні для початкових балансів
+        seen = set()
+        for timestamp, price, bid, ask, venue, symbol in zip(*columns):
+            if (venue, symbol) in seen:
+                continue
+            seen.add((venue, symbol))
+            self.clock.advance_to(timestamp)
+            self.store.update(self.exchanges[venue], self.symbols[symbol], bid, ask, last=price, timestamp=timestamp * 1000)
+
+    def _trade_pending(self):
+        now = self.clock.now()
+        candidates = []
+        for opportunity in self._pending:
+            last_trade = self._last_trade.get(opportunity['currency'])
+            if last_trade is not None and now - last_trade < self.trade_cooldown:
+                continue
+            candidates.append(opportunity)
+        self._pending = []
+        if not candidates:
+            return 0
+
+        opportunity = self.simulation.transaction_manager.get_best_opportunity(candidates)
+        if opportunity is None:
+            return 0
+        # Пауза діє і після спроби без коштів, інакше кожен тік повторював би її
+        self._last_trade[opportunity['currency']] = now
+        if not self.simulation.execute_opportunity(opportunity):
+            return 0
+        self.equity_curve.append((self.clock.now(), self.simulation.get_portfolio_value()))
+        return 1
+
+    def run(self):
+        """Проганяє всі події і повертає статистику прогону: події/с, кількість угод і PnL."""
+        if self.events is None:
+            self.load_events()
+        columns = [self.events[name].tolist() for name in ('timestamp', 'price', 'bid', 'ask', 'venue', 'symbol')]
+
+        start = columns[0][0] if columns[0] else 0.0
+        self.clock = VirtualClock(start)
+        self.store = TopOfBookStore(max_quote_age=self.max_quote_age, clock=self.clock.now)
+        self._pending = []
+        self._last_trade = {}
+        self._opportunities = 0
+        self._prime_store(columns)
+        self.clock.reset(start)
+
+        simulation = self.simulation
+        analyzer = ArbitrageAnalyzer(simulation.exchange_api, simulation.arbitrage_analyzer.config_manager, top_of_book=self.store)
+        simulation.bind_replay(self.store, self.clock, self.quote_at)
+        simulation.create_balance(self.exchanges, self.symbols)
+        initial_value = simulation.get_portfolio_value()
+        initial_latency = simulation.latency_model.total_latency
+        self.equity_curve = [(start, initial_value)]
+        analyzer.attach_incremental_detector(on_opportunity=self._on_opportunity)
+
+        exchanges, symbols, store, clock = self.exchanges, self.symbols, self.store, self.clock
+        trades = 0
+        started_at = time.perf_counter()
+        for timestamp, price, bid, ask, venue, symbol in zip(*columns):
+            clock.advance_to(timestamp)
+            store.update(exchanges[venue], symbols[symbol], bid, ask, last=price, timestamp=timestamp * 1000)
+            if self._pending:
+                trades += self._trade_pending()
+        elapsed = time.perf_counter() - started_at
+
+        final_value = simulation.get_portfolio_value()
+        self.equity_curve.append((clock.now(), final_value))
+        simulation.revert_to_dollars()
+        simulation.bind_replay(None, None)
+
+        events = len(columns[0])
+        stats = {
+            'events': events,
+            'elapsed': elapsed,
+            'events_per_second': events / elapsed if elapsed > 0 else 0.0,
+            'simulated_seconds': columns[0][-1] - columns[0][0] if events else 0.0,
+            'opportunities': self._opportunities,
+            'trades': trades,
+            'simulated_latency': simulation.latency_model.total_latency - initial_latency,
+            'initial_value': initial_value,
+            'final_value': final_value,
+            'pnl': final_value - initial_value,
+            'max_drawdown': max_drawdown([value for _, value in self.equity_curve])
+        }
+        self.logger.info(f"Replayed {events} events in {elapsed:.3f} s ({stats['events_per_second']:.0f} events/s), {trades} trades, PnL {stats['pnl']:.4f}.")
+        return stats
+
+    def close_logger(self):
+        for handler in self.logger.handlers:
+            handler.close()
+            self.logger.removeHandler(handler)
@@ -0,0 +1,149 @@
+import asyncio
+import os
+import time
+
+FSYNC_POLICIES = ('never', 'batch', 'interval')
+
+# Маркер у черзі, що змушує записати поточний пакет негайно
+_FLUSH = object()
+
+
+class BatchedFileWriter:
+    """Асинхронний запис рядків у файл пакетами: обмежена черга, скидання за розміром або часом, диск - поза event loop."""
+
+    def __init__(self, path, max_queue=10000, batch_size=500, flush_interval=1.0, fsync='never', fsync_interval=5.0):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy: {fsync}")
+        self.path = path
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self._queue = None
+        self._task = None
+        self._file = None
+        self._last_fsync = time.monotonic()
+        self.metrics = {
+            'enqueued': 0,
+            'written': 0,
+            'batches': 0,
+            'fsyncs': 0,
+            'max_queue_depth': 0,
+            'backpressure_waits': 0,
+            'backpressure_seconds': 0.0,
+            'last_flush_seconds': 0.0,
+            'errors': 0
+        }
+
+    @classmethod
+    def from_config(cls, path, params):
+        return cls(
+            path,
+            max_queue=params.get("max_queue", 10000),
+            batch_size=params.get("batch_size", 500),
+            flush_interval=params.get("flush_interval", 1.0),
+            fsync=params.get("fsync", "never"),
+            fsync_interval=params.get("fsync_interval", 5.0)
+        )
+
+    def _ensure_started(self):
+        # Черга і задача створюються в event loop, у якому відбувається перший запис
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def write(self, line):
+        """Ставить рядок у чергу; чекає лише тоді, коли черга заповнена (backpressure)."""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(line)
+        except asyncio.QueueFull:
+            started_at = time.monotonic()
+            self.metrics['backpressure_waits'] += 1
+            await self._queue.put(line)
+            self.metrics['backpressure_seconds'] += time.monotonic() - started_at
+        self.metrics['enqueued'] += 1
+        self.metrics['max_queue_depth'] = max(self.metrics['max_queue_depth'], self._queue.qsize())
+
+    async def _next_batch(self):
+        loop = asyncio.get_running_loop()
+        batch = []
+        item = await self._queue.get()
+        taken = 1
+        if item is not _FLUSH:
+            batch.append(item)
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                taken += 1
+                if item is _FLUSH:
+                    break
+                batch.append(item)
+        return batch, taken
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch, taken = await self._next_batch()
+            try:
+                if batch:
+                    started_at = time.monotonic()
+                    await loop.run_in_executor(None, self._write_batch, batch)
+                    self.metrics['last_flush_seconds'] = time.monotonic() - started_at
+                    self.metrics['written'] += len(batch)
+                    self.metrics['batches'] += 1
+            except Exception as e:
+                self.metrics['errors'] += 1
+                print(f"Error writing batch to {self.path}: {e}")
+            finally:
+                for _ in range(taken):
+                    self._queue.task_done()
+
+    def _write_batch(self, batch):
+        if self._file is None:
+            self._file = open(self.path, "a")
+        self._file.write("".join(batch))
+        self._file.flush()
+        now = time.monotonic()
+        if self.fsync == 'batch' or (self.fsync == 'interval' and now - self._last_fsync >= self.fsync_interval):
+            os.fsync(self._file.fileno())
+            self._last_fsync = now
+            self.metrics['fsyncs'] += 1
+
+    async def flush(self):
+        """Записує все, що є в черзі, не чекаючи flush_interval."""
+        if self._queue is None:
+            return
+        self._ensure_started()
+        await self._queue.put(_FLUSH)
+        await self._queue.join()
+
+    def get_metrics(self):
+        metrics = dict(self.metrics)
+        metrics['queue_depth'] = self._queue.qsize() if self._queue is not None else 0
+        metrics['avg_batch_size'] = metrics['written'] / metrics['batches'] if metrics['batches'] else 0.0
+        return metrics
+
+    async def close(self):
+        """Дописує залишок черги, зупиняє задачу запису і закриває файл."""
+        await self.flush()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._file is not None:
+            if self.fsync != 'never':
+                os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
@@ -0,0 +1,230 @@
+import math
+import time
+from collections import deque
+
+EPSILON = 1e-12
+
+
+class CurrencyGraph:
+    """Граф валют з ребрами -log(курс) для пошуку циклічного арбітражу."""
+
+    def __init__(self, fee=0.001, exchange_fees=None, transfer_cost=None, cross_exchange=True):
+        self.fee = fee
+        self.exchange_fees = exchange_fees or {}
+        self.transfer_cost = transfer_cost
+        self.cross_exchange = cross_exchange
+        self.node_index = {}
+        self.nodes = []
+        self.adjacency = []
+        self.in_neighbours = []
+        self._nodes_by_currency = {}
+        # Зміни з моменту останнього сканування, які забирає CycleDetector
+        self.decreased = set()
+        self.increased = set()
+
+    def get_node(self, exchange_name, currency):
+        node = (exchange_name, currency)
+        node_id = self.node_index.get(node)
+        if node_id is not None:
+            return node_id
+
+        node_id = len(self.nodes)
+        self.node_index[node] = node_id
+        self.nodes.append(node)
+        self.adjacency.append({})
+        self.in_neighbours.append(set())
+
+        # Переказ тієї ж валюти між біржами
+        if self.cross_exchange and self.transfer_cost is not None:
+            weight = -math.log(1 - self.transfer_cost)
+            for other_id in self._nodes_by_currency.get(currency, []):
+                self.set_edge(node_id, other_id, weight)
+                self.set_edge(other_id, node_id, weight)
+        self._nodes_by_currency.setdefault(currency, []).append(node_id)
+        return node_id
+
+    def set_edge(self, source, target, weight):
+        old_weight = self.adjacency[source].get(target)
+        self.adjacency[source][target] = weight
+        self.in_neighbours[target].add(source)
+        if old_weight is None or weight < old_weight:
+            self.decreased.add(source)
+        elif weight > old_weight:
+            self.increased.add((source, target))
+
+    def update_market(self, exchange_name, base, quote, bid, ask):
+        """Оновлює ребра ринку base/quote: продаж base за bid і купівлю base за ask."""
+        if not bid or not ask or bid <= 0 or ask <= 0:
+            return
+        keep = 1 - self.exchange_fees.get(exchange_name, self.fee)
+        base_id = self.get_node(exchange_name, base)
+        quote_id = self.get_node(exchange_name, quote)
+        self.set_edge(base_id, quote_id, -math.log(bid * keep))
+        self.set_edge(quote_id, base_id, -math.log(keep / ask))
+
+    def load_snapshots(self, snapshots, markets_by_exchange):
+        """Завантажує котирування з TickerSnapshot, використовуючи base/quote з метаданих ринків."""
+        for exchange_name, snapshot in snapshots.items():
+            markets = markets_by_exchange.get(exchange_name, {})
+            for symbol, quote in snapshot.quotes.items():
+                market = markets.get(symbol)
+                if not market:
+                    continue
+                bid = quote.bid if quote.bid is not None else quote.last
+                ask = quote.ask if quote.ask is not None else quote.last
+                self.update_market(exchange_name, market['base'], market['quote'], bid, ask)
+
+    def cycle_weight(self, cycle):
+        weight = 0.0
+        for i, source in enumerate(cycle):
+            target = cycle[(i + 1) % len(cycle)]
+            edge_weight = self.adjacency[source].get(target)
+            if edge_weight is None:
+                return None
+            weight += edge_weight
+        return weight
+
+    def drain_changes(self):
+        decreased, increased = self.decreased, self.increased
+        self.decreased, self.increased = set(), set()
+        return decreased, increased
+
+
+class CycleDetector:
+    """Інкрементальний пошук від'ємних циклів (SPFA з теплим стартом) з бюджетом на сканування."""
+
+    def __init__(self, graph, time_budget=0.003, max_relaxations=100000, min_profit=0.0):
+        self.graph = graph
+        self.time_budget = time_budget
+        self.max_relaxations = max_relaxations
+        self.min_profit = min_profit
+        self.dist = []
+        self.pred = []
+        self.queue = deque()
+        self.in_queue = set()
+        self.last_scan_stats = {}
+
+    def _enqueue(self, node_id):
+        if node_id not in self.in_queue:
+            self.queue.append(node_id)
+            self.in_queue.add(node_id)
+
+    def _apply_changes(self):
+        # Нові вершини стартують з віртуального джерела з відстанню 0
+        while len(self.dist) < len(self.graph.nodes):
+            self.dist.append(0.0)
+            self.pred.append(None)
+            self._enqueue(len(self.dist) - 1)
+
+        decreased, increased = self.graph.drain_changes()
+        for source in decreased:
+            self._enqueue(source)
+        for source, target in increased:
+            if self.pred[target] == source:
+                # Відстань target могла бути отримана через старе, дешевше ребро
+                self.dist[target] = 0.0
+                self.pred[target] = None
+                for neighbour in self.graph.in_neighbours[target]:
+                    self._enqueue(neighbour)
+
+    def _find_pred_cycle(self):
+        visited = [0] * len(self.pred)
+        for start in range(len(self.pred)):
+            if visited[start]:
+                continue
+            walk_id = start + 1
+            node = start
+            while node is not None and not visited[node]:
+                visited[node] = walk_id
+                node = self.pred[node]
+            if node is not None and visited[node] == walk_id:
+                cycle = [node]
+                current = self.pred[node]
+                while current != node:
+                    cycle.append(current)
+                    current = self.pred[current]
+                cycle.reverse()
+                return cycle
+        return None
+
+    def _format_cycle(self, cycle, weight):
+        path = [self.graph.nodes[node_id] for node_id in cycle]
+        # Починаємо цикл зі стейблкоїна, якщо він є, інакше з найменшої вершини
+        start = min(range(len(path)), key=lambda i: (path[i][1] not in ("USDT", "USD"), path[i]))
+        path = path[start:] + path[:start]
+        return {
+            'path': path,
+            'exchanges': sorted({exchange_name for exchange_name, _ in path}),
+            'profit': math.exp(-weight) - 1
+        }
+
+    def _collect_cycle(self, cycles, seen, blocked):
+        cycle = self._find_pred_cycle()
+        if cycle is None:
+            return False
+
+        for i, source in enumerate(cycle):
+            blocked.add((source, cycle[(i + 1) % len(cycle)]))
+        for node_id in cycle:
+            self.pred[node_id] = None
+
+        weight = self.graph.cycle_weight(cycle)
+        if weight is not None and weight < -EPSILON:
+            key = frozenset(cycle)
+            profit = math.exp(-weight) - 1
+            if key not in seen and profit >= self.min_profit:
+                seen.add(key)
+                cycles.append(self._format_cycle(cycle, weight))
+        return True
+
+    def scan(self):
+        """Шукає прибуткові цикли, не виходячи за бюджет часу та релаксацій."""
+        started_at = time.perf_counter()
+        deadline = started_at + self.time_budget
+        self._apply_changes()
+
+        cycles = []
+        seen = set()
+        blocked = set()
+        relaxations = 0
+        check_every = max(len(self.graph.nodes), 1)
+        adjacency = self.graph.adjacency
+        dist = self.dist
+        pred = self.pred
+        exhausted = False
+
+        while self.queue:
+            if relaxations >= self.max_relaxations or time.perf_counter() > deadline:
+                exhausted = True
+                break
+            source = self.queue.popleft()
+            self.in_queue.discard(source)
+            source_dist = dist[source]
+            for target, weight in adjacency[source].items():
+                if (source, target) in blocked:
+                    continue
+                new_dist = source_dist + weight
+                if new_dist < dist[target] - EPSILON:
+                    dist[target] = new_dist
+                    pred[target] = source
+                    relaxations += 1
+                    self._enqueue(target)
+                    if relaxations % check_every == 0:
+                        self._collect_cycle(cycles, seen, blocked)
+
+        if not exhausted:
+            while self._collect_cycle(cycles, seen, blocked):
+                pass
+
+        # Заблоковані ребра перевіряються знову під час наступного сканування
+        for source, _ in blocked:
+            self._enqueue(source)
+
+        cycles.sort(key=lambda cycle: cycle['profit'], reverse=True)
+        self.last_scan_stats = {
+            'relaxations': relaxations,
+            'pending': len(self.queue),
+            'exhausted': exhausted,
+            'elapsed': time.perf_counter() - started_at
+        }
+        return cycles
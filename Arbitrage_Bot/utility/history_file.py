@@ -0,0 +1,133 @@
+import json
+import os
+from bisect import bisect_right
+
+# Швидкий декодер JSON, якщо встановлено orjson або msgspec
+try:
+    import orjson
+    decode_json = orjson.loads
+except ImportError:
+    try:
+        import msgspec
+        decode_json = msgspec.json.decode
+    except ImportError:
+        decode_json = json.loads
+
+
+def to_timestamp(value):
+    if value is None or isinstance(value, (int, float)):
+        return value
+    return value.timestamp()
+
+
+class TransactionHistoryReader:
+    """Потокове читання JSONL-журналу транзакцій з фільтрами і розрідженим індексом зміщень у файлі .idx."""
+
+    def __init__(self, path, index_interval=1000):
+        self.path = path
+        self.index_path = path + ".idx"
+        self.index_interval = index_interval
+        # Контрольні точки: (timestamp, зміщення у байтах, номер запису)
+        self.checkpoints = []
+        self._scanned_offset = 0
+        self._scanned_records = 0
+        self._load_index()
+
+    def _load_index(self):
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, "r") as file:
+            for line in file:
+                if not line.endswith("\n"):
+                    break
+                timestamp, offset, record = line.split(",")
+                self.checkpoints.append((float(timestamp), int(offset), int(record)))
+        if self.checkpoints:
+            # Хвіст після останньої контрольної точки переглядається заново
+            _, self._scanned_offset, self._scanned_records = self.checkpoints[-1]
+
+    def update_index(self):
+        """Дочитує лише нові рядки журналу і дописує контрольні точки кожні index_interval записів."""
+        if not os.path.exists(self.path) or os.path.getsize(self.path) <= self._scanned_offset:
+            return
+        new_checkpoints = []
+        with open(self.path, "rb") as file:
+            file.seek(self._scanned_offset)
+            offset = self._scanned_offset
+            for line in file:
+                if not line.endswith(b"\n"):
+                    # Рядок ще дописується
+                    break
+                indexed = self.checkpoints and self.checkpoints[-1][2] >= self._scanned_records
+                if self._scanned_records % self.index_interval == 0 and not indexed:
+                    timestamp = self._record_timestamp(line)
+                    if timestamp is not None:
+                        new_checkpoints.append((timestamp, offset, self._scanned_records))
+                offset += len(line)
+                self._scanned_records += 1
+            self._scanned_offset = offset
+
+        if new_checkpoints:
+            with open(self.index_path, "a") as file:
+                file.writelines(f"{timestamp},{offset},{record}\n" for timestamp, offset, record in new_checkpoints)
+            self.checkpoints.extend(new_checkpoints)
+
+    @staticmethod
+    def _record_timestamp(line):
+        # Битий JSON, запис не-словник або запис без мітки часу в індекс не потрапляє
+        try:
+            timestamp = decode_json(line)['timestamp']
+        except (ValueError, TypeError, KeyError):
+            return None
+        return float(timestamp) if isinstance(timestamp, (int, float)) else None
+
+    def _start_offset(self, start):
+        # Записи дописуються в хронологічному порядку, тому шукаємо останню точку до start
+        if start is None or not self.checkpoints:
+            return 0
+        index = bisect_right(self.checkpoints, (start, -1, -1)) - 1
+        return self.checkpoints[index][1] if index >= 0 else 0
+
+    def iter_records(self, start=None, end=None, symbol=None, venue=None, min_profit=None):
+        """Генератор записів, що відповідають фільтрам; у пам'яті одночасно лише один запис."""
+        if not os.path.exists(self.path):
+            return
+        self.update_index()
+        start = to_timestamp(start)
+        end = to_timestamp(end)
+        # Дешева перевірка по сирих байтах до декодування рядка
+        symbol_token = json.dumps(symbol).encode() if symbol is not None else None
+        venue_token = json.dumps(venue).encode() if venue is not None else None
+
+        with open(self.path, "rb") as file:
+            file.seek(self._start_offset(start))
+            for line in file:
+                if not line.endswith(b"\n"):
+                    break
+                if symbol_token is not None and symbol_token not in line:
+                    continue
+                if venue_token is not None and venue_token not in line:
+                    continue
+                record = decode_json(line)
+                if not isinstance(record, dict):
+                    continue
+                timestamp = record.get('timestamp')
+                if start is not None or end is not None:
+                    if timestamp is None:
+                        continue
+                    if start is not None and timestamp < start:
+                        continue
+                    if end is not None and timestamp > end:
+                        break
+                if symbol is not None and record.get('symbol') != symbol:
+                    continue
+                if venue is not None and venue not in (record.get('exchange'), record.get('buy_exchange'), record.get('sell_exchange')):
+                    continue
+                if min_profit is not None and (record.get('profit') is None or record['profit'] < min_profit):
+                    continue
+                yield record
+
+    def count(self):
+        self.update_index()
+        return self._scanned_records
+
@@ -0,0 +1,73 @@
+import random
+import time
+
+
+class VirtualClock:
+    """Детермінований віртуальний годинник: симуляція пересуває його замість реального очікування."""
+
+    def __init__(self, start=None):
+        self.current = time.time() if start is None else start
+
+    def now(self):
+        return self.current
+
+    def advance_to(self, timestamp):
+        if timestamp > self.current:
+            self.current = timestamp
+
+    def sleep(self, seconds):
+        self.current += seconds
+
+    def reset(self, timestamp):
+        self.current = timestamp
+
+
+class LatencyModel:
+    """Випадкова затримка виконання ордера з окремим розподілом для кожної біржі та сторони угоди."""
+
+    DEFAULT = {"distribution": "uniform", "low": 0.05, "high": 0.5}
+
+    def __init__(self, default=None, exchanges=None, seed=None):
+        self.default = default or self.DEFAULT
+        self.exchanges = exchanges or {}
+        self.random = random.Random(seed)
+        self.samples = 0
+        self.total_latency = 0.0
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            default=config.get("default"),
+            exchanges=config.get("exchanges", {}),
+            seed=config.get("seed")
+        )
+
+    def get_distribution(self, exchange_name, leg):
+        venue = self.exchanges.get(exchange_name, {})
+        if leg in venue:
+            return venue[leg]
+        if "distribution" in venue:
+            return venue
+        return self.default
+
+    def sample(self, exchange_name, leg):
+        """Повертає затримку в секундах для ноги 'buy' або 'sell' на біржі."""
+        params = self.get_distribution(exchange_name, leg)
+        distribution = params.get("distribution", "fixed")
+        if distribution == "fixed":
+            latency = params.get("value", 0.0)
+        elif distribution == "uniform":
+            latency = self.random.uniform(params["low"], params["high"])
+        elif distribution == "normal":
+            latency = self.random.gauss(params["mean"], params["std"])
+        elif distribution == "lognormal":
+            latency = self.random.lognormvariate(params["mu"], params["sigma"])
+        elif distribution == "exponential":
+            latency = self.random.expovariate(1 / params["mean"])
+        else:
+            raise ValueError(f"Unknown latency distribution: {distribution}")
+
+        latency = max(latency, params.get("min", 0.0))
+        self.samples += 1
+        self.total_latency += latency
+        return latency
@@ -0,0 +1,137 @@
+import numpy as np
+
+
+class BalanceLedger:
+    """Баланси симуляції у 2-D масиві [біржа, актив]; назви бірж і активів інтернуються в цілі id."""
+
+    CASH = "balance"
+
+    def __init__(self, venues=(), assets=()):
+        self.venues = []
+        self.assets = []
+        self.venue_ids = {}
+        self.asset_ids = {}
+        self.balances = np.zeros((4, 8))
+        # Колонка 0 завжди USDT-баланс, як ключ "balance" у старому словнику
+        self.asset_id(self.CASH)
+        for venue in venues:
+            self.venue_id(venue)
+        for asset in assets:
+            self.asset_id(asset)
+
+    @property
+    def shape(self):
+        return len(self.venues), len(self.assets)
+
+    def _grow(self, rows, columns):
+        # Місткість подвоюється, тому додавання нових бірж/активів амортизовано O(1)
+        capacity_rows, capacity_columns = self.balances.shape
+        if rows <= capacity_rows and columns <= capacity_columns:
+            return
+        new_rows = capacity_rows if rows <= capacity_rows else max(rows, capacity_rows * 2)
+        new_columns = capacity_columns if columns <= capacity_columns else max(columns, capacity_columns * 2)
+        grown = np.zeros((new_rows, new_columns))
+        grown[:capacity_rows, :capacity_columns] = self.balances
+        self.balances = grown
+
+    def venue_id(self, venue):
+        venue_id = self.venue_ids.get(venue)
+        if venue_id is None:
+            venue_id = len(self.venues)
+            self._grow(venue_id + 1, len(self.assets))
+            self.venues.append(venue)
+            self.venue_ids[venue] = venue_id
+        return venue_id
+
+    def asset_id(self, asset):
+        asset_id = self.asset_ids.get(asset)
+        if asset_id is None:
+            asset_id = len(self.assets)
+            self._grow(len(self.venues), asset_id + 1)
+            self.assets.append(asset)
+            self.asset_ids[asset] = asset_id
+        return asset_id
+
+    def get(self, venue, asset):
+        venue_id = self.venue_ids.get(venue)
+        asset_id = self.asset_ids.get(asset)
+        if venue_id is None or asset_id is None:
+            return 0
+        return float(self.balances[venue_id, asset_id])
+
+    def set(self, venue, asset, amount):
+        # id обчислюються до звернення до self.balances, бо інтернування може замінити масив
+        venue_id, asset_id = self.venue_id(venue), self.asset_id(asset)
+        self.balances[venue_id, asset_id] = amount
+
+    def add(self, venue, asset, amount):
+        venue_id, asset_id = self.venue_id(venue), self.asset_id(asset)
+        self.balances[venue_id, asset_id] += amount
+
+    def add_by_id(self, venue_id, asset_id, amount):
+        self.balances[venue_id, asset_id] += amount
+
+    def view(self):
+        """Активна частина масиву балансів (view, без копіювання)."""
+        rows, columns = self.shape
+        return self.balances[:rows, :columns]
+
+    def mark_to_market(self, prices):
+        """Вартість кожної біржі в USDT; prices - масив [біржа, актив] цін у USDT (для колонки CASH - 1)."""
+        return (self.view() * prices).sum(axis=1)
+
+    def convert_all_to_cash(self, prices):
+        """Переводить усі активи кожної біржі в USDT за цінами prices одним векторним кроком."""
+        values = self.mark_to_market(prices)
+        balances = self.view()
+        balances[:, :] = 0
+        balances[:, self.asset_ids[self.CASH]] = values
+        return values
+
+    def snapshot(self):
+        """Копія балансів; назви бірж і активів лише дописуються, тому id у знімку лишаються дійсними."""
+        return self.view().copy()
+
+    def restore(self, snapshot):
+        rows, columns = snapshot.shape
+        balances = self.view()
+        balances[:, :] = 0
+        balances[:rows, :columns] = snapshot
+
+    def price_matrix(self, price_for):
+        """Матриця цін [біржа, актив] лише для ненульових балансів; price_for(venue, asset) - ціна активу в USDT.
+
+        Якщо для активу з ненульовим балансом ціни немає, кидає ValueError, а не підставляє NaN.
+        """
+        prices = np.ones(self.shape)
+        cash = self.asset_ids[self.CASH]
+        venue_ids, asset_ids = np.nonzero(self.view())
+        for venue_id, asset_id in zip(venue_ids.tolist(), asset_ids.tolist()):
+            if asset_id == cash:
+                continue
+            venue, asset = self.venues[venue_id], self.assets[asset_id]
+            price = price_for(venue, asset)
+            if price is None or np.isnan(price):
+                raise ValueError(f"No USDT price for held {asset} on {venue}.")
+            prices[venue_id, asset_id] = price
+        return prices
+
+    def held_assets(self):
+        """{біржа: [валюти]} з ненульовим балансом, без USDT-колонки."""
+        held = {venue: [] for venue in self.venues}
+        cash = self.asset_ids[self.CASH]
+        venue_ids, asset_ids = np.nonzero(self.view())
+        for venue_id, asset_id in zip(venue_ids.tolist(), asset_ids.tolist()):
+            if asset_id != cash:
+                held[self.venues[venue_id]].append(self.assets[asset_id])
+        return held
+
+    def venue_balances(self, venue):
+        venue_id = self.venue_ids.get(venue)
+        if venue_id is None:
+            return {}
+        row = self.view()[venue_id]
+        return {asset: float(row[asset_id]) for asset_id, asset in enumerate(self.assets)}
+
+    def to_dict(self):
+        return {venue: self.venue_balances(venue) for venue in self.venues}
@@ -0,0 +1,106 @@
+from bisect import bisect_left
+from collections import OrderedDict
+from itertools import accumulate
+
+
+class BookDepth:
+    """Кумулятивна глибина однієї сторони стакану для швидких запитів за обсягом."""
+
+    def __init__(self, levels):
+        self.prices = [float(level[0]) for level in levels]
+        amounts = [float(level[1]) for level in levels]
+        self.cumulative_amounts = list(accumulate(amounts))
+        self.cumulative_costs = list(accumulate(price * amount for price, amount in zip(self.prices, amounts)))
+
+    @property
+    def total_amount(self):
+        return self.cumulative_amounts[-1] if self.cumulative_amounts else 0.0
+
+    def cost_for(self, amount):
+        """Вартість виконання обсягу amount по рівнях стакану, O(log рівнів)."""
+        if amount <= 0:
+            return 0.0
+        amount = min(amount, self.total_amount)
+        index = bisect_left(self.cumulative_amounts, amount)
+        if index >= len(self.prices):
+            return self.cumulative_costs[-1] if self.cumulative_costs else 0.0
+        filled_amount = self.cumulative_amounts[index - 1] if index else 0.0
+        filled_cost = self.cumulative_costs[index - 1] if index else 0.0
+        return filled_cost + (amount - filled_amount) * self.prices[index]
+
+    def vwap(self, amount):
+        amount = min(amount, self.total_amount)
+        if amount <= 0:
+            return None
+        return self.cost_for(amount) / amount
+
+    def price_at(self, amount):
+        """Ціна рівня, на якому буде виконано обсяг amount."""
+        index = bisect_left(self.cumulative_amounts, amount)
+        if index >= len(self.prices):
+            return None
+        return self.prices[index]
+
+
+class LiquidityEngine:
+    """Розрахунок максимального прибуткового обсягу по стаканах обох бірж."""
+
+    def __init__(self, fee=0.001, exchange_fees=None, cache_size=256):
+        self.fee = fee
+        self.exchange_fees = exchange_fees or {}
+        self.cache_size = cache_size
+        self._depths = OrderedDict()
+
+    def get_fee(self, exchange_name):
+        return self.exchange_fees.get(exchange_name, self.fee)
+
+    def get_depth(self, order_book, side, exchange_name=None):
+        """Повертає (з кешу) кумулятивну глибину для сторони 'bids' або 'asks'."""
+        # Знімок ідентифікується за nonce/timestamp; без них глибина не кешується
+        if order_book.get('nonce') is None and order_book.get('timestamp') is None:
+            return BookDepth(order_book.get(side) or [])
+
+        key = (exchange_name, order_book.get('symbol'), order_book.get('nonce'), order_book.get('timestamp'), side)
+        depth = self._depths.get(key)
+        if depth is None:
+            depth = BookDepth(order_book.get(side) or [])
+            self._depths[key] = depth
+            while len(self._depths) > self.cache_size:
+                self._depths.popitem(last=False)
+        else:
+            self._depths.move_to_end(key)
+        return depth
+
+    def size_opportunity(self, buy_order_book, sell_order_book, buy_exchange=None, sell_exchange=None, max_amount=None):
+        """Проходить обидва стакани по рівнях і знаходить обсяг, на якому граничний прибуток ще додатний."""
+        asks = self.get_depth(buy_order_book, 'asks', buy_exchange)
+        bids = self.get_depth(sell_order_book, 'bids', sell_exchange)
+        buy_multiplier = 1 + self.get_fee(buy_exchange)
+        sell_multiplier = 1 - self.get_fee(sell_exchange)
+
+        limit = min(asks.total_amount, bids.total_amount)
+        if max_amount is not None:
+            limit = min(limit, max_amount)
+
+        amount = 0.0
+        ask_index = bid_index = 0
+        while amount < limit and ask_index < len(asks.prices) and bid_index < len(bids.prices):
+            if bids.prices[bid_index] * sell_multiplier <= asks.prices[ask_index] * buy_multiplier:
+                break
+            # Наступна межа - кінець поточного рівня на будь-якій зі сторін
+            amount = min(asks.cumulative_amounts[ask_index], bids.cumulative_amounts[bid_index], limit)
+            if amount >= asks.cumulative_amounts[ask_index]:
+                ask_index += 1
+            if amount >= bids.cumulative_amounts[bid_index]:
+                bid_index += 1
+
+        buy_cost = asks.cost_for(amount) * buy_multiplier
+        sell_proceeds = bids.cost_for(amount) * sell_multiplier
+        return {
+            'amount': amount,
+            'buy_vwap': asks.vwap(amount),
+            'sell_vwap': bids.vwap(amount),
+            'buy_cost': buy_cost,
+            'sell_proceeds': sell_proceeds,
+            'profit': sell_proceeds - buy_cost
+        }
@@ -0,0 +1,207 @@
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import deque
+
+
+class BookSide:
+    """Одна сторона стакану: ключі цін та обсяги в суцільних масивах, найкращий рівень - перший."""
+
+    def __init__(self, descending):
+        # Для bids зберігаємо від'ємну ціну, щоб обидві сторони були відсортовані за зростанням ключа
+        self.descending = descending
+        self.keys = array('d')
+        self.sizes = array('d')
+        self._cumulative = None
+
+    def _key(self, price):
+        return -price if self.descending else price
+
+    def _price(self, key):
+        return -key if self.descending else key
+
+    def __len__(self):
+        return len(self.keys)
+
+    def clear(self):
+        self.keys = array('d')
+        self.sizes = array('d')
+        self._cumulative = None
+
+    def load(self, levels):
+        ordered = sorted(((self._key(float(level[0])), float(level[1])) for level in levels if float(level[1]) > 0))
+        self.keys = array('d', (key for key, _ in ordered))
+        self.sizes = array('d', (size for _, size in ordered))
+        self._cumulative = None
+
+    def set_level(self, price, size):
+        """Вставляє, оновлює або (при size == 0) видаляє рівень, зберігаючи сортування."""
+        key = self._key(float(price))
+        index = bisect_left(self.keys, key)
+        exists = index < len(self.keys) and self.keys[index] == key
+        if size == 0:
+            if exists:
+                del self.keys[index]
+                del self.sizes[index]
+        elif exists:
+            self.sizes[index] = size
+        else:
+            self.keys.insert(index, key)
+            self.sizes.insert(index, size)
+        self._cumulative = None
+
+    def best(self):
+        if not self.keys:
+            return None
+        return self._price(self.keys[0]), self.sizes[0]
+
+    def size_at(self, price):
+        key = self._key(float(price))
+        index = bisect_left(self.keys, key)
+        if index < len(self.keys) and self.keys[index] == key:
+            return self.sizes[index]
+        return 0.0
+
+    def _get_cumulative(self):
+        # Перераховується лише після змін, далі запити O(log n)
+        if self._cumulative is None:
+            cumulative = array('d')
+            total = 0.0
+            for size in self.sizes:
+                total += size
+                cumulative.append(total)
+            self._cumulative = cumulative
+        return self._cumulative
+
+    def cumulative_volume(self, price):
+        """Сумарний обсяг на рівнях, не гірших за price."""
+        index = bisect_right(self.keys, self._key(float(price)))
+        if index == 0:
+            return 0.0
+        return self._get_cumulative()[index - 1]
+
+    def levels(self, limit=None):
+        count = len(self.keys) if limit is None else min(limit, len(self.keys))
+        return [[self._price(self.keys[i]), self.sizes[i]] for i in range(count)]
+
+
+class IncrementalOrderBook:
+    """Стакан, що оновлюється диференціями з контролем пропусків послідовності та ресинхронізацією.
+
+    Пропуски виявляються лише для послідовних потоків (nonce у знімку, sequence у диференціях).
+    Для бірж без номерів послідовності втрату повідомлення помітити неможливо, тому такий стакан
+    примусово ресинхронізується знімком кожні resync_interval секунд.
+    """
+
+    def __init__(self, symbol, exchange_name=None, resync=None, max_pending=1000, resync_interval=30):
+        self.symbol = symbol
+        self.exchange_name = exchange_name
+        self.resync = resync
+        self.resync_interval = resync_interval
+        self.synced_at = None
+        self.bids = BookSide(descending=True)
+        self.asks = BookSide(descending=False)
+        self.sequence = None
+        self.timestamp = None
+        self.needs_resync = True
+        self.gaps = 0
+        self._pending = deque(maxlen=max_pending)
+
+    def apply_snapshot(self, snapshot):
+        """Завантажує повний знімок і доганяє буферизовані диференції, новіші за нього."""
+        self.bids.load(snapshot.get('bids') or [])
+        self.asks.load(snapshot.get('asks') or [])
+        self.sequence = snapshot.get('nonce')
+        self.timestamp = snapshot.get('timestamp')
+        self.needs_resync = False
+        self.synced_at = time.monotonic()
+
+        pending = list(self._pending)
+        self._pending.clear()
+        for index, diff in enumerate(pending):
+            # Без номерів послідовності диференцію не можна порівняти зі знімком, отриманим після неї
+            if self.sequence is None or diff.get('sequence') is None or diff['sequence'] <= self.sequence:
+                continue
+            if self._has_gap(diff):
+                # Знімок усе ще старіший за буфер - чекаємо наступної ресинхронізації
+                self.needs_resync = True
+                self._pending.extend(pending[index:])
+                break
+            self._apply_levels(diff)
+
+    def _is_sequenced(self, diff):
+        return self.sequence is not None and diff.get('sequence') is not None
+
+    def _resync_due(self):
+        if self.resync_interval is None or self.synced_at is None:
+            return False
+        return time.monotonic() - self.synced_at >= self.resync_interval
+
+    def _has_gap(self, diff):
+        if not self._is_sequenced(diff):
+            return False
+        if 'prev_sequence' in diff:
+            return diff['prev_sequence'] != self.sequence
+        return diff['sequence'] != self.sequence + 1
+
+    def apply_diff(self, diff):
+        """Застосовує diff {'bids', 'asks', 'sequence'[, 'prev_sequence', 'timestamp']}; False, якщо потрібна ресинхронізація."""
+        if self.needs_resync:
+            self._pending.append(diff)
+            return False
+        if not self._is_sequenced(diff):
+            self._apply_levels(diff)
+            # Пропуск тут не видно, тож стан періодично звіряється з повним знімком
+            if self._resync_due():
+                self.needs_resync = True
+                if self.resync is not None:
+                    self.resync_now()
+            return True
+        if diff['sequence'] <= self.sequence:
+            # Застаріле повідомлення
+            return True
+        if self._has_gap(diff):
+            self.gaps += 1
+            self.needs_resync = True
+            self._pending.append(diff)
+            if self.resync is not None:
+                self.resync_now()
+            return not self.needs_resync
+
+        self._apply_levels(diff)
+        return True
+
+    def _apply_levels(self, diff):
+        for price, size in diff.get('bids', []):
+            self.bids.set_level(price, float(size))
+        for price, size in diff.get('asks', []):
+            self.asks.set_level(price, float(size))
+        if diff.get('sequence') is not None:
+            self.sequence = diff['sequence']
+        self.timestamp = diff.get('timestamp', self.timestamp)
+
+    def resync_now(self):
+        self.needs_resync = True
+        self.apply_snapshot(self.resync())
+
+    def best_bid(self):
+        return self.bids.best()
+
+    def best_ask(self):
+        return self.asks.best()
+
+    def depth_at(self, side, price):
+        return (self.bids if side == 'bids' else self.asks).size_at(price)
+
+    def cumulative_volume(self, side, price):
+        return (self.bids if side == 'bids' else self.asks).cumulative_volume(price)
+
+    def to_ccxt(self, limit=None):
+        """Повертає стакан у форматі ccxt; nonce дозволяє LiquidityEngine кешувати глибину."""
+        return {
+            'symbol': self.symbol,
+            'bids': self.bids.levels(limit),
+            'asks': self.asks.levels(limit),
+            'nonce': self.sequence,
+            'timestamp': self.timestamp
+        }
@@ -0,0 +1,222 @@
+import asyncio
+import json
+import os
+import threading
+import time
+
+# Менше значення - вищий пріоритет
+ENDPOINT_PRIORITIES = {
+    'orders': 0,
+    'account': 1,
+    'market_data': 2
+}
+
+# Єдине джерело налаштувань лімітів для sync та async коду - секція rate_limits цього файлу
+RATE_LIMITS_CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config', 'config.json')
+
+_shared_limiter = None
+_shared_limiter_lock = threading.Lock()
+
+
+class TokenBucket:
+    """Відро токенів: rate токенів за секунду, не більше capacity."""
+
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+
+    def refill(self, now):
+        # updated_at може бути в майбутньому, якщо біржу призупинено після 429
+        if now <= self.updated_at:
+            return
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_time(self, cost, floor=0.0):
+        """Скільки чекати, доки після списання cost у відрі залишиться не менше floor токенів."""
+        missing = cost + floor - self.tokens
+        if missing <= 0:
+            return 0.0
+        return missing / self.rate if self.rate > 0 else float('inf')
+
+
+class RateLimiter:
+    """Клієнтський ліміт запитів по біржах і класах запитів, спільний для sync та async коду."""
+
+    def __init__(self, limits=None, default_rate=10, default_capacity=20, order_reserve=0.2, penalty=5):
+        self.limits = limits or {}
+        self.default_rate = default_rate
+        self.default_capacity = default_capacity
+        self.order_reserve = order_reserve
+        self.penalty = penalty
+        self._venue_buckets = {}
+        self._class_buckets = {}
+        self._blocked_until = {}
+        self._waiting = {}
+        self._throttled = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        default = config.get("default", {})
+        return cls(
+            limits=config.get("exchanges", {}),
+            default_rate=default.get("rate", 10),
+            default_capacity=default.get("capacity", 20),
+            order_reserve=config.get("order_reserve", 0.2),
+            penalty=config.get("penalty", 5)
+        )
+
+    def _get_buckets(self, venue, endpoint_class):
+        venue_bucket = self._venue_buckets.get(venue)
+        if venue_bucket is None:
+            venue_limits = self.limits.get(venue, {})
+            venue_bucket = TokenBucket(
+                venue_limits.get("rate", self.default_rate),
+                venue_limits.get("capacity", self.default_capacity)
+            )
+            self._venue_buckets[venue] = venue_bucket
+
+        key = (venue, endpoint_class)
+        if key not in self._class_buckets:
+            class_limits = self.limits.get(venue, {}).get("classes", {}).get(endpoint_class)
+            self._class_buckets[key] = TokenBucket(class_limits["rate"], class_limits["capacity"]) if class_limits else None
+        return venue_bucket, self._class_buckets[key]
+
+    def _has_priority_waiters(self, venue, priority):
+        return any(count for (waiting_venue, waiting_priority), count in self._waiting.items()
+                   if waiting_venue == venue and waiting_priority < priority)
+
+    def _try_acquire(self, venue, endpoint_class, cost):
+        """Списує токени, якщо можна, і повертає 0; інакше повертає час очікування."""
+        priority = ENDPOINT_PRIORITIES.get(endpoint_class, max(ENDPOINT_PRIORITIES.values()))
+        with self._lock:
+            now = time.monotonic()
+            blocked_for = self._blocked_until.get(venue, 0) - now
+            if blocked_for > 0:
+                return blocked_for
+
+            venue_bucket, class_bucket = self._get_buckets(venue, endpoint_class)
+            # Запит, більший за відро, не пройде ніколи - краще помилка, ніж вічне очікування
+            if cost > venue_bucket.capacity or (class_bucket is not None and cost > class_bucket.capacity):
+                raise ValueError(f"Вартість запиту {cost} перевищує місткість відра для {venue}/{endpoint_class}")
+            venue_bucket.refill(now)
+            # Поки чекають ордери, менш пріоритетні запити поступаються
+            if self._has_priority_waiters(venue, priority):
+                return max(cost / venue_bucket.rate, 0.001) if venue_bucket.rate > 0 else float('inf')
+
+            # Частина відра зарезервована для запитів з вищим пріоритетом
+            floor = 0.0 if priority == 0 else venue_bucket.capacity * self.order_reserve
+            # Резерв не може бути таким, щоб запит не вміщався навіть у повне відро
+            floor = min(floor, max(venue_bucket.capacity - cost, 0.0))
+            wait = venue_bucket.wait_time(cost, floor)
+            if class_bucket is not None:
+                class_bucket.refill(now)
+                wait = max(wait, class_bucket.wait_time(cost))
+            if wait > 0:
+                return wait
+
+            venue_bucket.tokens -= cost
+            if class_bucket is not None:
+                class_bucket.tokens -= cost
+            return 0.0
+
+    def _set_waiting(self, venue, endpoint_class, delta):
+        priority = ENDPOINT_PRIORITIES.get(endpoint_class, max(ENDPOINT_PRIORITIES.values()))
+        with self._lock:
+            key = (venue, priority)
+            self._waiting[key] = self._waiting.get(key, 0) + delta
+            if delta > 0:
+                self._throttled[venue] = self._throttled.get(venue, 0) + 1
+
+    def acquire(self, venue, endpoint_class='market_data', cost=1):
+        """Блокуюче очікування токенів для синхронного коду."""
+        wait = self._try_acquire(venue, endpoint_class, cost)
+        if wait == 0:
+            return
+        self._set_waiting(venue, endpoint_class, 1)
+        try:
+            while wait > 0:
+                time.sleep(wait)
+                wait = self._try_acquire(venue, endpoint_class, cost)
+        finally:
+            self._set_waiting(venue, endpoint_class, -1)
+
+    async def acquire_async(self, venue, endpoint_class='market_data', cost=1):
+        """Неблокуюче очікування токенів для асинхронного коду."""
+        wait = self._try_acquire(venue, endpoint_class, cost)
+        if wait == 0:
+            return
+        self._set_waiting(venue, endpoint_class, 1)
+        try:
+            while wait > 0:
+                await asyncio.sleep(wait)
+                wait = self._try_acquire(venue, endpoint_class, cost)
+        finally:
+            self._set_waiting(venue, endpoint_class, -1)
+
+    def penalize(self, venue, seconds=None):
+        """Призупиняє всі запити до біржі після відповіді 429."""
+        if seconds is None:
+            seconds = self.penalty
+        with self._lock:
+            self._blocked_until[venue] = max(self._blocked_until.get(venue, 0), time.monotonic() + seconds)
+            bucket = self._venue_buckets.get(venue)
+            if bucket is not None:
+                bucket.tokens = 0.0
+                bucket.updated_at = time.monotonic() + seconds
+
+    def get_occupancy(self):
+        """Повертає заповненість відер, кількість очікуючих запитів та блокування по біржах."""
+        with self._lock:
+            now = time.monotonic()
+            occupancy = {}
+            for venue, bucket in self._venue_buckets.items():
+                bucket.refill(now)
+                classes = {}
+                for (class_venue, endpoint_class), class_bucket in self._class_buckets.items():
+                    if class_venue != venue or class_bucket is None:
+                        continue
+                    class_bucket.refill(now)
+                    classes[endpoint_class] = {'tokens': class_bucket.tokens, 'capacity': class_bucket.capacity}
+                occupancy[venue] = {
+                    'tokens': bucket.tokens,
+                    'capacity': bucket.capacity,
+                    'utilization': 1 - bucket.tokens / bucket.capacity if bucket.capacity else 0.0,
+                    'classes': classes,
+                    'waiting': {endpoint_class: self._waiting.get((venue, priority), 0) for endpoint_class, priority in ENDPOINT_PRIORITIES.items()},
+                    'throttled': self._throttled.get(venue, 0),
+                    'blocked_for': max(self._blocked_until.get(venue, 0) - now, 0.0)
+                }
+            return occupancy
+
+
+def load_rate_limits_config(config_path=RATE_LIMITS_CONFIG_PATH):
+    """Зчитує секцію rate_limits зі спільного конфігураційного файлу."""
+    try:
+        with open(config_path, 'r') as file:
+            return json.load(file).get("rate_limits", {})
+    except FileNotFoundError:
+        return {}
+
+
+def get_shared_limiter(config=None):
+    """Повертає лімітер, спільний для всього процесу.
+
+    Створюється при першому виклику з переданої секції (або з RATE_LIMITS_CONFIG_PATH),
+    подальші виклики повертають той самий екземпляр, тож sync і async клієнти ділять відра.
+    """
+    global _shared_limiter
+    with _shared_limiter_lock:
+        if _shared_limiter is None:
+            _shared_limiter = RateLimiter.from_config(config if config is not None else load_rate_limits_config())
+        return _shared_limiter
+
+
+def reset_shared_limiter():
+    """Скидає спільний лімітер (для тестів і перечитування конфігурації)."""
+    global _shared_limiter
+    with _shared_limiter_lock:
+        _shared_limiter = None
@@ -0,0 +1,78 @@
+import numpy as np
+
+
+class VectorizedScanner:
+    """Векторизований пошук арбітражу по матриці котирувань (біржі × символи)."""
+
+    def __init__(self, exchanges, symbols, fee=0.001, exchange_fees=None):
+        self.exchanges = list(exchanges)
+        self.symbols = list(symbols)
+        self.exchange_index = {name: i for i, name in enumerate(self.exchanges)}
+        self.symbol_index = {symbol: j for j, symbol in enumerate(self.symbols)}
+
+        shape = (len(self.exchanges), len(self.symbols))
+        self.bids = np.full(shape, np.nan)
+        self.asks = np.full(shape, np.nan)
+
+        exchange_fees = exchange_fees or {}
+        self.fees = np.array([exchange_fees.get(name, fee) for name in self.exchanges], dtype=float)
+        # Купівля і продаж на одній біржі не є арбітражем
+        self._same_exchange = np.eye(len(self.exchanges), dtype=bool)[:, :, None]
+
+    def update_quote(self, exchange_name, symbol, bid, ask):
+        i = self.exchange_index[exchange_name]
+        j = self.symbol_index[symbol]
+        self.bids[i, j] = np.nan if bid is None else bid
+        self.asks[i, j] = np.nan if ask is None else ask
+
+    def load_snapshots(self, snapshots):
+        """Заповнює матрицю з TickerSnapshot кожної біржі."""
+        for exchange_name, snapshot in snapshots.items():
+            if exchange_name not in self.exchange_index:
+                continue
+            for symbol, quote in snapshot.quotes.items():
+                if symbol not in self.symbol_index:
+                    continue
+                # Якщо біржа не віддала bid/ask, використовуємо останню ціну
+                bid = quote.bid if quote.bid is not None else quote.last
+                ask = quote.ask if quote.ask is not None else quote.last
+                self.update_quote(exchange_name, symbol, bid, ask)
+
+    def compute_edges(self):
+        """Повертає матриці спредів та чистої дохідності (біржа купівлі × біржа продажу × символ)."""
+        asks = self.asks[:, None, :]
+        bids = self.bids[None, :, :]
+        buy_cost = asks * (1 + self.fees[:, None, None])
+        sell_proceeds = bids * (1 - self.fees[None, :, None])
+        with np.errstate(invalid='ignore', divide='ignore'):
+            spreads = bids - asks
+            edges = (sell_proceeds - buy_cost) / buy_cost
+        return spreads, edges
+
+    def scan(self, min_price_difference=0.0, min_edge=0.0):
+        """Знаходить усі можливості за один векторизований прохід, відсортовані за дохідністю."""
+        if not self.exchanges or not self.symbols:
+            return []
+
+        spreads, edges = self.compute_edges()
+        with np.errstate(invalid='ignore'):
+            mask = (spreads >= min_price_difference) & (edges > min_edge)
+        mask &= ~self._same_exchange
+        mask &= np.isfinite(edges)
+
+        buy_idx, sell_idx, symbol_idx = np.nonzero(mask)
+        found_edges = edges[buy_idx, sell_idx, symbol_idx]
+        order = np.argsort(-found_edges, kind='stable')
+
+        opportunities = []
+        for k in order:
+            i, l, j = buy_idx[k], sell_idx[k], symbol_idx[k]
+            opportunities.append({
+                'buy_exchange': self.exchanges[i],
+                'sell_exchange': self.exchanges[l],
+                'currency': self.symbols[j],
+                'buy_price': float(self.asks[i, j]),
+                'sell_price': float(self.bids[l, j]),
+                'edge': float(found_edges[k])
+            })
+        return opportunities
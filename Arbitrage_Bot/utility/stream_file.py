@@ -0,0 +1,393 @@
+import asyncio
+import heapq
+import threading
+import time
+from types import MappingProxyType
+
+from utility.arbitrage_file import Quote, TickerSnapshot, setup_class_logger
+
+
+class TopOfBookStore:
+    """Потокобезпечне сховище найкращих bid/ask по біржах для синхронного читання."""
+
+    def __init__(self, max_quote_age=5, clock=None):
+        self.max_quote_age = max_quote_age
+        # clock можна підмінити віртуальним годинником для відтворення історії
+        self.clock = clock or time.monotonic
+        self._quotes = {}
+        self._listeners = []
+        self._lock = threading.Lock()
+        self.updates = 0
+
+    def update(self, exchange_name, symbol, bid, ask, bid_size=None, ask_size=None, last=None, timestamp=None):
+        entry = {
+            'bid': bid,
+            'ask': ask,
+            'bid_size': bid_size,
+            'ask_size': ask_size,
+            'last': last,
+            'timestamp': timestamp,
+            'received_at': self.clock()
+        }
+        with self._lock:
+            self._quotes[(exchange_name, symbol)] = entry
+            self.updates += 1
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(exchange_name, symbol, entry)
+
+    def update_from_ticker(self, exchange_name, ticker):
+        self.update(
+            exchange_name,
+            ticker['symbol'],
+            ticker.get('bid'),
+            ticker.get('ask'),
+            bid_size=ticker.get('bidVolume'),
+            ask_size=ticker.get('askVolume'),
+            last=ticker.get('last'),
+            timestamp=ticker.get('timestamp')
+        )
+
+    def update_from_order_book(self, exchange_name, order_book):
+        bids = order_book.get('bids') or []
+        asks = order_book.get('asks') or []
+        self.update(
+            exchange_name,
+            order_book['symbol'],
+            bids[0][0] if bids else None,
+            asks[0][0] if asks else None,
+            bid_size=bids[0][1] if bids else None,
+            ask_size=asks[0][1] if asks else None,
+            timestamp=order_book.get('timestamp')
+        )
+
+    def add_listener(self, callback):
+        """Реєструє callback(exchange_name, symbol, entry), що викликається на кожне оновлення."""
+        with self._lock:
+            self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        with self._lock:
+            self._listeners.remove(callback)
+
+    def _is_fresh(self, entry, now):
+        return self.max_quote_age is None or now - entry['received_at'] <= self.max_quote_age
+
+    def get(self, exchange_name, symbol):
+        with self._lock:
+            entry = self._quotes.get((exchange_name, symbol))
+        if entry is None or not self._is_fresh(entry, self.clock()):
+            return None
+        return entry
+
+    def get_snapshot(self, exchange_name, symbols):
+        """Повертає TickerSnapshot з актуальних котирувань, як і REST-знімок ExchangeAPI."""
+        now = self.clock()
+        quotes = {}
+        with self._lock:
+            for symbol in symbols:
+                entry = self._quotes.get((exchange_name, symbol))
+                if entry is None or not self._is_fresh(entry, now):
+                    continue
+                last = entry['last']
+                if last is None and entry['bid'] is not None and entry['ask'] is not None:
+                    last = (entry['bid'] + entry['ask']) / 2
+                if last is None:
+                    continue
+                quotes[symbol] = Quote(last, entry['bid'], entry['ask'], entry['timestamp'])
+        return TickerSnapshot(exchange_name, time.time(), MappingProxyType(quotes))
+
+    def get_snapshots(self, symbols_by_exchange):
+        return {exchange_name: self.get_snapshot(exchange_name, symbols) for exchange_name, symbols in symbols_by_exchange.items()}
+
+    def get_symbols(self, exchange_name):
+        """Символи, для яких біржа вже надсилала котирування."""
+        with self._lock:
+            return {symbol for venue, symbol in self._quotes if venue == exchange_name}
+
+
+class IncrementalArbitrageDetector:
+    """Перераховує спред лише для символу, що оновився, через купи найкращих bid/ask по біржах."""
+
+    def __init__(self, min_price_difference=0.0, fee=0.0, exchange_fees=None, on_opportunity=None, max_quote_age=None, clock=None):
+        self.min_price_difference = min_price_difference
+        self.fee = fee
+        self.exchange_fees = exchange_fees or {}
+        self.on_opportunity = on_opportunity
+        # Як і в TopOfBookStore: котирування, старші за max_quote_age, не беруть участі в пошуку
+        self.max_quote_age = max_quote_age
+        self.clock = clock or time.monotonic
+        self._quotes = {}
+        self._received = {}
+        self._opportunity_received = {}
+        self._versions = {}
+        self._bid_heaps = {}
+        self._ask_heaps = {}
+        self._lock = threading.Lock()
+        self.opportunities = {}
+        self.updates = 0
+        self.evaluations = 0
+
+    def _is_fresh(self, received_at, now):
+        return self.max_quote_age is None or now - received_at <= self.max_quote_age
+
+    def _is_valid(self, symbol, entry, now):
+        return self._versions.get((symbol, entry[1])) == entry[2] and self._is_fresh(entry[3], now)
+
+    def _best_two(self, heap, symbol, now):
+        """Повертає до двох найкращих актуальних записів; замінені та прострочені видаляються ліниво."""
+        while heap and not self._is_valid(symbol, heap[0], now):
+            heapq.heappop(heap)
+        if not heap:
+            return []
+        first = heapq.heappop(heap)
+        while heap and not self._is_valid(symbol, heap[0], now):
+            heapq.heappop(heap)
+        best = [first] + heap[:1]
+        heapq.heappush(heap, first)
+        return best
+
+    def _compact(self, symbol):
+        # Купи містять застарілі записи; перебудовуємо їх, коли вони виростають удвічі
+        venues = self._quotes[symbol]
+        bids, asks = [], []
+        for venue, (bid, ask) in venues.items():
+            version = self._versions[(symbol, venue)]
+            received_at = self._received[(symbol, venue)]
+            if bid is not None:
+                bids.append((-bid, venue, version, received_at))
+            if ask is not None:
+                asks.append((ask, venue, version, received_at))
+        heapq.heapify(bids)
+        heapq.heapify(asks)
+        self._bid_heaps[symbol] = bids
+        self._ask_heaps[symbol] = asks
+
+    def update(self, exchange_name, symbol, bid, ask, received_at=None):
+        """Оновлює котирування біржі і повертає поточну можливість по символу (або None)."""
+        if received_at is None:
+            received_at = self.clock()
+        with self._lock:
+            self.updates += 1
+            venues = self._quotes.setdefault(symbol, {})
+            # Без обмеження віку незмінне котирування нічого не змінює; інакше воно оновлює час отримання
+            if self.max_quote_age is None and venues.get(exchange_name) == (bid, ask):
+                return self.opportunities.get(symbol)
+
+            venues[exchange_name] = (bid, ask)
+            key = (symbol, exchange_name)
+            version = self._versions.get(key, 0) + 1
+            self._versions[key] = version
+            self._received[key] = received_at
+            bid_heap = self._bid_heaps.setdefault(symbol, [])
+            ask_heap = self._ask_heaps.setdefault(symbol, [])
+            if bid is not None:
+                heapq.heappush(bid_heap, (-bid, exchange_name, version, received_at))
+            if ask is not None:
+                heapq.heappush(ask_heap, (ask, exchange_name, version, received_at))
+            if len(bid_heap) + len(ask_heap) > 4 * len(venues) + 8:
+                self._compact(symbol)
+
+            opportunity, changed = self._evaluate(symbol)
+        if changed and opportunity is not None and self.on_opportunity is not None:
+            self.on_opportunity(opportunity)
+        return opportunity
+
+    def on_store_update(self, exchange_name, symbol, entry):
+        """Listener для TopOfBookStore."""
+        self.update(exchange_name, symbol, entry['bid'], entry['ask'], entry.get('received_at'))
+
+    def _evaluate(self, symbol):
+        self.evaluations += 1
+        now = self.clock()
+        bids = self._best_two(self._bid_heaps[symbol], symbol, now)
+        asks = self._best_two(self._ask_heaps[symbol], symbol, now)
+
+        candidates = []
+        if bids and asks:
+            if bids[0][1] != asks[0][1]:
+                candidates.append((bids[0], asks[0]))
+            else:
+                # Найкращі bid і ask на одній біржі - беремо другий найкращий з іншого боку
+                if len(asks) > 1:
+                    candidates.append((bids[0], asks[1]))
+                if len(bids) > 1:
+                    candidates.append((bids[1], asks[0]))
+
+        best = None
+        best_received = None
+        for bid_entry, ask_entry in candidates:
+            bid, sell_exchange = -bid_entry[0], bid_entry[1]
+            ask, buy_exchange = ask_entry[0], ask_entry[1]
+            if bid - ask < self.min_price_difference:
+                continue
+            proceeds = bid * (1 - self.exchange_fees.get(sell_exchange, self.fee))
+            cost = ask * (1 + self.exchange_fees.get(buy_exchange, self.fee))
+            if proceeds <= cost:
+                continue
+            if best is None or bid - ask > best['sell_price'] - best['buy_price']:
+                best = {
+                    'buy_exchange': buy_exchange,
+                    'sell_exchange': sell_exchange,
+                    'currency': symbol,
+                    'buy_price': ask,
+                    'sell_price': bid,
+                    'edge': (proceeds - cost) / cost
+                }
+                best_received = min(bid_entry[3], ask_entry[3])
+
+        previous = self.opportunities.get(symbol)
+        if best is None:
+            self.opportunities.pop(symbol, None)
+            self._opportunity_received.pop(symbol, None)
+        else:
+            self.opportunities[symbol] = best
+            self._opportunity_received[symbol] = best_received
+        return best, best != previous
+
+    def get_opportunities(self):
+        with self._lock:
+            # Символ без нових оновлень може тримати можливість з простроченою ногою - перераховуємо його
+            now = self.clock()
+            for symbol, received_at in list(self._opportunity_received.items()):
+                if not self._is_fresh(received_at, now):
+                    self._evaluate(symbol)
+            return sorted(self.opportunities.values(), key=lambda opportunity: opportunity['edge'], reverse=True)
+
+
+class LocalMarketFeed:
+    """Локальна заміна ccxt.pro-клієнта: дані подаються вручну через push_*."""
+
+    def __init__(self):
+        self.has = {'watchTicker': True, 'watchOrderBook': True}
+        self._queues = {}
+
+    def _get_queue(self, channel, symbol):
+        key = (channel, symbol)
+        if key not in self._queues:
+            self._queues[key] = asyncio.Queue()
+        return self._queues[key]
+
+    def push_ticker(self, symbol, ticker):
+        ticker = dict(ticker, symbol=symbol)
+        self._get_queue('ticker', symbol).put_nowait(ticker)
+
+    def push_order_book(self, symbol, order_book):
+        order_book = dict(order_book, symbol=symbol)
+        self._get_queue('order_book', symbol).put_nowait(order_book)
+
+    async def watch_ticker(self, symbol, params={}):
+        return await self._get_queue('ticker', symbol).get()
+
+    async def watch_order_book(self, symbol, limit=None, params={}):
+        return await self._get_queue('order_book', symbol).get()
+
+    async def close(self):
+        pass
+
+
+class MarketDataStream:
+    """Підписка на тікери або стакани через ccxt.pro-сумісні клієнти з оновленням TopOfBookStore."""
+
+    def __init__(self, clients, symbols_by_exchange, store, channel='ticker', order_book_depth=10, reconnect_delay=1):
+        self.logger = setup_class_logger(self.__class__.__name__)
+        self.clients = clients
+        self.symbols_by_exchange = symbols_by_exchange
+        self.store = store
+        self.channel = channel
+        self.order_book_depth = order_book_depth
+        self.reconnect_delay = reconnect_delay
+        self._tasks = []
+        self._loop = None
+        self._thread = None
+
+    @classmethod
+    def from_config(cls, config_manager, symbols_by_exchange, store=None, clients=None):
+        """Створює потік з секції streaming конфігурації; clients можна підмінити LocalMarketFeed."""
+        streaming_config = config_manager.get_streaming_config()
+        if store is None:
+            store = TopOfBookStore(max_quote_age=streaming_config.get("max_quote_age", 5))
+        if clients is None:
+            clients = cls.create_clients({name: config_manager.get("exchanges", {})[name] for name in symbols_by_exchange})
+        return cls(
+            clients,
+            symbols_by_exchange,
+            store,
+            channel=streaming_config.get("channel", "ticker"),
+            order_book_depth=streaming_config.get("order_book_depth", 10),
+            reconnect_delay=streaming_config.get("reconnect_delay", 1)
+        )
+
+    @staticmethod
+    def create_clients(exchanges_config):
+        """Створює ccxt.pro-клієнти для бірж з конфігурації."""
+        import ccxt.pro as ccxt_pro
+
+        return {
+            exchange_name: getattr(ccxt_pro, exchange_name)({
+                'apiKey': config['api_key'],
+                'secret': config['api_secret']
+            })
+            for exchange_name, config in exchanges_config.items()
+        }
+
+    async def _watch(self, exchange_name, client, symbol):
+        delay = self.reconnect_delay
+        while True:
+            try:
+                if self.channel == 'order_book':
+                    order_book = await client.watch_order_book(symbol, self.order_book_depth)
+                    self.store.update_from_order_book(exchange_name, order_book)
+                else:
+                    ticker = await client.watch_ticker(symbol)
+                    self.store.update_from_ticker(exchange_name, ticker)
+                delay = self.reconnect_delay
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"Stream {self.channel} {symbol} on {exchange_name} failed: {str(e)}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 60)
+
+    async def start(self):
+        """Запускає підписки в поточному циклі подій."""
+        for exchange_name, symbols in self.symbols_by_exchange.items():
+            client = self.clients[exchange_name]
+            for symbol in symbols:
+                self._tasks.append(asyncio.create_task(self._watch(exchange_name, client, symbol)))
+        self.logger.info(f"Started {len(self._tasks)} {self.channel} subscriptions.")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await asyncio.gather(*(client.close() for client in self.clients.values()), return_exceptions=True)
+
+    def start_in_thread(self):
+        """Запускає потоки даних у фоновому потоці, щоб синхронний код читав лише TopOfBookStore."""
+        started = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            self._loop.run_until_complete(self.start())
+            started.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name="MarketDataStream", daemon=True)
+        self._thread.start()
+        started.wait()
+
+    def call_in_loop(self, func, *args):
+        """Виконує func у циклі подій потоку (наприклад, push_* локального фіду)."""
+        self._loop.call_soon_threadsafe(func, *args)
+
+    def stop_thread(self):
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self.stop(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = None
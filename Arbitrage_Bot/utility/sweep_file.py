@@ -0,0 +1,152 @@
+import copy
+import itertools
+import os
+import random
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Параметр перебору -> (секція конфігурації, ключ)
+SWEEP_PARAMETERS = {
+    'min_price_difference': ('arbitrage', 'min_price_difference'),
+    'max_trade_balance_percentage': ('risk_management', 'max_trade_balance_percentage'),
+    'max_position_size': ('risk_management', 'max_position_size'),
+    'price_difference_threshold': ('risk_parameters', 'price_difference_threshold')
+}
+
+RESULT_COLUMNS = ('pnl', 'max_drawdown', 'trades', 'final_value', 'events_per_second')
+
+# Стан процесу-виконавця, заповнюється один раз в _init_worker
+_worker = {}
+
+
+def apply_parameters(config_data, params):
+    config_data = copy.deepcopy(config_data)
+    for name, value in params.items():
+        section, key = SWEEP_PARAMETERS[name]
+        config_data.setdefault(section, {})[key] = value
+    return config_data
+
+
+def _init_worker(config_file, events_path, exchanges, symbols, initial_balance):
+    from utility.backtest_file import group_events
+
+    # Події відкриваються лише для читання; сторінки файлу спільні для всіх процесів через page cache
+    _worker['config_file'] = config_file
+    _worker['events'] = np.load(events_path, mmap_mode='r')
+    _worker['exchanges'] = exchanges
+    _worker['symbols'] = symbols
+    _worker['initial_balance'] = initial_balance
+    # Серії для quote_at групуються один раз на процес і спільні для всіх прогонів
+    _worker['series'] = group_events(_worker['events'], exchanges, symbols)
+
+
+def _run_parameter_set(params):
+    from utility.arbitrage_file import ConfigManager, ArbitrageAnalyzer, TransactionManager, SimulationTrading
+    from utility.backtest_file import BacktestEngine
+
+    config = ConfigManager(_worker['config_file'])
+    config.config_data = apply_parameters(config.config_data, params)
+    # Відтворення читає ціни з TopOfBookStore, тож ccxt-клієнти, пули потоків і ринки не потрібні
+    arbitrage_analyzer = ArbitrageAnalyzer(None, config)
+    transaction_manager = TransactionManager(None, config)
+    simulation = SimulationTrading(None, arbitrage_analyzer, transaction_manager, _worker['initial_balance'])
+
+    backtest_config = config.get_backtest_config()
+    engine = BacktestEngine(
+        simulation, None, _worker['exchanges'], _worker['symbols'],
+        trade_cooldown=backtest_config.get("trade_cooldown", 1.0),
+        max_quote_age=backtest_config.get("max_quote_age")
+    )
+    try:
+        engine.set_events(_worker['events'], _worker['series'])
+        stats = engine.run()
+    finally:
+        # Логери додають обробники при кожному створенні, тому закриваємо їх після прогону
+        for component in (engine, simulation, transaction_manager, arbitrage_analyzer, config):
+            component.close_logger()
+        transaction_manager.close()
+    return dict(params, **{column: stats[column] for column in RESULT_COLUMNS})
+
+
+class ParameterSweep:
+    """Перебір параметрів стратегії (сітка або випадковий пошук) з прогонами бектесту в пулі процесів."""
+
+    def __init__(self, config_file, tick_store, exchanges, symbols, initial_balance, start=None, end=None, max_workers=None):
+        self.config_file = config_file
+        self.tick_store = tick_store
+        self.exchanges = list(exchanges)
+        self.symbols = list(symbols)
+        self.initial_balance = initial_balance
+        self.start = start
+        self.end = end
+        self.max_workers = max_workers
+        self.results = []
+
+    @staticmethod
+    def grid(space):
+        """Усі комбінації значень: {'min_price_difference': [0.01, 0.05], ...}."""
+        names = list(space)
+        return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+    @staticmethod
+    def random_search(space, samples, seed=None):
+        """Випадкові набори: (low, high) - рівномірно з інтервалу, список - один з варіантів."""
+        rng = random.Random(seed)
+        parameter_sets = []
+        for _ in range(samples):
+            params = {}
+            for name, values in space.items():
+                if isinstance(values, tuple):
+                    params[name] = rng.uniform(*values)
+                else:
+                    params[name] = rng.choice(values)
+            parameter_sets.append(params)
+        return parameter_sets
+
+    def _write_events(self, directory):
+        # Злиті події готуються один раз і записуються у .npy, який виконавці відкривають через memmap
+        from utility.backtest_file import BacktestEngine
+
+        engine = BacktestEngine(None, self.tick_store, self.exchanges, self.symbols, self.start, self.end)
+        events = engine.load_events()
+        engine.close_logger()
+        path = os.path.join(directory, "events.npy")
+        np.save(path, events)
+        return path
+
+    def run(self, parameter_sets):
+        """Проганяє всі набори параметрів і повертає таблицю результатів, відсортовану за PnL."""
+        for params in parameter_sets:
+            unknown = set(params) - set(SWEEP_PARAMETERS)
+            if unknown:
+                raise ValueError(f"Unknown sweep parameters: {sorted(unknown)}")
+
+        with tempfile.TemporaryDirectory(prefix="sweep_") as directory:
+            events_path = self._write_events(directory)
+            with ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=_init_worker,
+                initargs=(self.config_file, events_path, self.exchanges, self.symbols, self.initial_balance)
+            ) as executor:
+                self.results = list(executor.map(_run_parameter_set, parameter_sets))
+
+        self.results.sort(key=lambda result: result['pnl'], reverse=True)
+        return self.results
+
+    @staticmethod
+    def _format_value(value):
+        return f"{value:.6g}" if isinstance(value, float) else str(value)
+
+    def format_results(self, results=None):
+        """Таблиця результатів у текстовому вигляді: параметри, PnL, просідання, кількість угод."""
+        results = self.results if results is None else results
+        if not results:
+            return ""
+        columns = [name for name in SWEEP_PARAMETERS if any(name in result for result in results)] + list(RESULT_COLUMNS)
+        rows = [[self._format_value(result.get(column, "")) for column in columns] for result in results]
+        widths = [max(len(column), *(len(row[index]) for row in rows)) for index, column in enumerate(columns)]
+        lines = ["  ".join(column.ljust(width) for column, width in zip(columns, widths))]
+        lines.extend("  ".join(value.ljust(width) for value, width in zip(row, widths)) for row in rows)
+        return "\n".join(lines)
@@ -0,0 +1,286 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Фіксований запис тіку; NaN означає відсутнє значення
+TICK_DTYPE = np.dtype([
+    ('timestamp', '<f8'),
+    ('price', '<f8'),
+    ('bid', '<f8'),
+    ('ask', '<f8'),
+    ('volume', '<f8')
+])
+
+OHLCV_DTYPE = np.dtype([
+    ('timestamp', '<f8'),
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('volume', '<f8')
+])
+
+
+def aggregate_ohlcv(ticks, interval):
+    """Агрегує впорядковані за часом тіки у свічки OHLCV довжиною interval секунд."""
+    ticks = ticks[~np.isnan(ticks['price'])]
+    if not len(ticks):
+        return np.empty(0, dtype=OHLCV_DTYPE)
+    buckets = np.floor(ticks['timestamp'] / interval) * interval
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(ticks)] - 1
+    prices = ticks['price']
+    bars = np.empty(len(starts), dtype=OHLCV_DTYPE)
+    bars['timestamp'] = buckets[starts]
+    bars['open'] = prices[starts]
+    bars['high'] = np.maximum.reduceat(prices, starts)
+    bars['low'] = np.minimum.reduceat(prices, starts)
+    bars['close'] = prices[ends]
+    bars['volume'] = np.add.reduceat(np.nan_to_num(ticks['volume']), starts)
+    return bars
+
+
+class TickStore:
+    """Append-only сховище тіків: сегментні файли фіксованих записів на кожну пару (біржа, символ)."""
+
+    INDEX_FILE = "index.json"
+
+    def __init__(self, root, segment_records=1000000, index_stride=4096, bar_cache_size=64):
+        self.root = root
+        self.segment_records = segment_records
+        self.index_stride = index_stride
+        self.bar_cache_size = bar_cache_size
+        os.makedirs(self.root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._writers = {}
+        self._segment_maps = {}
+        self._sparse_indexes = {}
+        self._bars = OrderedDict()
+        self.index = self._load_index()
+
+    def _load_index(self):
+        path = os.path.join(self.root, self.INDEX_FILE)
+        if not os.path.exists(path):
+            return {"segment_records": self.segment_records, "series": {}}
+        with open(path, 'r') as file:
+            index = json.load(file)
+        self.segment_records = index.get("segment_records", self.segment_records)
+        return index
+
+    def _save_index(self):
+        # Індекс змінюється лише при появі нової серії або сегмента
+        path = os.path.join(self.root, self.INDEX_FILE)
+        temp_path = path + ".tmp"
+        with open(temp_path, 'w') as file:
+            json.dump(self.index, file, indent=4)
+        os.replace(temp_path, path)
+
+    @staticmethod
+    def series_key(exchange_name, symbol):
+        return f"{exchange_name or ''}|{symbol}"
+
+    def _segment_path(self, series, segment):
+        return os.path.join(self.root, series["segments"][segment]["file"])
+
+    def _segment_count(self, path):
+        if not os.path.exists(path):
+            return 0
+        return os.path.getsize(path) // TICK_DTYPE.itemsize
+
+    def _get_series(self, exchange_name, symbol, create=False):
+        key = self.series_key(exchange_name, symbol)
+        series = self.index["series"].get(key)
+        if series is None and create:
+            series = {
+                "id": len(self.index["series"]),
+                "exchange": exchange_name or "",
+                "symbol": symbol,
+                "segments": []
+            }
+            self.index["series"][key] = series
+        return series
+
+    def _new_segment(self, series):
+        segment = len(series["segments"])
+        series["segments"].append({"file": f"{series['id']:05d}-{segment:05d}.ticks"})
+        self._save_index()
+
+    def append_many(self, exchange_name, symbol, records):
+        """Дописує масив записів TICK_DTYPE (або список кортежів) у кінець серії."""
+        records = np.asarray(records, dtype=TICK_DTYPE)
+        if not len(records):
+            return
+        with self._lock:
+            series = self._get_series(exchange_name, symbol, create=True)
+            if not series["segments"]:
+                self._new_segment(series)
+
+            key = self.series_key(exchange_name, symbol)
+            offset = 0
+            while offset < len(records):
+                segment = len(series["segments"]) - 1
+                path = self._segment_path(series, segment)
+                writer = self._writers.get(key)
+                if writer is not None:
+                    writer.flush()
+                free = self.segment_records - self._segment_count(path)
+                if free <= 0:
+                    self._close_writer(key)
+                    self._new_segment(series)
+                    continue
+
+                if writer is None:
+                    writer = open(path, 'ab')
+                    self._writers[key] = writer
+                chunk = records[offset:offset + free]
+                writer.write(chunk.tobytes())
+                offset += len(chunk)
+            self._writers[key].flush()
+
+    def append(self, exchange_name, symbol, timestamp, price, bid=np.nan, ask=np.nan, volume=np.nan):
+        self.append_many(exchange_name, symbol, [(timestamp, price, bid, ask, volume)])
+
+    def _close_writer(self, key):
+        writer = self._writers.pop(key, None)
+        if writer is not None:
+            writer.close()
+
+    def _map_segment(self, path, full):
+        # Заповнені сегменти більше не змінюються, тому їх відображення кешується
+        cached = self._segment_maps.get(path)
+        if cached is not None:
+            return cached
+        count = self._segment_count(path)
+        if count == 0:
+            return np.empty(0, dtype=TICK_DTYPE)
+        mapped = np.memmap(path, dtype=TICK_DTYPE, mode='r', shape=(count,))
+        if full:
+            self._segment_maps[path] = mapped
+        return mapped
+
+    def _sparse_index(self, path, mapped, full):
+        """Мітки часу кожного index_stride-го запису сегмента; для заповнених сегментів зберігаються у файлі .tidx."""
+        cached = self._sparse_indexes.get(path)
+        if cached is not None:
+            return cached
+        index_path = path + ".tidx"
+        if full and os.path.exists(index_path):
+            sparse = np.fromfile(index_path, dtype='<f8')
+        else:
+            sparse = np.array(mapped['timestamp'][::self.index_stride])
+            if full:
+                sparse.tofile(index_path)
+        if full:
+            self._sparse_indexes[path] = sparse
+        return sparse
+
+    def _slice_range(self, mapped, sparse, start, end):
+        """Знаходить межі [start, end] у сегменті: спершу по розрідженому індексу, далі лише у вікні між його мітками."""
+        count = len(mapped)
+        low, high = 0, count
+        if start is not None:
+            block = max(int(np.searchsorted(sparse, start, side='left')) - 1, 0)
+            window_end = min((block + 1) * self.index_stride + 1, count)
+            window = mapped['timestamp'][block * self.index_stride:window_end]
+            low = block * self.index_stride + int(np.searchsorted(window, start, side='left'))
+        if end is not None:
+            block = max(int(np.searchsorted(sparse, end, side='right')) - 1, 0)
+            window_end = min((block + 1) * self.index_stride, count)
+            window = mapped['timestamp'][block * self.index_stride:window_end]
+            high = block * self.index_stride + int(np.searchsorted(window, end, side='right'))
+        return mapped[low:max(low, high)]
+
+    def query(self, exchange_name, symbol, start=None, end=None):
+        """Записи серії з мітками часу в [start, end]; очікує, що тіки дописуються в хронологічному порядку."""
+        parts = []
+        with self._lock:
+            series = self._get_series(exchange_name, symbol)
+            if series is None:
+                return np.empty(0, dtype=TICK_DTYPE)
+            for segment in range(len(series["segments"])):
+                path = self._segment_path(series, segment)
+                full = self._segment_count(path) >= self.segment_records
+                mapped = self._map_segment(path, full)
+                if not len(mapped):
+                    continue
+                # Сегменти поза діапазоном пропускаються без читання даних
+                if end is not None and mapped[0]['timestamp'] > end:
+                    break
+                if start is not None and mapped[-1]['timestamp'] < start:
+                    continue
+                sparse = self._sparse_index(path, mapped, full)
+                part = self._slice_range(mapped, sparse, start, end)
+                if len(part):
+                    parts.append(part)
+        if not parts:
+            return np.empty(0, dtype=TICK_DTYPE)
+        if len(parts) == 1:
+            return parts[0]
+        return np.concatenate(parts)
+
+    def query_symbol(self, symbol, start=None, end=None):
+        """Тіки символу з усіх бірж за [start, end], злиті в один масив за часом."""
+        parts = [self.query(exchange, symbol, start, end) for exchange, series_symbol in self.list_series() if series_symbol == symbol]
+        parts = [part for part in parts if len(part)]
+        if not parts:
+            return np.empty(0, dtype=TICK_DTYPE)
+        if len(parts) == 1:
+            return parts[0]
+        ticks = np.concatenate(parts)
+        return ticks[np.argsort(ticks['timestamp'], kind='stable')]
+
+    def count(self, exchange_name, symbol):
+        series = self._get_series(exchange_name, symbol)
+        if series is None:
+            return 0
+        return sum(self._segment_count(self._segment_path(series, segment)) for segment in range(len(series["segments"])))
+
+    def ohlcv(self, exchange_name, symbol, interval, start=None, end=None):
+        """Агрегує тіки у свічки OHLCV довжиною interval секунд; результат кешується до появи нових тіків."""
+        # Кількість записів у ключі робить кеш недійсним після дописування
+        key = (self.series_key(exchange_name, symbol), interval, start, end, self.count(exchange_name, symbol))
+        bars = self._bars.get(key)
+        if bars is not None:
+            self._bars.move_to_end(key)
+            return bars
+
+        bars = aggregate_ohlcv(self.query(exchange_name, symbol, start, end), interval)
+        self._bars[key] = bars
+        while len(self._bars) > self.bar_cache_size:
+            self._bars.popitem(last=False)
+        return bars
+
+    def read_segments(self, exchange_name, symbol):
+        """Повертає memory-mapped масиви всіх сегментів серії без копіювання."""
+        with self._lock:
+            series = self._get_series(exchange_name, symbol)
+            if series is None:
+                return []
+            segments = []
+            for segment in range(len(series["segments"])):
+                path = self._segment_path(series, segment)
+                segments.append(self._map_segment(path, full=self._segment_count(path) >= self.segment_records))
+            return segments
+
+    def read(self, exchange_name, symbol):
+        """Повертає всю історію серії; для одного сегмента - view на memory-mapped файл."""
+        segments = [segment for segment in self.read_segments(exchange_name, symbol) if len(segment)]
+        if not segments:
+            return np.empty(0, dtype=TICK_DTYPE)
+        if len(segments) == 1:
+            return segments[0]
+        return np.concatenate(segments)
+
+    def list_series(self):
+        return [(series["exchange"], series["symbol"]) for series in self.index["series"].values()]
+
+    def close(self):
+        with self._lock:
+            for key in list(self._writers):
+                self._close_writer(key)
+            self._segment_maps.clear()
+            self._sparse_indexes.clear()
+            self._bars.clear()
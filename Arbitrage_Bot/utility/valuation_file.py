@@ -0,0 +1,73 @@
+class ValuationService:
+    """Курси валют у USDT для багатьох бірж: один пакетний знімок на біржу і кешовані шляхи конвертації."""
+
+    def __init__(self, snapshot_source, symbols_source, quote="USDT", intermediates=("BTC", "ETH", "USDC")):
+        # snapshot_source({біржа: символи}) -> {біржа: TickerSnapshot}; symbols_source(біржа) -> доступні символи
+        self.snapshot_source = snapshot_source
+        self.symbols_source = symbols_source
+        self.quote = quote
+        self.intermediates = [currency for currency in intermediates if currency != quote]
+        self._paths = {}
+
+    @staticmethod
+    def _direct_leg(symbols, source, target):
+        """Одна нога шляху: (символ, чи ділити на ціну) або None, якщо ринку немає."""
+        if f"{source}/{target}" in symbols:
+            return f"{source}/{target}", False
+        if f"{target}/{source}" in symbols:
+            return f"{target}/{source}", True
+        return None
+
+    def conversion_path(self, exchange_name, currency):
+        """Шлях конвертації currency -> quote: напряму або через проміжну валюту (напр. BTC)."""
+        key = (exchange_name, currency)
+        if key in self._paths:
+            return self._paths[key]
+        if currency == self.quote:
+            path = []
+        else:
+            symbols = self.symbols_source(exchange_name)
+            leg = self._direct_leg(symbols, currency, self.quote)
+            path = [leg] if leg else None
+            if path is None:
+                for intermediate in self.intermediates:
+                    first = self._direct_leg(symbols, currency, intermediate)
+                    second = self._direct_leg(symbols, intermediate, self.quote) if first else None
+                    if second:
+                        path = [first, second]
+                        break
+        # Ненайдені шляхи не кешуються: ринок може з'явитися пізніше
+        if path is not None:
+            self._paths[key] = path
+        return path
+
+    def get_rates(self, currencies_by_exchange):
+        """Повертає {біржа: {валюта: курс у quote}}; None для валют без шляху або без котирувань."""
+        paths = {}
+        symbols_by_exchange = {}
+        for exchange_name, currencies in currencies_by_exchange.items():
+            for currency in currencies:
+                path = self.conversion_path(exchange_name, currency)
+                paths[(exchange_name, currency)] = path
+                for symbol, _ in path or []:
+                    symbols_by_exchange.setdefault(exchange_name, set()).add(symbol)
+
+        snapshots = self.snapshot_source(symbols_by_exchange) if symbols_by_exchange else {}
+
+        rates = {}
+        for (exchange_name, currency), path in paths.items():
+            rate = None
+            if path is not None:
+                rate = 1.0
+                for symbol, inverted in path:
+                    snapshot = snapshots.get(exchange_name)
+                    price = snapshot.get_price(symbol) if snapshot is not None else None
+                    if not price:
+                        rate = None
+                        break
+                    rate = rate / price if inverted else rate * price
+            rates.setdefault(exchange_name, {})[currency] = rate
+        return rates
+
+    def clear_cache(self):
+        self._paths.clear()